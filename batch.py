@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# batch.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 18 12:05:47 2026 (+0200)
+# Last-Updated: Sun Oct 18 14:21:09 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 87
+#
+
+"""Headless batch detection.
+
+Usage:
+    python batch.py [options] [DIR | GLOB | FILE | @LIST]...
+
+Examples:
+    python batch.py faces/ -o Face/Eye -o Face/Nose > results.jsonl
+    python batch.py 'archive/**/*.jpg' --format csv --output results.csv
+    find archive -name '*.png' | python batch.py @- -j 8
+    python batch.py crowd/ -o Face --redact Pixelate --redact-dir redacted/
+"""
+
+import os
+import sys
+import csv
+import json
+import glob
+import time
+import signal
+import argparse
+import itertools
+import multiprocessing
+
+import cv2
+
+from detector import Detector, ClassifierParameters
+from redact import Redactor, MODES as REDACT_MODES
+from tree import Tree, Node
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+CSV_FIELDS = ['path', 'width', 'height', 'decode', 'detect',
+              'id', 'parent', 'object', 'name', 'x', 'y', 'w', 'h']
+
+def parseTree(specs):
+    """Create an objects tree from specs like 'Face/Eye'.
+    """
+    tree = Tree()
+    for spec in specs:
+        node = tree
+        for obj in spec.split('/'):
+            obj = obj.strip()
+            if obj not in Detector.getDefaultAvailableObjects():
+                raise ValueError('Unknown object "{}"'.format(obj))
+            node = node[obj]
+    return tree
+
+def parametersTree(objectsTree, **params):
+    """Create a detection tree from an objects tree.
+    'params' are ClassifierParameters keyword arguments shared by all nodes.
+    """
+    counter = [0]
+    def convert(objects):
+        tree = Tree()
+        for obj, children in objects.iteritems():
+            counter[0] += 1
+            param = ClassifierParameters(counter[0], obj, obj, None,
+                                         'Rectangle', 'Outline', **params)
+            tree[Node(obj, (True, param))] = convert(children)
+        return tree
+    return convert(objectsTree)
+
+def flattenTree(roiTree):
+    """Return detected objects as a list of dicts, parents first.
+    """
+    objects = []
+    def flatten(tree, parent):
+        for node, children in tree.iteritems():
+            roi, param, tracking = node.data
+            x, y, w, h = roi
+            index = len(objects)
+            objects.append({'id': index, 'parent': parent,
+                            'object': param.classifier, 'name': param.name,
+                            'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)})
+            flatten(children, index)
+    flatten(roiTree, None)
+    return objects
+
+def iterPaths(inputs):
+    """Yield image paths from directories, globs, files and @lists.
+    """
+    for arg in inputs:
+        if arg.startswith('@'):
+            listFile = sys.stdin if arg == '@-' else open(arg[1:])
+            for line in listFile:
+                line = line.strip()
+                if line:
+                    yield line
+        elif os.path.isdir(arg):
+            for root, dirs, files in os.walk(arg):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(arg):
+            yield arg
+        else:
+            matches = sorted(glob.glob(arg))
+            if not matches:
+                print >> sys.stderr, 'No match for {}'.format(arg)
+            for path in matches:
+                yield path
+
+########################################################
+# Workers
+
+worker = {}
+
+class WorkerError(Exception):
+    """A worker process cannot detect anything.
+    """
+
+def initWorker(objectsTree, params, equalizeHist, detectionSize=None, redact=None):
+    """Create the detector of a worker process and warm up its cascades.
+    'redact' is (mode, strength, directory) to write redacted images.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    detector = Detector()
+    tree = parametersTree(objectsTree, **params)
+    worker.update(detector=detector, tree=tree, equalizeHist=equalizeHist,
+                  detectionSize=detectionSize, redactor=None, error=None)
+    try:
+        detector.warmUp(set(node.name for node in tree.walk()))
+    except Exception as e:
+        # Raising would make the pool respawn the worker forever
+        worker['error'] = 'Cannot load classifiers: {}'.format(e)
+    if redact:
+        mode, strength, directory = redact
+        worker.update(redactor=Redactor(mode, strength), redactDir=directory)
+
+def redactPath(path, directory):
+    """Return the path of the redacted image 'path' in 'directory'.
+    The input path is kept under 'directory', absolute and parent relative
+    paths from the root, so that images of nested inputs never collide.
+    """
+    path = os.path.normpath(path)
+    if os.path.isabs(path) or path.split(os.sep)[0] == os.pardir:
+        path = os.path.splitdrive(os.path.abspath(path))[1].lstrip(os.sep)
+    return os.path.join(directory, path)
+
+def redactImage(img, objects, path):
+    """Redact detected 'objects' of 'img' and write it in the redact directory.
+    Return the written path.
+    """
+    rois = [(obj['x'], obj['y'], obj['w'], obj['h']) for obj in objects]
+    worker['redactor'].redact(img, rois)
+    output = redactPath(path, worker['redactDir'])
+    try:
+        os.makedirs(os.path.dirname(output))
+    except OSError:
+        # Created by another worker
+        if not os.path.isdir(os.path.dirname(output)):
+            raise
+    if not cv2.imwrite(output, img):
+        raise IOError('Cannot write {}'.format(output))
+    return output
+
+def detectPath(path):
+    """Detect objects in image 'path' with the worker detector.
+    Raise WorkerError if the worker failed to start.
+    """
+    if worker['error']:
+        raise WorkerError(worker['error'])
+    record = {'path': path}
+    try:
+        start = time.time()
+        img = cv2.imread(path)
+        decoded = time.time()
+        if img is None:
+            record['error'] = 'Cannot read image'
+            return record
+        detections = worker['detector'].detect(img, worker['tree'],
+                                               worker['equalizeHist'],
+                                               detectionSize=worker['detectionSize'],
+                                               columnar=True)
+        end = time.time()
+        objects = detections.toRecords()
+        if worker['redactor']:
+            record['redacted'] = redactImage(img, objects, path)
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+    h, w = img.shape[:2]
+    record.update(width=w, height=h, decode=decoded - start,
+                  detect=end - decoded, objects=objects)
+    return record
+
+def mapChunk(task):
+    """Apply a function to a chunk of items in a worker process.
+    """
+    func, items = task
+    return [func(item) for item in items]
+
+def imapWorkers(pool, func, iterable, chunksize=1, interval=1.0):
+    """Like pool.imap_unordered, but raise WorkerError when a worker process
+    dies: the pool replaces it, but its tasks would be waited for forever.
+    """
+    items = iter(iterable)
+    chunks = iter(lambda: list(itertools.islice(items, chunksize)), [])
+    workers = set(p.pid for p in multiprocessing.active_children())
+    # Chunk here: with a chunksize, imap_unordered has no timeout
+    results = pool.imap_unordered(mapChunk, ((func, chunk) for chunk in chunks))
+    while True:
+        try:
+            chunk = results.next(interval)
+        except StopIteration:
+            return
+        except multiprocessing.TimeoutError:
+            alive = set(p.pid for p in multiprocessing.active_children())
+            if not workers <= alive:
+                raise WorkerError('A worker process died, a classifier may crash '
+                                  'this OpenCV version')
+            continue
+        for result in chunk:
+            yield result
+
+########################################################
+# Output
+
+class JSONLWriter(object):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+
+class CSVWriter(object):
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, CSV_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        objects = record.get('objects') or [{}]
+        for obj in objects:
+            row = dict(record)
+            row.update(obj)
+            self.writer.writerow(row)
+
+def parseSize(value):
+    w, h = value.lower().split('x')
+    return (int(w), int(h))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Detect objects in a batch of images.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__)
+    parser.add_argument('inputs', nargs='+',
+                        help='image directories, globs, files or @list files (@- for stdin)')
+    parser.add_argument('-o', '--object', action='append', dest='objects',
+                        help='object path to detect, e.g. Face/Eye (default: Face/Eye, Face/Nose)')
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--output', help='output file (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--no-equalize', action='store_true',
+                        help='do not equalize histogram before detecting')
+    parser.add_argument('--detection-size', type=int, metavar='PIXELS',
+                        help='downscale images to this longest side before detecting')
+    parser.add_argument('--scale-factor', type=float, default=1.3)
+    parser.add_argument('--min-neighbors', type=int, default=4)
+    parser.add_argument('--min-size', type=parseSize, default=(0, 0), metavar='WxH')
+    parser.add_argument('--redact', choices=REDACT_MODES,
+                        help='blur detected objects and write the images in --redact-dir')
+    parser.add_argument('--redact-strength', type=int, default=20,
+                        help='blur radius or pixel block size')
+    parser.add_argument('--redact-dir', default='redacted', metavar='DIR',
+                        help='directory of redacted images, input paths are kept under it')
+    args = parser.parse_args(argv)
+
+    objectsTree = (parseTree(args.objects) if args.objects
+                   else Detector.getDefaultObjectsTree())
+    params = dict(scaleFactor=args.scale_factor, minNeighbors=args.min_neighbors,
+                  minSize=args.min_size)
+    redact = None
+    if args.redact:
+        redact = (args.redact, args.redact_strength, args.redact_dir)
+        if not os.path.isdir(args.redact_dir):
+            os.makedirs(args.redact_dir)
+    stream = open(args.output, 'wb') if args.output else sys.stdout
+    writer = (CSVWriter if args.format == 'csv' else JSONLWriter)(stream)
+
+    pool = multiprocessing.Pool(max(1, args.jobs), initWorker,
+                                (objectsTree, params, not args.no_equalize,
+                                 args.detection_size, redact))
+    count, errors, start = 0, 0, time.time()
+    try:
+        for record in imapWorkers(pool, detectPath, iterPaths(args.inputs), 16):
+            count += 1
+            if 'error' in record:
+                errors += 1
+                print >> sys.stderr, '{}: {}'.format(record['path'], record['error'])
+            writer.write(record)
+        pool.close()
+    except WorkerError as e:
+        pool.terminate()
+        print >> sys.stderr, e
+        return 1
+    except KeyboardInterrupt:
+        pool.terminate()
+    finally:
+        pool.join()
+        if stream is not sys.stdout:
+            stream.close()
+    elapsed = time.time() - start
+    print >> sys.stderr, '{} images ({} errors) in {:.2f} s, {:.1f} images/s'.format(
+        count, errors, elapsed, count / elapsed if elapsed else 0)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
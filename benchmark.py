@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# benchmark.py
+#
+# Author: Yann KOETH
+# Created: Fri Oct 23 09:51:33 2026 (+0200)
+# Last-Updated: Fri Oct 23 12:40:18 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 71
+#
+
+"""Benchmarks of the detector, tracker and render paths.
+
+Frames are built from the faces/ images, scaled and tiled to 480p, 1080p
+and 4K. Each case is warmed up, then timed over several repetitions.
+Results are written as JSON and two runs can be compared.
+
+Usage:
+    python benchmark.py run [options]
+    python benchmark.py compare BASELINE.json CURRENT.json [--threshold PERCENT]
+
+Examples:
+    python benchmark.py run --output before.json
+    python benchmark.py run -k detect/Face --repeat 20 --output after.json
+    python benchmark.py compare before.json after.json --threshold 10
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import multiprocessing
+
+import cv2
+import numpy as np
+
+import compositor
+from detector import Detector, DetectorState, ClassifierParameters
+from batch import parseTree, parametersTree
+
+FACES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faces')
+RESOLUTIONS = [('480p', (854, 480)), ('1080p', (1920, 1080)), ('4K', (3840, 2160))]
+CASCADES = [Detector.FACE, Detector.EYE, Detector.NOSE]
+TREES = [('Face', ['Face']), ('Face>Eye', ['Face/Eye']), ('Face>Eye+Nose', ['Face/Eye', 'Face/Nose'])]
+OBJECT_COUNTS = [10, 50, 200, 1000]
+FILL_MODES = [compositor.FILL_OUTLINE, compositor.FILL_COLOR, compositor.FILL_BLUR,
+              compositor.FILL_IMAGE, compositor.FILL_MASK]
+
+def tiledFrame(size, tile=360):
+    """Tile the faces images, scaled to 'tile' pixels high, on a 'size' frame.
+    """
+    w, h = size
+    faces = [cv2.imread(os.path.join(FACES_DIR, name))
+             for name in sorted(os.listdir(FACES_DIR)) if name.endswith('.png')]
+    faces = [cv2.resize(f, (f.shape[1] * tile // f.shape[0], tile)) for f in faces if f is not None]
+    frame = np.zeros((h, w, 3), dtype=np.uint8)
+    x, y, i = 0, 0, 0
+    while y < h:
+        face = faces[i % len(faces)]
+        fh, fw = face.shape[:2]
+        cw, ch = min(fw, w - x), min(fh, h - y)
+        frame[y:y + ch, x:x + cw] = face[:ch, :cw]
+        i += 1
+        x += fw
+        if x >= w:
+            x, y = 0, y + tile
+    return frame
+
+def randomRects(count, size, rng):
+    w, h = size
+    return [(rng.randint(0, w - 80), rng.randint(0, h - 80), rng.randint(20, 80),
+             rng.randint(20, 80)) for i in xrange(count)]
+
+def percentile(values, p):
+    return float(np.percentile(values, p))
+
+def measure(func, warmup, repeat):
+    """Time 'func' after 'warmup' calls, return timing statistics in seconds.
+    """
+    for i in xrange(warmup):
+        func()
+    times = []
+    for i in xrange(repeat):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return {'repeat': repeat, 'min': min(times), 'mean': float(np.mean(times)),
+            'median': percentile(times, 50), 'p90': percentile(times, 90),
+            'p99': percentile(times, 99), 'stdev': float(np.std(times))}
+
+########################################################
+# Cases
+
+def detectCases():
+    """Detector.detect per cascade and resolution, and per tree depth.
+    """
+    for label, size in RESOLUTIONS:
+        frame = tiledFrame(size)
+        for obj in CASCADES:
+            tree = parametersTree(parseTree([obj]))
+            detector = Detector()
+            yield 'detect/{}/{}'.format(obj, label), lambda d=detector, t=tree, f=frame: d.detect(f, t)
+    frame = tiledFrame(RESOLUTIONS[0][1])
+    for label, specs in TREES:
+        tree = parametersTree(parseTree(specs))
+        detector = Detector()
+        yield 'tree/{}'.format(label), lambda d=detector, t=tree: d.detect(frame, t)
+
+def trackerCases():
+    """Detector.stabilize with growing object counts.
+    """
+    rng = random.Random(0)
+    detector = Detector()
+    param = ClassifierParameters(1, Detector.FACE, Detector.FACE, None,
+                                 compositor.SHAPE_RECT, compositor.FILL_OUTLINE,
+                                 stabilize=True)
+    for count in OBJECT_COUNTS:
+        previous = randomRects(count, (1920, 1080), rng)
+        current = [(x + rng.randint(-5, 5), y + rng.randint(-5, 5), w, h)
+                   for x, y, w, h in previous]
+        rng.shuffle(current)
+        state = DetectorState()
+        detector.stabilize(param, None, previous, state)
+
+        def stabilize(current=current, state=state):
+            state.frameIndex += 1
+            detector.stabilize(param, None, current, state)
+        yield 'tracker/stabilize/{}'.format(count), stabilize
+
+def renderCases():
+    """Compositor per fill mode, and np2Qt, Window.compose per fill mode
+    and drawRects when Qt is available.
+    """
+    rng = random.Random(0)
+    frame = tiledFrame(RESOLUTIONS[1][1])
+    rects = randomRects(20, (1920, 1080), rng)
+    image = cv2.resize(frame, (80, 80))
+    feather = np.ones((80, 80), dtype=np.float32)
+    # Fill assets are cached by size in the GUI, resize them once
+    images = [cv2.resize(image, (w, h)) for x, y, w, h in rects]
+    feathers = [cv2.resize(feather, (w, h)) for x, y, w, h in rects]
+    comp = compositor.Compositor()
+    for fill in FILL_MODES:
+        def render(fill=fill):
+            comp.begin(frame)
+            for rect, image, feather in zip(rects, images, feathers):
+                comp.fill(rect, compositor.SHAPE_ELLIPSE, fill, (0, 0, 255), image, feather)
+            return comp.end()
+        yield 'render/compose/{}'.format(fill), render
+    try:
+        from PyQt5.QtGui import QColor
+        from PyQt5.QtWidgets import QApplication
+        import common
+    except ImportError:
+        return
+    app = QApplication.instance() or QApplication(['benchmark'])
+    yield 'render/np2Qt/1080p', lambda: common.np2Qt(frame)
+    converter = common.DisplayConverter()
+    yield 'render/toPixmap/1080p', lambda: converter.toPixmap(frame)
+    from detection import Window
+    window = Window()
+    detections = Detector().detect(frame, parametersTree(parseTree(['Face/Eye'])),
+                                   columnar=True)
+    rectsTree = detections.tree()
+    fillPath = os.path.join(FACES_DIR, 'watson.png')
+    for param in detections.params:
+        param.color = QColor(255, 0, 0)
+        param.fillPath = fillPath
+    # Cases are timed as they are yielded, before the next fill mode is set
+    for fill in FILL_MODES:
+        for param in detections.params:
+            param.fill = fill
+        yield ('render/window.compose/{}'.format(fill),
+               lambda: window.compose(frame, rectsTree, 1.0))
+    for param in detections.params:
+        param.fill = compositor.FILL_OUTLINE
+    pixmap = converter.toPixmap(frame)
+    yield 'render/drawRects/1080p', lambda: window.drawRects(pixmap, rectsTree, 1.0)
+
+CASES = [detectCases, trackerCases, renderCases]
+
+########################################################
+# Commands
+
+def environment():
+    return {'python': platform.python_version(), 'opencv': cv2.__version__,
+            'numpy': np.__version__, 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': multiprocessing.cpu_count(),
+            'cvThreads': cv2.getNumThreads(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run(args):
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+    results = {'environment': environment(), 'warmup': args.warmup, 'cases': {}}
+    for cases in CASES:
+        for name, func in cases():
+            if args.keyword and not any(k in name for k in args.keyword):
+                continue
+            stats = measure(func, args.warmup, args.repeat)
+            results['cases'][name] = stats
+            print >> sys.stderr, '{:<40} median {:9.3f} ms  p90 {:9.3f} ms'.format(
+                name, stats['median'] * 1000, stats['p90'] * 1000)
+    stream = open(args.output, 'w') if args.output else sys.stdout
+    json.dump(results, stream, indent=2, sort_keys=True)
+    if stream is not sys.stdout:
+        stream.close()
+    return 0
+
+def compare(args):
+    """Print the median change of each case, flag regressions above threshold.
+    """
+    with open(args.baseline) as f:
+        baseline = json.load(f)['cases']
+    with open(args.current) as f:
+        current = json.load(f)['cases']
+    regressions = 0
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print '{:<40} {}'.format(name, 'only in baseline' if name in baseline
+                                     else 'only in current')
+            continue
+        before, after = baseline[name]['median'], current[name]['median']
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change < -args.threshold:
+            flag = '  improved'
+        print '{:<40} {:9.3f} -> {:9.3f} ms {:+7.1f}%{}'.format(
+            name, before * 1000, after * 1000, change, flag)
+    print >> sys.stderr, '{} regression(s) above {:.0f}%'.format(regressions, args.threshold)
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Detector, tracker and render benchmarks.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__)
+    commands = parser.add_subparsers(dest='command')
+    runParser = commands.add_parser('run', help='run the benchmarks')
+    runParser.add_argument('-k', '--keyword', action='append',
+                           help='only run cases whose name contains KEYWORD')
+    runParser.add_argument('--warmup', type=int, default=2)
+    runParser.add_argument('--repeat', type=int, default=10)
+    runParser.add_argument('--threads', type=int, help='OpenCV threads (default: OpenCV choice)')
+    runParser.add_argument('--output', help='JSON output (default: stdout)')
+    compareParser = commands.add_parser('compare', help='compare two runs')
+    compareParser.add_argument('baseline')
+    compareParser.add_argument('current')
+    compareParser.add_argument('--threshold', type=float, default=10.0,
+                               help='median slowdown in percent flagged as a regression')
+    args = parser.parse_args(argv)
+    return run(args) if args.command == 'run' else compare(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# cache.py
+#
+# Author: Yann KOETH
+# Created: Tue Oct 20 10:02:18 2026 (+0200)
+# Last-Updated: Tue Oct 20 11:15:43 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 38
+#
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+class AssetCache(object):
+    """LRU cache of render assets bounded by a byte budget.
+
+    File assets are keyed by (path, mtime, file size, target size): a
+    modified file is loaded again and scaled variants are cached next to
+    the original. Files are stat'ed at most every 'checkInterval' seconds,
+    so repeated frames do no disk I/O.
+
+    'load(path)' returns the asset of a file or None, 'scale(asset, size)'
+    returns 'asset' scaled to 'size' (width, height) and 'sizeOf(asset)'
+    returns its size in bytes.
+    """
+
+    def __init__(self, load, scale, sizeOf, budget=64 * 1024 * 1024, checkInterval=2.0):
+        self.loader = load
+        self.scaler = scale
+        self.sizeOf = sizeOf
+        self.budget = budget
+        self.checkInterval = checkInterval
+        self.lock = threading.RLock()
+        # key -> (asset, bytes)
+        self.assets = OrderedDict()
+        # path -> (stamp, lastChecked)
+        self.stamps = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stamp(self, path):
+        """Return (mtime, size) of 'path', None if it does not exist.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.stamps.get(path)
+            if entry is not None and now - entry[1] <= self.checkInterval:
+                return entry[0]
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime, st.st_size)
+        except OSError:
+            stamp = None
+        with self.lock:
+            self.stamps[path] = (stamp, now)
+        return stamp
+
+    def get(self, path, size=None):
+        """Return the asset of file 'path', scaled to 'size' if given.
+        Return None if the file does not exist or cannot be loaded.
+        """
+        stamp = self.stamp(path)
+        if stamp is None:
+            return None
+        if size is not None:
+            size = (int(size[0]), int(size[1]))
+        key = (path, stamp, size)
+        with self.lock:
+            found, asset = self.lookup(key)
+        if found:
+            return asset
+        if size is None:
+            asset = self.loader(path)
+        else:
+            asset = self.get(path)
+            if asset is not None:
+                asset = self.scaler(asset, size)
+        return self.put(key, asset)
+
+    def generate(self, name, size, factory):
+        """Return the asset 'name' at 'size', built by 'factory()' on miss.
+        """
+        key = (name, None, size)
+        with self.lock:
+            found, asset = self.lookup(key)
+        if found:
+            return asset
+        return self.put(key, factory())
+
+    def lookup(self, key):
+        """Return (found, asset) and mark 'key' as recently used. Lock must be held.
+        """
+        entry = self.assets.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.assets[key] = entry
+        self.hits += 1
+        return True, entry[0]
+
+    def put(self, key, asset):
+        """Store 'asset' under 'key', evict least recently used assets.
+        """
+        nbytes = self.sizeOf(asset) if asset is not None else 0
+        with self.lock:
+            old = self.assets.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self.assets[key] = (asset, nbytes)
+            self.size += nbytes
+            for k in list(self.assets):
+                if self.size <= self.budget or k == key:
+                    break
+                self.size -= self.assets.pop(k)[1]
+                self.evictions += 1
+        return asset
+
+    def clear(self):
+        """Drop every cached asset.
+        """
+        with self.lock:
+            self.assets.clear()
+            self.stamps.clear()
+            self.size = 0
+
+    def stats(self):
+        """Return cache counters.
+        """
+        with self.lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'assets': len(self.assets),
+                    'bytes': self.size,
+                    'budget': self.budget}
@@ -12,11 +12,9 @@
 import cv2
 import os
 import numpy as np
-from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5 import QtCore
 from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtWidgets import QDesktopWidget, QLabel, QGraphicsBlurEffect, QGraphicsPixmapItem
-
-from tree import Tree
+from PyQt5.QtWidgets import QDesktopWidget, QLabel
 
 class CustomException(Exception):
     pass
@@ -34,63 +32,96 @@ def setPickerColor(color, colorPicker):
         border-radius: 2px; border-color: #555; border-style: outset; }'
     colorPicker.setStyleSheet(css % color.name())
 
-def checkerboard(size):
-    """Create a checkboard.
-    """
-    h, w = size.height(), size.width()
-    c0 = (191, 191, 191, 255)
-    c1 = (255, 255, 255, 255)
-    blocksize = 8
-    coords = np.ogrid[0:h,0:w]
-    idx = (coords[0] // blocksize + coords[1] // blocksize) % 2
-    vals = np.array([c0, c1], dtype=np.uint8)
-    return np2Qt(vals[idx])
-
 def np2Qt(image):
     """Convert numpy array to QPixmap.
     """
-    height, width, bytesPerComponent = image.shape
-    bytesPerLine = 4 * width
+    return QPixmap.fromImage(wrapQImage(np.ascontiguousarray(image)))
 
-    if bytesPerComponent == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2RGBA)
-    qimg = QImage(image.data, width, height,
-                  bytesPerLine, QImage.Format_ARGB32)
-    return QPixmap.fromImage(qimg)
+# Format_BGR888 needs Qt >= 5.14
+BGR888 = hasattr(QImage, 'Format_BGR888')
 
-def fitImageToScreen(pixmap):
-    """Fit pixmap to screen.
+def wrapQImage(image):
+    """Wrap contiguous BGR, BGRA or gray numpy 'image' in a QImage without
+    copying. 'image' must outlive the returned QImage. Before Qt 5.14, a
+    BGR 'image' is copied to an RGB QImage instead.
     """
-    resolution = QDesktopWidget().screenGeometry()
-    h, w = resolution.width(), resolution.height()
-    w = min(pixmap.width(), w)
-    h = min(pixmap.height(), h)
-    return pixmap.scaled(QtCore.QSize(w, h), QtCore.Qt.KeepAspectRatio)
-
-def blurPixmap(pixmap, radius):
-    effect = QGraphicsBlurEffect()
-    effect.setBlurRadius(radius)
-    buffer = QPixmap(pixmap)
-    item = QGraphicsPixmapItem(buffer)
-    item.setGraphicsEffect(effect)
-    output = QPixmap(pixmap.width(), pixmap.height())
-    painter = QtGui.QPainter(output)
-    scene = QtWidgets.QGraphicsScene()
-    view = QtWidgets.QGraphicsView(scene)
-    scene.addItem(item)
-    scene.render(painter)
-    return output
+    height, width = image.shape[:2]
+    channels = image.shape[2] if image.ndim == 3 else 1
+    if channels == 4:
+        fmt = QImage.Format_ARGB32
+    elif channels == 3 and not BGR888:
+        qimg = QImage(image.data, width, height, image.strides[0], QImage.Format_RGB888)
+        return qimg.rgbSwapped()
+    elif channels == 3:
+        fmt = QImage.Format_BGR888
+    else:
+        fmt = QImage.Format_Grayscale8
+    return QImage(image.data, width, height, image.strides[0], fmt)
+
+class DisplayConverter(object):
+    """Convert BGR frames to QPixmaps fitted to the screen.
+
+    Frames are resized before the conversion and wrapped without channel
+    expansion. Intermediate buffers are kept and reused across frames of
+    the same size.
+    """
+
+    def __init__(self):
+        self.resized = None
+        self.converted = None
+        # Without Format_BGR888, convert to RGB into a reused buffer
+        self.bgr888 = BGR888
+
+    @staticmethod
+    def buffer(current, shape, dtype):
+        """Return 'current' if it matches 'shape', a new buffer otherwise.
+        """
+        if current is None or current.shape != shape or current.dtype != dtype:
+            return np.empty(shape, dtype=dtype)
+        return current
+
+    def fitSize(self, width, height):
+        """Return the size of a 'width' x 'height' image fitted to screen.
+        """
+        screen = QDesktopWidget().screenGeometry()
+        scale = min(1.0, screen.width() / float(width), screen.height() / float(height))
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def convert(self, image):
+        """Convert numpy BGR 'image' to a QPixmap fitted to screen.
+        Return the pixmap and the applied scale factor.
+        """
+        image, scale = self.fit(image)
+        return self.toPixmap(image), scale
+
+    def fit(self, image):
+        """Resize numpy 'image' to fit screen.
+        Return the resized image and the applied scale factor.
+        """
+        height, width = image.shape[:2]
+        w, h = self.fitSize(width, height)
+        if (w, h) == (width, height):
+            return image, 1.0
+        self.resized = self.buffer(self.resized, (h, w) + image.shape[2:], image.dtype)
+        cv2.resize(image, (w, h), self.resized, interpolation=cv2.INTER_AREA)
+        return self.resized, w / float(width)
+
+    def toPixmap(self, image):
+        """Convert numpy BGR 'image' to a QPixmap without resizing it.
+        """
+        image = np.ascontiguousarray(image)
+        h, w = image.shape[:2]
+        if image.ndim == 3 and image.shape[2] == 3 and not self.bgr888:
+            self.converted = self.buffer(self.converted, image.shape, image.dtype)
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, self.converted)
+            image = self.converted
+            qimg = QImage(image.data, w, h, image.strides[0], QImage.Format_RGB888)
+        else:
+            qimg = wrapQImage(image)
+        return QPixmap.fromImage(qimg)
 
 def scaleRect(rect, scale):
     """Scale 'rect' with a factor of 'scale'.
     """
     x, y, w, h = rect
     return (x * scale, y * scale, w * scale, h * scale)
-
-def getObjectsTree(qTreeView, table, indexes, extract):
-    """Create an object tree representation from QTreeView.
-    """
-    tree = Tree()
-    model = qTreeView.model()
-    extracted = tree.fromQStandardItemModel(model, table, indexes, extract)
-    return tree, extracted
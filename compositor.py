@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# compositor.py
+#
+# Author: Yann KOETH
+# Created: Tue Oct 20 14:21:05 2026 (+0200)
+# Last-Updated: Tue Oct 20 17:48:31 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 72
+#
+
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import tracing
+from redact import Redactor
+
+SHAPE_RECT = 'Rectangle'
+SHAPE_ELLIPSE = 'Ellipse'
+
+FILL_NONE = 'None'
+FILL_OUTLINE = 'Outline'
+FILL_COLOR = 'Color'
+FILL_BLUR = 'Blur'
+FILL_IMAGE = 'Image'
+FILL_MASK = 'Mask'
+
+BG_INPUT = 'Input'
+BG_COLOR = 'Color'
+BG_TRANSPARENT = 'Transparent'
+BG_IMAGE = 'Image'
+
+def checkerboard(width, height, blocksize=8):
+    """Create a BGR checkerboard.
+    """
+    coords = np.ogrid[0:height, 0:width]
+    idx = (coords[0] // blocksize + coords[1] // blocksize) % 2
+    vals = np.array([(191, 191, 191), (255, 255, 255)], dtype=np.uint8)
+    return vals[idx]
+
+def blend(dst, src, alpha):
+    """Blend 'src' over 'dst' in place with float 'alpha' in [0, 1].
+    'alpha' is None for an opaque 'src'.
+    """
+    if alpha is None:
+        dst[...] = src
+        return
+    if alpha.ndim == 2:
+        alpha = alpha[..., np.newaxis]
+    region = dst.astype(np.float32)
+    region += (src - region) * alpha
+    dst[...] = region
+
+class Compositor(object):
+    """Composite fills of detected objects over a BGR frame.
+
+    Each fill only touches the bounding box of its ROI, alpha blended with
+    a cached shape mask, so the cost follows the covered area. Consecutive
+    blur fills are redacted together by 'redactor'. Outlines, names and
+    tracking are left to the caller.
+    """
+
+    def __init__(self, redactor=None, maxMasks=256):
+        self.redactor = redactor or Redactor()
+        self.maxMasks = maxMasks
+        self.pending = []
+        # (shape, w, h) -> float32 alpha, None for an opaque rect
+        self.masks = OrderedDict()
+        self.checker = None
+        self.source = None
+        self.out = None
+
+    def shapeMask(self, shape, w, h):
+        """Return the alpha mask of 'shape' inscribed in a 'w' x 'h' box.
+        """
+        if shape != SHAPE_ELLIPSE:
+            return None
+        key = (shape, w, h)
+        mask = self.masks.pop(key, None)
+        if mask is None:
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.ellipse(mask, ((w / 2.0, h / 2.0), (w, h), 0), 255, -1, cv2.LINE_AA)
+            mask = mask.astype(np.float32) / 255
+            if len(self.masks) >= self.maxMasks:
+                self.masks.popitem(last=False)
+        self.masks[key] = mask
+        return mask
+
+    def clip(self, roi):
+        """Return the ROI box and its visible part as slices of the frame
+        and of the ROI, None if nothing is visible.
+        """
+        x, y, w, h = [int(round(v)) for v in roi]
+        height, width = self.out.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, width), min(y + h, height)
+        if w <= 0 or h <= 0 or x1 <= x0 or y1 <= y0:
+            return None
+        frame = (slice(y0, y1), slice(x0, x1))
+        local = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        return (w, h), frame, local
+
+    def begin(self, frame, background=BG_INPUT, color=(0, 0, 0), image=None):
+        """Start compositing on BGR 'frame', return the output buffer.
+        'image' is the background image scaled to the frame size.
+        """
+        self.source = frame
+        self.pending = []
+        if self.out is None or self.out.shape != frame.shape:
+            self.out = np.empty_like(frame)
+        if background == BG_INPUT:
+            self.out[...] = frame
+        elif background == BG_COLOR:
+            self.out[...] = color
+        else:
+            height, width = frame.shape[:2]
+            if self.checker is None or self.checker.shape[:2] != (height, width):
+                self.checker = checkerboard(width, height)
+            self.out[...] = self.checker
+            if background == BG_IMAGE and image is not None:
+                self.paste(self.out, image)
+        return self.out
+
+    @staticmethod
+    def paste(dst, image, mask=None):
+        """Blend BGR or BGRA 'image' over 'dst' through optional 'mask'.
+        """
+        alpha = mask
+        if image.shape[2] == 4:
+            a = image[..., 3].astype(np.float32) / 255
+            alpha = a if alpha is None else alpha * a
+            image = image[..., :3]
+        blend(dst, image, alpha)
+
+    def fill(self, roi, shape, fill, color=None, image=None, feather=None):
+        """Fill 'roi' of the output with 'fill'.
+        'color' is a BGR tuple, 'image' a BGR(A) image of the ROI size for
+        FILL_IMAGE and 'feather' a float alpha of the ROI size for FILL_MASK.
+        """
+        if fill not in (FILL_COLOR, FILL_BLUR, FILL_IMAGE, FILL_MASK):
+            return
+        if fill == FILL_BLUR:
+            self.pending.append((roi, shape))
+            return
+        self.flush()
+        clipped = self.clip(roi)
+        if clipped is None:
+            return
+        (w, h), frame, local = clipped
+        mask = self.shapeMask(shape, w, h)
+        if mask is not None:
+            mask = mask[local]
+        dst = self.out[frame]
+        if fill == FILL_COLOR:
+            blend(dst, np.array(color, dtype=np.float32), mask)
+        elif fill == FILL_IMAGE and image is not None:
+            self.paste(dst, image[local], mask)
+        elif fill == FILL_MASK:
+            if feather is not None:
+                feather = feather[local]
+                mask = feather if mask is None else mask * feather
+            blend(dst, self.source[frame], mask)
+
+    def flush(self):
+        """Redact the pending blur fills.
+        """
+        if not self.pending:
+            return
+        rois, masks = [], []
+        for roi, shape in self.pending:
+            rois.append(roi)
+            w, h = [int(round(v)) for v in roi[2:]]
+            masks.append(self.shapeMask(shape, w, h) if w > 0 and h > 0 else None)
+        self.pending = []
+        with tracing.span('redact', rois=len(rois)):
+            self.redactor.redact(self.out, rois, masks)
+
+    def end(self):
+        """Finish compositing, return the output buffer.
+        """
+        self.flush()
+        return self.out
@@ -13,6 +13,9 @@ import sys
 import os
 import cv2
 import time
+import socket
+import threading
+from collections import deque
 import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtWidgets import (QApplication, QWidget, QFileDialog, QPushButton,
@@ -24,11 +27,30 @@ from PyQt5.QtGui import QImage, QPixmap, QColor, QIcon, QPalette
 
 from window_ui import WindowUI
 import detector
-from detector import Detector, ClassifierParameters
+from detector import Detector, DetectorState, ClassifierParameters
 import common
 from tree import Tree
+import pipeline
+from pipeline import Pipeline
+from cache import AssetCache
+import compositor
+from compositor import Compositor
+import redact
+import tracing
+import metrics
+from plan import DetectionPlan
+
+RENDERED_FRAMES = metrics.registry.counter('detection_rendered_frames_total',
+                                           'Frames displayed by the media thread.')
+LATE_FRAMES = metrics.registry.counter('detection_late_frames_total',
+                                       'Frames processed slower than the source frame rate.')
+FPS = metrics.registry.gauge('detection_fps', 'Displayed frames per second.')
+RENDER_SECONDS = metrics.registry.histogram('detection_render_seconds',
+                                            'Render time of a frame in seconds.')
 
 class MediaThread(QtCore.QThread):
+    frameReady = QtCore.pyqtSignal(object)
+
     def __init__(self, mw):
         super(MediaThread, self).__init__(mw)
         self.mw = mw
@@ -37,6 +59,13 @@ class MediaThread(QtCore.QThread):
         self.nextFrame = False
         self.mutex = QtCore.QMutex()
         self.mode = None
+        self.opticalFlow = {}
+        self.pipelined = False
+        self.dropPolicy = pipeline.DROP_LATEST
+        self.workers = 1
+        self.pipeline = None
+        self.renderDone = threading.Event()
+        self.frameTimes = deque(maxlen=30)
 
     def stop(self):
         """Stop media thread.
@@ -51,9 +80,80 @@ class MediaThread(QtCore.QThread):
         del self.capture
         self.capture = None
 
+    def countFrame(self):
+        """Update the displayed frames metrics.
+        """
+        now = time.time()
+        self.frameTimes.append(now)
+        RENDERED_FRAMES.inc()
+        if len(self.frameTimes) > 1:
+            FPS.set((len(self.frameTimes) - 1) / (now - self.frameTimes[0]))
+
     def setNextFrameMode(self, enable):
         self.nextFrame = enable
 
+    def setPipeline(self, enable, dropPolicy=None, workers=None):
+        """Run capture, detection and rendering in separate stages.
+        """
+        self.pipelined = enable
+        if dropPolicy is not None:
+            self.dropPolicy = dropPolicy
+        if workers is not None:
+            self.workers = workers
+
+    def readFrame(self, mode):
+        """Read the next frame, None at the end of the media.
+        """
+        if not self.capture.isOpened():
+            return None
+        with tracing.span('capture'):
+            ret, frame = self.capture.read()
+            if frame is not None and mode == self.mw.SOURCE_CAMERA:
+                cv2.flip(frame, 1, frame)
+        return frame
+
+    def mainPipeline(self, mode):
+        """Pipelined main loop: capture and detect in background threads,
+        hand detected frames over to the GUI thread one at a time.
+        """
+        detector = self.mw.detector
+
+        def detect(img, state):
+            result = self.mw.detect(img, state=state)
+            return result, (state or detector.state).preprocessed
+
+        def newState():
+            # Workers detect frames out of order, each tracks its own frames
+            state = DetectorState()
+            detector.setOpticalFlow(self.opticalFlow.get(mode, False), state=state)
+            return state
+
+        self.pipeline = Pipeline(lambda: self.readFrame(mode), detect,
+                                 self.workers, policy=self.dropPolicy,
+                                 newState=newState if self.workers > 1 else None)
+        self.pipeline.start()
+        try:
+            while not self.stopped and not self.pipeline.finished():
+                frame = self.pipeline.get(timeout=0.1)
+                if frame is None:
+                    continue
+                self.renderDone.clear()
+                self.frameReady.emit(frame)
+                while not self.stopped and not self.renderDone.wait(0.1):
+                    pass
+                self.countFrame()
+        finally:
+            try:
+                self.pipeline.stop()
+            except Exception as e:
+                print "Detection failed: {}".format(e)
+
+    def setOpticalFlow(self, mode, enable):
+        """Enable detection every N frames with optical flow in between
+        for source 'mode'.
+        """
+        self.opticalFlow[mode] = enable
+
     def main(self, mode, path):
         """Main loop.
         """
@@ -61,23 +161,27 @@ class MediaThread(QtCore.QThread):
             self.capture = cv2.VideoCapture(path)
 
         self.mode = mode
+        self.mw.detector.setOpticalFlow(self.opticalFlow.get(mode, False))
 
         if not self.capture.isOpened():
             print "Couldn't read media " + path
+        elif self.pipelined and not self.nextFrame:
+            self.mainPipeline(mode)
+            return
+        sourceFps = self.capture.get(cv2.CAP_PROP_FPS)
         while self.capture.isOpened():
             if self.stopped:
                 break
-            ret, frame = self.capture.read()
+            start = time.time()
+            frame = self.readFrame(mode)
             if frame is None:
-                #self.capture = cv2.VideoCapture(path)
-                #ret, frame = self.capture.read()
-                if frame is None:
-                    break
-            if mode == self.mw.SOURCE_CAMERA:
-                cv2.flip(frame, 1, frame)
+                break
 
             self.mw.displayImage(frame)
             QApplication.processEvents()
+            self.countFrame()
+            if sourceFps > 0 and time.time() - start > 1.0 / sourceFps:
+                LATE_FRAMES.inc()
             if self.nextFrame:
                 self.setNextFrameMode(False)
                 break
@@ -87,6 +191,7 @@ class MediaThread(QtCore.QThread):
         """
         with QtCore.QMutexLocker(self.mutex):
             self.stopped = False
+        self.frameTimes.clear()
 
         mode = self.mw.getSourceMode()
         path = self.mw.sourcePath.text() if mode == self.mw.SOURCE_FILE else 0
@@ -104,26 +209,27 @@ class Window(QWidget, WindowUI):
     DISPLAY_INPUT = 'Input'
     DISPLAY_PREPROCESSED = 'Pre-processed'
 
-    SHAPE_RECT = 'Rectangle'
-    SHAPE_ELLIPSE = 'Ellipse'
+    SHAPE_RECT = compositor.SHAPE_RECT
+    SHAPE_ELLIPSE = compositor.SHAPE_ELLIPSE
 
-    FILL_NONE = 'None'
-    FILL_OUTLINE = 'Outline'
-    FILL_COLOR = 'Color'
-    FILL_BLUR = 'Blur'
-    FILL_IMAGE = 'Image'
-    FILL_MASK = 'Mask'
+    FILL_NONE = compositor.FILL_NONE
+    FILL_OUTLINE = compositor.FILL_OUTLINE
+    FILL_COLOR = compositor.FILL_COLOR
+    FILL_BLUR = compositor.FILL_BLUR
+    FILL_IMAGE = compositor.FILL_IMAGE
+    FILL_MASK = compositor.FILL_MASK
 
-    BG_INPUT = 'Input'
-    BG_COLOR = 'Color'
-    BG_TRANSPARENT = 'Transparent'
-    BG_IMAGE = 'Image'
+    BG_INPUT = compositor.BG_INPUT
+    BG_COLOR = compositor.BG_COLOR
+    BG_TRANSPARENT = compositor.BG_TRANSPARENT
+    BG_IMAGE = compositor.BG_IMAGE
 
     __sourceModes = [SOURCE_FILE, SOURCE_CAMERA]
     __displayModes = [DISPLAY_INPUT, DISPLAY_PREPROCESSED]
     __shapeModes = [SHAPE_RECT, SHAPE_ELLIPSE]
     __fillModes = [FILL_NONE, FILL_OUTLINE, FILL_BLUR, FILL_IMAGE, FILL_MASK, FILL_COLOR]
     __bgModes = [BG_INPUT, BG_COLOR, BG_TRANSPARENT, BG_IMAGE]
+    __dropPolicies = [pipeline.DROP_LATEST, pipeline.DROP_OLDEST, pipeline.DROP_NONE]
 
     IMAGE_FILTERS = '*.jpg *.png *.jpeg *.bmp'
     VIDEO_FILTERS = '*.avi *.mp4 *.mov'
@@ -136,13 +242,20 @@ class Window(QWidget, WindowUI):
 
         self.detector = Detector()
         self.mediaThread = MediaThread(self)
+        self.displayConverter = common.DisplayConverter()
+        self.assets = AssetCache(self.loadImage, self.scaleImage, lambda img: img.nbytes)
+        self.compositor = Compositor()
+        self.metricsServer = None
         sys.stdout = common.EmittingStream(textWritten=self.normalOutputWritten)
         self.debugSignal.connect(self.debugTable)
+        self.mediaThread.frameReady.connect(self.renderFrame)
         self.currentFrame = None
         self.bgColor = QColor(255, 255, 255)
         self.bgPath = ''
 
         self.classifiersParameters = {}
+        self.plan = None
+        self.planLock = threading.Lock()
 
         self.setupUI()
         self.populateUI()
@@ -168,10 +281,18 @@ class Window(QWidget, WindowUI):
             self.fillCBox.addItem(fillMode)
         for bgMode in self.__bgModes:
             self.bgCBox.addItem(bgMode)
+        for dropPolicy in self.__dropPolicies:
+            self.dropPolicyCBox.addItem(dropPolicy)
+        for blurMode in redact.MODES:
+            self.blurModeCBox.addItem(blurMode)
+        self.blurStrength.setValue(self.compositor.redactor.strength)
         model = QtGui.QStandardItemModel(self)
         func = lambda node, parent: self.populateTree(node, parent)
         Detector.getDefaultObjectsTree().map(model, func)
         self.objectsTree.setModel(model)
+        for signal in (model.rowsInserted, model.rowsRemoved, model.rowsMoved,
+                       model.dataChanged, model.layoutChanged, model.modelReset):
+            signal.connect(self.updatePlan)
 
     def connectUI(self):
         self.hsplitter.splitterMoved.connect(self.splitterMoved)
@@ -185,12 +306,16 @@ class Window(QWidget, WindowUI):
         self.refreshButton.clicked.connect(self.refresh)
         self.nextFrameButton.clicked.connect(self.nextFrame)
         self.objectsTree.customSelectionChanged.connect(self.showClassifierParameters)
+        self.objectsTree.customSelectionChanged.connect(self.updatePlan)
         self.colorPicker.clicked.connect(self.colorDialog)
         self.classifierName.textChanged.connect(self.updateClassifierParameters)
         self.scaleFactor.valueChanged.connect(self.updateScaleFactor)
         self.minNeighbors.valueChanged.connect(self.updateMinNeighbors)
         self.minWidth.valueChanged.connect(self.updateMinWidth)
         self.minHeight.valueChanged.connect(self.updateMinHeight)
+        self.detectionScale.valueChanged.connect(self.updateDetectionScale)
+        self.detectionSize.valueChanged.connect(self.updatePlan)
+        self.equalizeHist.stateChanged.connect(self.updatePlan)
         self.shapeCBox.currentIndexChanged.connect(self.updateShape)
         self.fillCBox.currentIndexChanged.connect(self.updateFill)
         self.autoNeighbors.clicked.connect(self.calcNeighbors)
@@ -201,6 +326,18 @@ class Window(QWidget, WindowUI):
         self.bgColorPicker.clicked.connect(self.bgColorDialog)
         self.bgPathButton.clicked.connect(self.bgPathDialog)
         self.bgCBox.currentIndexChanged.connect(self.toggleBgParams)
+        self.threads.valueChanged.connect(self.updateThreads)
+        self.opticalFlow.stateChanged.connect(self.updateOpticalFlow)
+        self.pipelined.stateChanged.connect(self.updatePipeline)
+        self.tracing.stateChanged.connect(self.updateTracing)
+        self.exportTraceButton.clicked.connect(self.exportTrace)
+        self.metricsPort.editingFinished.connect(self.updateMetricsPort)
+        self.blurModeCBox.currentIndexChanged.connect(self.updateBlur)
+        self.blurStrength.valueChanged.connect(self.updateBlur)
+        self.dropPolicyCBox.currentIndexChanged.connect(self.updatePipeline)
+        self.pipelineWorkers.valueChanged.connect(self.updatePipeline)
+        self.temporal.stateChanged.connect(self.updateTemporal)
+        self.keyframeInterval.valueChanged.connect(self.updateKeyframeInterval)
 
     def initUI(self):
         self.showClassifierParameters(None, None)
@@ -209,6 +346,8 @@ class Window(QWidget, WindowUI):
         self.toggleBgParams(self.bgCBox.currentIndex())
         common.setPickerColor(self.bgColor, self.bgColorPicker)
         self.togglePlayButton(False)
+        self.keyframeInterval.setValue(self.detector.keyframeInterval)
+        self.updatePlan()
 
     ########################################################
     # Utils
@@ -239,161 +378,91 @@ class Window(QWidget, WindowUI):
         parent.appendRow(item)
         return item
 
-    def getMask(self, pixmap, x, y, w, h, shape, overlay,
-                bg=QtCore.Qt.transparent, fg=QtCore.Qt.black, progressive=False):
-        """Create a shape mask with the same size of pixmap.
-        """
-        mask = QPixmap(pixmap.width(), pixmap.height())
-        mask.fill(bg)
-        path = QtGui.QPainterPath()
-
-        if progressive:
-            progressive = QPixmap(pixmap.width(), pixmap.height())
-            progressive.fill(QtCore.Qt.transparent)
-            progressiveMask = QPixmap(self.MASK_PATH)
-            progressiveMask = progressiveMask.scaled(w, h, QtCore.Qt.IgnoreAspectRatio)
-            progressivePainter = QtGui.QPainter(progressive)
-            progressivePainter.drawPixmap(x, y, progressiveMask)
-            del progressivePainter
-            fg = QtGui.QBrush(progressive)
-
-        painter = QtGui.QPainter(mask)
-        if shape == self.SHAPE_ELLIPSE:
-            path.addEllipse(x, y, w, h)
-            painter.fillPath(path, fg)
-        elif shape == self.SHAPE_RECT:
-            painter.fillRect(x, y, w, h, fg)
-
-        painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceAtop)
-        if overlay:
-            painter.drawPixmap(0, 0, overlay)
-        return mask
+    @staticmethod
+    def loadImage(path):
+        """Load a BGR(A) image asset, None if invalid.
+        """
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is not None and img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return img
+
+    @staticmethod
+    def scaleImage(img, size):
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    def getFeather(self, w, h):
+        """Return the progressive mask alpha at size 'w' x 'h'.
+        """
+        def build():
+            mask = self.assets.get(self.MASK_PATH, (w, h))
+            if mask is None or mask.shape[2] != 4:
+                return None
+            return mask[..., 3].astype(np.float32) / 255
+        return self.assets.generate(('feather', self.assets.stamp(self.MASK_PATH)),
+                                    (w, h), build)
 
     def drawTracking(self, painter, tracking, scale):
-        """Draw lines between each position in tracking list.
+        """Draw lines between each position in tracking history.
         """
-        if not tracking:
+        if not tracking or tracking.count < 2:
             return
-        hashTable = {}
-        # Group tracks by item hash
-        for track in tracking:
-            for rect, hash in track:
-                x, y, w, h = common.scaleRect(rect, scale)
-                x, y = x + w / 2, y + h / 2
-                if hash in hashTable:
-                    hashTable[hash].append((x, y))
-                else:
-                    hashTable[hash] = [(x, y)]
-        # Draw
-        for hash, points in hashTable.iteritems():
-            prev = None
-            for point in points:
-                if prev:
-                    x1, y1 = point
-                    x2, y2 = prev
-                    painter.drawLine(x1, y1, x2, y2)
-                prev = point
-
-    def drawBackground(self, pixmap):
-        """Draw background in pixmap.
-        """
-        w, h = pixmap.width(), pixmap.height()
+        centers = tracking.centers() * scale
+        for track in xrange(centers.shape[1]):
+            points = [QtCore.QPointF(x, y) for x, y in centers[:, track]]
+            painter.drawPolyline(QtGui.QPolygonF(points))
+
+    def compose(self, img, rectsTree, scale):
+        """Composite background and fills of 'rectsTree' over numpy 'img'.
+        """
+        h, w = img.shape[:2]
         mode = self.__bgModes[self.bgCBox.currentIndex()]
-        source = QPixmap(pixmap)
-        painter = QtGui.QPainter(pixmap)
-        if mode == self.BG_COLOR:
-            painter.fillRect(0, 0, w, h, self.bgColor)
-        if mode == self.BG_TRANSPARENT or mode == self.BG_IMAGE or mode == self.BG_INPUT:
-            painter.drawPixmap(0, 0, common.checkerboard(pixmap.size()))
+        bgImage = None
         if mode == self.BG_IMAGE and self.bgPath:
-            bgPixmap = QPixmap(self.bgPath)
-            if not bgPixmap.isNull():
-                bgPixmap = bgPixmap.scaled(w, h, QtCore.Qt.IgnoreAspectRatio)
-                painter.drawPixmap(0, 0, bgPixmap)
-        if mode == self.BG_INPUT:
-            painter.drawPixmap(0, 0, source)
-
-    def fillMask(self, pixmap, painter, roi, param, source):
-        """Draw mask in roi.
-        """
-        x, y, w, h = roi
-        masked = self.getMask(pixmap, x, y, w, h, param.shape,
-                              source, progressive=True)
-        painter.drawPixmap(0, 0, masked)
-
-    def fillBlur(self, pixmap, painter, roi, param, source):
-        """Draw blur in roi.
-        """
-        x, y, w, h = roi
-        blurred = self.getMask(pixmap, x, y, w, h, param.shape,
-                               common.blurPixmap(pixmap, 20))
-        painter.drawPixmap(0, 0, blurred)
-
-
-    def fillImage(self, pixmap, painter, roi, param, source):
-        """Draw image in roi.
-        """
-        x, y, w, h = roi
-        fillPixmap = QPixmap(param.fillPath)
-        if not fillPixmap.isNull():
-            fillPixmap = fillPixmap.scaled(w, h, QtCore.Qt.IgnoreAspectRatio)
-            mask = self.getMask(pixmap, x, y, w, h, param.shape, None,
-                                QtCore.Qt.white, QtCore.Qt.black)
-            painter.setClipRegion(QtGui.QRegion(QtGui.QBitmap(mask)))
-            painter.drawPixmap(x, y, fillPixmap)
-            painter.setClipping(False)
-
-    def fillColor(self, pixmap, painter, roi, param, source):
-        """Draw color in roi.
-        """
-        x, y, w, h = roi
-        if param.shape == self.SHAPE_ELLIPSE:
-            path = QtGui.QPainterPath()
-            path.addEllipse(x, y, w, h)
-            painter.fillPath(path, param.color)
-        elif param.shape == self.SHAPE_RECT:
-            painter.fillRect(x, y, w, h, param.color)
-
-    def fillOutline(self, pixmap, painter, roi, param, source):
-        """Draw outline in roi.
-        """
-        x, y, w, h = roi
-        drawFunc = painter.drawRect
-        if param.shape == self.SHAPE_ELLIPSE:
-            drawFunc = painter.drawEllipse
-        drawFunc(x, y, w, h)
-
-    def drawRects(self, source, rectsTree, scale):
-        """Draw rectangles in 'rectsTree' on 'source'.
-        """
-        pixmap = QPixmap(source)
-        self.drawBackground(pixmap)
+            bgImage = self.assets.get(self.bgPath, (w, h))
+        bgColor = self.bgColor.blue(), self.bgColor.green(), self.bgColor.red()
+        self.compositor.begin(img, mode, bgColor, bgImage)
+
+        def fillRect(node, parentHash):
+            roi, param, tracking = node.data
+            x, y, w, h = common.scaleRect(roi, scale)
+            size = (max(1, int(round(w))), max(1, int(round(h))))
+            color = param.color.blue(), param.color.green(), param.color.red()
+            image = feather = None
+            if param.fill == self.FILL_IMAGE:
+                image = self.assets.get(param.fillPath, size)
+            elif param.fill == self.FILL_MASK:
+                feather = self.getFeather(*size)
+            with tracing.span('fill.' + param.fill, roi=size):
+                self.compositor.fill((x, y, w, h), param.shape, param.fill,
+                                     color, image, feather)
+            return param.hash
+
+        rectsTree.map(None, fillRect)
+        return self.compositor.end()
+
+    def drawRects(self, pixmap, rectsTree, scale):
+        """Draw outlines, tracking and names of 'rectsTree' on 'pixmap'.
+        """
+        painter = QtGui.QPainter(pixmap)
 
         def drawRect(node, parentHash):
-            painter = QtGui.QPainter(pixmap)
             roi, param, tracking = node.data
             x, y, w, h = common.scaleRect(roi, scale)
             painter.setPen(param.color)
-            funcTable = {
-                self.FILL_MASK: self.fillMask,
-                self.FILL_BLUR: self.fillBlur,
-                self.FILL_IMAGE: self.fillImage,
-                self.FILL_COLOR: self.fillColor,
-                self.FILL_OUTLINE: self.fillOutline
-                         }
-            for fill, func in funcTable.iteritems():
-                if param.fill == fill:
-                    func(pixmap, painter, (x, y, w, h), param, source)
+            if param.fill == self.FILL_OUTLINE:
+                if param.shape == self.SHAPE_ELLIPSE:
+                    painter.drawEllipse(x, y, w, h)
+                else:
+                    painter.drawRect(x, y, w, h)
             if param.tracking:
                 self.drawTracking(painter, tracking, scale)
             if param.showName:
                 painter.drawText(x, y, param.name)
             return param.hash
 
-        h, w = pixmap.height(), pixmap.width()
         rectsTree.map(None, drawRect)
-        painter = QtGui.QPainter(source)
-        painter.drawPixmap(0, 0, pixmap)
+        painter.end()
 
     def debugTable(self, args, append=False):
         """Display debug info into table.
@@ -421,39 +490,96 @@ class Window(QWidget, WindowUI):
         """
         self.debugSignal.emit(args, append)
 
-    def detect(self, img, autoNeighbors=False, autoNeighborsParam=None):
-        """Detect objects in img.
+    def detect(self, img, autoNeighbors=False, autoNeighborsParam=None, state=None):
+        """Detect objects in img, with the detector state 'state' if set.
+        Called by media threads, only 'autoNeighbors' runs on the GUI thread.
         """
         self.currentFrame = img
-        item = None
-        indexes = self.objectsTree.selectedIndexes()
-        if autoNeighbors and indexes:
+        with self.planLock:
+            plan, equalizeHist, detectionSize = self.plan
+        indexes = self.objectsTree.selectedIndexes() if autoNeighbors else None
+        if indexes:
+            # autoNeighbors updates the live parameters of the selected item
             item = self.objectsTree.model().itemFromIndex(indexes[0])
-        # Detect on full size image
-        tree, extracted = common.getObjectsTree(self.objectsTree,
-                                                self.classifiersParameters,
-                                                indexes, item)
-        equalizeHist = self.equalizeHist.isChecked()
-        rectsTree = self.detector.detect(img, tree, equalizeHist,
-                                         self.debugEmitter, extracted, autoNeighborsParam)
+            plan = DetectionPlan.fromModel(self.objectsTree.model(),
+                                           self.classifiersParameters,
+                                           indexes, item, freeze=False)
+        # Detect on image downscaled to detection size, rects are full size
+        rectsTree = self.detector.detect(img, plan.tree, equalizeHist,
+                                         self.debugEmitter, plan.extracted, autoNeighborsParam,
+                                         detectionSize, state=state)
         return rectsTree
 
+    def updatePlan(self, *args):
+        """Compile the detection plan and snapshot the detection options on
+        the GUI thread, media threads never read the widgets.
+        """
+        plan = DetectionPlan.fromModel(self.objectsTree.model(),
+                                       self.classifiersParameters,
+                                       self.objectsTree.selectedIndexes())
+        with self.planLock:
+            self.plan = (plan, self.equalizeHist.isChecked(), self.detectionSize.value())
+
     def displayImage(self, img):
         """Display numpy 'img' in 'mediaLabel'.
         """
-        rectsTree = self.detect(img)
+        self.renderImage(img, self.detect(img))
+
+    def renderFrame(self, frame):
+        """Render a frame detected by the media pipeline.
+        """
+        start = time.time()
+        self.renderImage(frame.image, frame.result, frame.preprocessed)
+        if self.mediaThread.pipeline:
+            self.mediaThread.pipeline.rendered(frame, start)
+        self.mediaThread.renderDone.set()
+
+    def renderImage(self, img, rectsTree, preprocessed=None):
+        """Display numpy 'img' and detected 'rectsTree' in 'mediaLabel'.
+        'preprocessed' is the preprocessed 'img', the last one of the
+        detector if not set.
+        """
         displayMode = self.__displayModes[self.displayCBox.currentIndex()]
         if displayMode == self.DISPLAY_PREPROCESSED:
-            img = self.detector.preprocessed
-        pixmap = common.np2Qt(img)
-        w = float(pixmap.width())
-        # Scale image
-        pixmap = common.fitImageToScreen(pixmap)
-        scaleFactor = pixmap.width() / w
-        # Draw scaled rectangles
-        self.drawRects(pixmap, rectsTree, scaleFactor)
-        self.mediaLabel.setPixmap(pixmap)
-        self.mediaLabel.setFixedSize(pixmap.size())
+            img = preprocessed if preprocessed is not None else self.detector.preprocessed
+        start = time.time()
+        with tracing.span('render'):
+            with tracing.span('render.fit'):
+                img, scaleFactor = self.displayConverter.fit(img)
+            with tracing.span('render.compose'):
+                img = self.compose(img, rectsTree, scaleFactor)
+            with tracing.span('render.np2Qt'):
+                pixmap = self.displayConverter.toPixmap(img)
+            # Draw scaled rectangles
+            with tracing.span('render.drawRects'):
+                self.drawRects(pixmap, rectsTree, scaleFactor)
+            if self.metricsOverlay.isChecked():
+                self.drawMetrics(pixmap)
+            self.mediaLabel.setPixmap(pixmap)
+            self.mediaLabel.setFixedSize(pixmap.size())
+        RENDER_SECONDS.observe(time.time() - start)
+
+    def drawMetrics(self, pixmap):
+        """Draw FPS, latency percentiles and dropped frames on 'pixmap'.
+        """
+        detect = detector.DETECT_SECONDS
+        render = RENDER_SECONDS
+        dropped = pipeline.DROPPED_FRAMES.total()
+        lines = ['{:.1f} FPS'.format(FPS.get()),
+                 'detect p50 {:.1f} ms  p99 {:.1f} ms'.format(detect.quantile(0.5) * 1000,
+                                                             detect.quantile(0.99) * 1000),
+                 'render p50 {:.1f} ms  p99 {:.1f} ms'.format(render.quantile(0.5) * 1000,
+                                                             render.quantile(0.99) * 1000),
+                 '{:.0f} dropped  {:.0f} late'.format(dropped, LATE_FRAMES.get())]
+        painter = QtGui.QPainter(pixmap)
+        fontMetrics = painter.fontMetrics()
+        height = fontMetrics.height()
+        width = max(fontMetrics.width(line) for line in lines)
+        painter.fillRect(4, 4, width + 8, height * len(lines) + 8, QColor(0, 0, 0, 160))
+        painter.setPen(QColor(255, 255, 255))
+        for i, line in enumerate(lines):
+            painter.drawText(8, 8 + fontMetrics.ascent() + i * height, line)
+        painter.end()
 
     def displayMedia(self, path):
         """Load and display media.
@@ -540,6 +666,7 @@ class Window(QWidget, WindowUI):
         if path:
             item, param = self.getCurrentClassifierParameters()
             param.fillPath = path
+            self.updatePlan()
 
     def loadMedia(self):
         """Load image or video.
@@ -557,6 +684,8 @@ class Window(QWidget, WindowUI):
     def togglePath(self, index):
         """Hide path for camera mode.
         """
+        mode = self.__sourceModes[index]
+        self.opticalFlow.setChecked(self.mediaThread.opticalFlow.get(mode, False))
         if self.__sourceModes[index] == self.SOURCE_CAMERA:
             self.sourcePath.hide()
             self.sourcePathButton.hide()
@@ -604,6 +733,71 @@ class Window(QWidget, WindowUI):
         else:
             self.bgPathButton.hide()
 
+    def updateTracing(self, checked):
+        """Enable or disable tracing.
+        """
+        tracing.tracer.enable(checked)
+
+    def exportTrace(self):
+        """Save recorded spans as a Chrome trace and print their summary.
+        """
+        path, filters = QFileDialog.getSaveFileName(self, self.tr('Export trace'),
+                                                    'trace.json', 'JSON (*.json)')
+        if path:
+            tracing.tracer.export(path)
+            print tracing.tracer.formatSummary()
+
+    def updateMetricsPort(self):
+        """Serve the metrics on the selected local port, 0 to stop.
+        """
+        port = self.metricsPort.value()
+        if self.metricsServer and self.metricsServer.port == port:
+            return
+        if self.metricsServer:
+            self.metricsServer.stop()
+            self.metricsServer = None
+        if not port:
+            return
+        try:
+            self.metricsServer = metrics.MetricsServer(port).start()
+            print 'Serving metrics on http://127.0.0.1:{}/metrics'.format(port)
+        except socket.error as e:
+            print "Couldn't serve metrics on port {}: {}".format(port, e)
+
+    def updateBlur(self, *args):
+        """Update blur fill mode and strength.
+        """
+        redactor = self.compositor.redactor
+        redactor.mode = redact.MODES[self.blurModeCBox.currentIndex()]
+        redactor.strength = self.blurStrength.value()
+
+    def updatePipeline(self, *args):
+        """Update media pipeline parameters, applied on next play.
+        """
+        policy = self.__dropPolicies[self.dropPolicyCBox.currentIndex()]
+        self.mediaThread.setPipeline(self.pipelined.isChecked(), policy,
+                                     self.pipelineWorkers.value())
+
+    def updateOpticalFlow(self, checked):
+        """Toggle optical flow tracking for the current source.
+        """
+        self.mediaThread.setOpticalFlow(self.getSourceMode(), bool(checked))
+
+    def updateThreads(self, value):
+        """Update the number of detection threads.
+        """
+        self.detector.setThreads(value)
+
+    def updateTemporal(self, checked):
+        """Toggle the search around previous detections between keyframes.
+        """
+        self.detector.temporal = bool(checked)
+
+    def updateKeyframeInterval(self, value):
+        """Update the number of frames between two full frame detections.
+        """
+        self.detector.keyframeInterval = value
+
     def calcNeighbors(self):
         """Automatically calculate minimum neighbors.
         """
@@ -614,6 +808,7 @@ class Window(QWidget, WindowUI):
             self.mediaThread.wait()
         self.detect(self.currentFrame, autoNeighbors=True,
                     autoNeighborsParam=self.autoNeighborsParam.value())
+        self.updatePlan()
         self.showClassifierParameters(None, None)
         if running:
             self.displayMedia(self.sourcePath.text())
@@ -630,6 +825,7 @@ class Window(QWidget, WindowUI):
         if color:
             item.setIcon(self.getIcon(color))
             param.color = color
+        self.updatePlan()
 
     def updateStabilize(self, checked):
         """Update stabilize classifier parameter.
@@ -641,6 +837,7 @@ class Window(QWidget, WindowUI):
             self.mediaThread.wait()
         item, param = self.getCurrentClassifierParameters()
         param.stabilize = checked
+        self.updatePlan()
         self.detect(self.currentFrame)
         if running:
             self.displayMedia(self.sourcePath.text())
@@ -652,18 +849,21 @@ class Window(QWidget, WindowUI):
         """
         item, param = self.getCurrentClassifierParameters()
         param.tracking = checked
+        self.updatePlan()
 
     def updateScaleFactor(self, value):
         """Update scale factor classifier parameter.
         """
         item, param = self.getCurrentClassifierParameters()
         param.scaleFactor = value
+        self.updatePlan()
 
     def updateShape(self, index):
         """Update shape classifier parameter.
         """
         item, param = self.getCurrentClassifierParameters()
         param.shape = self.__shapeModes[index]
+        self.updatePlan()
 
     def updateFill(self, index):
         """Update fill classifier parameter.
@@ -671,18 +871,21 @@ class Window(QWidget, WindowUI):
         item, param = self.getCurrentClassifierParameters()
         param.fill = self.__fillModes[index]
         self.toggleFillPath()
+        self.updatePlan()
 
     def updateShowName(self, checked):
         """Update show name classifier parameter.
         """
         item, param = self.getCurrentClassifierParameters()
         param.showName = checked
+        self.updatePlan()
 
     def updateMinNeighbors(self, value):
         """Update min neighbors classifier parameter.
         """
         item, param = self.getCurrentClassifierParameters()
         param.minNeighbors = value
+        self.updatePlan()
 
     def updateMinWidth(self, value):
         """Update minimum width classifier parameter.
@@ -690,6 +893,7 @@ class Window(QWidget, WindowUI):
         item, param = self.getCurrentClassifierParameters()
         w, h = param.minSize
         param.minSize = (value, h)
+        self.updatePlan()
 
     def updateMinHeight(self, value):
         """Update minimum height classifier parameter.
@@ -697,6 +901,14 @@ class Window(QWidget, WindowUI):
         item, param = self.getCurrentClassifierParameters()
         w, h = param.minSize
         param.minSize = (w, value)
+        self.updatePlan()
+
+    def updateDetectionScale(self, value):
+        """Update detection scale classifier parameter.
+        """
+        item, param = self.getCurrentClassifierParameters()
+        param.detectionScale = value
+        self.updatePlan()
 
     def showClassifierParameters(self, selected, deselected):
         """Show the selected classifier parameters.
@@ -716,6 +928,7 @@ class Window(QWidget, WindowUI):
             w, h = param.minSize
             self.minWidth.setValue(w)
             self.minHeight.setValue(h)
+            self.detectionScale.setValue(param.detectionScale)
             self.shapeCBox.setCurrentIndex(self.__shapeModes.index(param.shape))
             self.fillCBox.setCurrentIndex(self.__fillModes.index(param.fill))
             self.stabilize.setChecked(param.stabilize)
@@ -9,15 +9,32 @@
 #     Update #: 698
 #
 
+import os
 import cv2
 import numpy as np
+import sys
 import time
+import Queue
+import threading
+from multiprocessing.pool import ThreadPool
 from tree import Tree, Node
+from results import ResultsBuilder
+from pool import ClassifierPool
+import tracker
+import tracing
+import metrics
+
+DETECT_SECONDS = metrics.registry.histogram('detection_detect_seconds',
+                                            'Detection time of a frame in seconds.')
+DETECTED_FRAMES = metrics.registry.counter('detection_detected_frames_total',
+                                           'Detected frames, by keyframe or optical flow.')
+DETECTED_OBJECTS = metrics.registry.counter('detection_objects_total',
+                                            'Detected objects by classifier.')
 
 class ClassifierParameters:
     def __init__(self, hash, classifier, name, color, shape, fill, fillPath="",
                  stabilize=False, tracking=False, showName=True,
-                 scaleFactor=1.3, minNeighbors=4, minSize=(0, 0)):
+                 scaleFactor=1.3, minNeighbors=4, minSize=(0, 0), detectionScale=1.0):
         self.hash = hash
         self.classifier = classifier
         self.shape = shape
@@ -31,6 +48,28 @@ class ClassifierParameters:
         self.stabilize = stabilize
         self.tracking = tracking
         self.showName = showName
+        self.detectionScale = detectionScale
+
+class DetectorState(object):
+    """State kept between the frames of a stream: stabilized objects,
+    temporal search windows and optical flow.
+    """
+
+    def __init__(self):
+        self.preprocessed = None
+        self.stored = {}
+        self.frameIndex = 0
+        self.searchRects = {}
+        self.flow = None
+        self.flowRects = {}
+        # Guards the state when detecting concurrently
+        self.lock = threading.RLock()
+
+def stateProperty(name):
+    """Detector attribute stored in its default DetectorState.
+    """
+    return property(lambda self: getattr(self.state, name),
+                    lambda self, value: setattr(self.state, name, value))
 
 class Detector(object):
 
@@ -88,80 +127,168 @@ class Detector(object):
     def getDefaultAvailableObjects():
         return Detector.__classifiersPaths.keys()
 
+    @staticmethod
+    def getClassifierPath(classifier):
+        """Return the cascade path of 'classifier', relative to the
+        current directory when possible, else to this module.
+        """
+        path = Detector.__classifiersPaths[classifier]
+        if not os.path.exists(path):
+            root = os.path.dirname(os.path.abspath(__file__))
+            path = os.path.join(root, path)
+        return path
+
     @staticmethod
     def getDefaultHSVColor(classifier):
         classifiers = Detector.__classifiersPaths.keys()
         return (classifiers.index(classifier) / float(len(classifiers)), 1, 1)
 
-    def __init__(self):
-        self.preprocessed = None
-        self.stored = {}
+    GROUP_EPS = 0.2
+    # Frames between two full size timings of a downscaled classifier
+    SPEEDUP_INTERVAL = 100
+
+    def __init__(self, threads=0, temporal=False, keyframeInterval=10,
+                 searchMargin=0.5, trackingCost=tracker.COST_DISTANCE,
+                 trackingGate=None, historyLength=100, historyTimeout=100,
+                 newTracks=False, confirmFrames=3):
+        self.state = DetectorState()
         self.swapMap = {}
+        paths = dict((obj, self.getClassifierPath(obj))
+                     for obj in self.__classifiersPaths)
+        self.classifiers = ClassifierPool(paths)
+        self.threads = threads
+        self.threadPool = None
+        # Maps running in each pool, a retired pool is closed after them
+        self.poolUsers = {}
+        self.poolLock = threading.Lock()
+        self.temporal = temporal
+        self.keyframeInterval = keyframeInterval
+        self.searchMargin = searchMargin
+        self.trackingCost = trackingCost
+        self.trackingGate = trackingGate
+        self.historyLength = historyLength
+        self.historyTimeout = historyTimeout
+        self.newTracks = newTracks
+        self.confirmFrames = confirmFrames
+        # Classifier hash -> (full size seconds per pixel, frame index)
+        self.fullSizeTimes = {}
+
+    preprocessed = stateProperty('preprocessed')
+    stored = stateProperty('stored')
+    frameIndex = stateProperty('frameIndex')
+    searchRects = stateProperty('searchRects')
+    flow = stateProperty('flow')
+    flowRects = stateProperty('flowRects')
+    lock = stateProperty('lock')
+
+    def warmUp(self, objects=None):
+        """Load classifiers of 'objects' (all by default) before detecting.
+        Raise pool.ClassifierError if a cascade cannot be loaded.
+        """
+        self.classifiers.warmUp(objects)
 
     def preprocess(self, img, equalizeHist):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         return (cv2.equalizeHist(gray) if equalizeHist else gray)
 
-    def dist(self, a, b):
-        x1, y1, w1, h1 = a
-        x2, y2, w2, h2 = b
-        x1, y1 = x1 + w1 / 2, y1 + h1 / 2
-        x2, y2 = x2 + w2 / 2, y2 + h2 / 2
-        return np.sqrt(((x2 - x1) ** 2) + ((y2 - y1) ** 2))
-
-    def getNearest(self, rect, rects):
-        nearest, dist = None, 0
-        for r in rects:
-            d = self.dist(r, rect)
-            if nearest is None or d < dist:
-                nearest, dist = r, d
-        return nearest
-
-    def retreiveRect(self, rect, current, previous):
-        nearest = self.getNearest(rect, current)
-        previous = list(zip(*previous)[0])
-        current = list(current)
-        near = None
-        while previous and nearest:
-            near = self.getNearest(nearest, previous)
-            if near != rect:
-                previous.remove(near)
-                current.remove(nearest)
-                nearest = self.getNearest(rect, current)
-            else:
-                return nearest
-        return nearest
-
-    def retreiveRects(self, current, previous):
-        rects, hashs = [], []
-        for i, (previousRect, hash) in enumerate(previous):
-            nearestRect = self.retreiveRect(previousRect, current, previous[i:])
-            if not nearestRect:
-                nearestRect = previousRect
-            else:
-                del current[current.index(nearestRect)]
-            rects.append(nearestRect)
-            hashs.append(hash)
-        return rects, hashs
+    def associate(self, current, previous):
+        """Return (previous, current) index pairs of associated rects.
+        """
+        if not len(current) or not len(previous):
+            return []
+        cost = tracker.costMatrix(previous, current, self.trackingCost)
+        return tracker.assign(cost, self.trackingGate)
 
-    def stabilize(self, param, parentHash, rects):
+    def stabilize(self, param, parentHash, rects, state=None):
+        """Associate 'rects' with the objects stored for the node and return
+        its TrackHistory, or None if the node is not stabilized.
+
+        Unmatched rects are dropped. With 'newTracks', they are candidates
+        that start a track once matched on 'confirmFrames' consecutive
+        frames, so that a false positive on a single frame is not reported.
+        """
+        state = state or self.state
         key = (param.hash, parentHash)
-        hashs = None
         if not param.stabilize and not param.tracking:
-            if key in self.stored:
-                del self.stored[key]
+            state.stored.pop(key, None)
             return None
-        if key in self.stored:
-            prevRects = self.stored[key][-1]
-            rects, hashs = self.retreiveRects(rects, prevRects)
+        capacity = self.historyLength if param.tracking else 1
+        history = state.stored.get(key)
+        if history is not None and history.capacity != capacity:
+            history = None
+        if history is None and self.newTracks:
+            # First objects are candidates too
+            history = tracker.TrackHistory([], capacity)
+            state.stored[key] = history
+        # A node without tracks left starts over with the current rects
+        if history is not None and (len(history) or self.newTracks):
+            prevRects = history.lastRects()
+            current, rects = rects, list(prevRects)
+            matched = set()
+            for i, j in self.associate(current, prevRects):
+                rects[i] = current[j]
+                history.lastMatched[i] = state.frameIndex
+                matched.add(j)
+            if self.historyTimeout:
+                lost = history.lastMatched < state.frameIndex - self.historyTimeout
+                if lost.any():
+                    history.keep(~lost)
+                    rects = [r for r, l in zip(rects, lost) if not l]
+            if self.newTracks:
+                unmatched = [tuple(rect) for j, rect in enumerate(current) if j not in matched]
+                rects.extend(self.confirmTracks(history, unmatched, state.frameIndex))
         else:
-            self.stored[key] = []
-            hashs = [tuple(rect) for rect in rects]
-        if param.tracking:
-            self.stored[key].append(zip(rects, hashs))
-        else:
-            self.stored[key] = [zip(rects, hashs)]
-        return self.stored[key]
+            history = tracker.TrackHistory([tuple(rect) for rect in rects], capacity)
+            history.lastMatched[:] = state.frameIndex
+            state.stored[key] = history
+        history.append(rects, state.frameIndex)
+        return history
+
+    def confirmTracks(self, history, rects, frame):
+        """Match 'rects' with the candidates of 'history'. Candidates not
+        matched are dropped, unmatched rects become candidates. Return the
+        rects of the candidates matched on 'confirmFrames' frames, added as
+        tracks of 'history'.
+        """
+        candidates = []
+        matched = set()
+        pairs = self.associate(rects, [rect for hash, rect, hits in history.candidates])
+        for i, j in sorted(pairs):
+            hash, rect, hits = history.candidates[i]
+            candidates.append((hash, rects[j], hits + 1))
+            matched.add(j)
+        hashs = set(history.hashs).union(hash for hash, rect, hits in candidates)
+        for j, rect in enumerate(rects):
+            if j not in matched and rect not in hashs:
+                candidates.append((rect, rect, 1))
+        confirmed = [(hash, rect) for hash, rect, hits in candidates
+                     if hits >= self.confirmFrames]
+        history.candidates = [c for c in candidates if c[2] < self.confirmFrames]
+        if not confirmed:
+            return []
+        hashs, rects = zip(*confirmed)
+        history.addTracks(hashs, rects, frame)
+        return list(rects)
+
+    def evictHistory(self, state=None):
+        """Forget nodes not stabilized for 'historyTimeout' frames, like
+        children of a vanished parent.
+        """
+        state = state or self.state
+        if not self.historyTimeout:
+            return
+        for key, history in state.stored.items():
+            if history.lastSeen < state.frameIndex - self.historyTimeout:
+                del state.stored[key]
+
+    def historyStats(self, state=None):
+        """Return memory usage of the tracking history.
+        """
+        histories = (state or self.state).stored.values()
+        return {'keys': len(histories),
+                'tracks': sum(len(h) for h in histories),
+                'frames': sum(h.count for h in histories),
+                'bytes': sum(h.nbytes for h in histories)}
 
     def globalizeCoords(self, rects, parent):
         for i, roi in enumerate(rects):
@@ -169,73 +296,488 @@ class Detector(object):
             x1, y1, w1, h1 = parent
             rects[i] = (x + x1, y + y1, w, h)
 
+    def getSearchWindows(self, rects, parentRoi):
+        """Return 'rects' expanded by 'searchMargin' and clipped to 'parentRoi'.
+        Overlapping windows are merged.
+        """
+        px, py, pw, ph = parentRoi
+        windows = []
+        for x, y, w, h in rects:
+            mx, my = int(w * self.searchMargin), int(h * self.searchMargin)
+            x1, y1 = max(px, x - mx), max(py, y - my)
+            x2, y2 = min(px + pw, x + w + mx), min(py + ph, y + h + my)
+            if x2 > x1 and y2 > y1:
+                windows.append((x1, y1, x2, y2))
+        merged = True
+        while merged:
+            merged = False
+            for i, a in enumerate(windows):
+                for j in xrange(i + 1, len(windows)):
+                    b = windows[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        windows[i] = (min(a[0], b[0]), min(a[1], b[1]),
+                                      max(a[2], b[2]), max(a[3], b[3]))
+                        del windows[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in windows]
+
+    def setOpticalFlow(self, enable, interval=5, state=None):
+        """Detect every 'interval' frames only and track objects with optical
+        flow in between. The interval adapts to the tracking confidence.
+        """
+        state = state or self.state
+        if not enable:
+            state.flow = None
+        elif state.flow is None:
+            state.flow = tracker.FlowTracker(interval)
+        else:
+            state.flow.forceKeyframe = True
+        state.flowRects = {}
+
+    def propagate(self, gray, state=None):
+        """Move the rects of the previous frame to 'gray' with optical flow.
+        Return the moved rects by node path.
+        """
+        state = state or self.state
+        paths = state.flowRects.keys()
+        rects = [rect for path in paths for rect in state.flowRects[path]]
+        moved, confidences = state.flow.propagate(gray, rects)
+        propagated, i = {}, 0
+        for path in paths:
+            n = len(state.flowRects[path])
+            propagated[path] = moved[i:i+n]
+            i += n
+        return propagated
+
+    def map(self, func, tasks):
+        """Apply 'func' to 'tasks', in the thread pool when enabled.
+        """
+        pool = None
+        if len(tasks) > 1:
+            with self.poolLock:
+                if self.threads > 1:
+                    if self.threadPool is None:
+                        self.threadPool = ThreadPool(self.threads)
+                    pool = self.threadPool
+                    self.poolUsers[pool] = self.poolUsers.get(pool, 0) + 1
+        if pool is None:
+            return map(func, tasks)
+        try:
+            return pool.map(func, tasks)
+        finally:
+            with self.poolLock:
+                self.poolUsers[pool] -= 1
+                if not self.poolUsers[pool]:
+                    del self.poolUsers[pool]
+                    if pool is not self.threadPool:
+                        pool.close()
+
+    def setThreads(self, threads):
+        """Detect independent nodes of a tree level with 'threads' threads.
+        0 or 1 disables the thread pool. The previous pool is closed once
+        the maps running in it are done.
+        """
+        with self.poolLock:
+            if threads != self.threads and self.threadPool is not None:
+                pool, self.threadPool = self.threadPool, None
+                if pool not in self.poolUsers:
+                    pool.close()
+            self.threads = threads
+
     def detect(self, img, tree, equalizeHist=True, debugTable=None, autoNeighbors=None,
-               autoNeighborsParam=0):
+               autoNeighborsParam=0, detectionSize=None, columnar=False, state=None):
+        """Detect objects of 'tree' in 'img' and return the tree of detected rois.
+
+        The tree is detected level by level: every (node, parent roi) pair of
+        a level is independent, so a level runs in the thread pool when
+        enabled. Stabilization is then applied in tree order, so results do
+        not depend on the number of threads.
+
+        With 'temporal', only the surroundings of the objects detected on the
+        previous frame are scanned, except on keyframes (every
+        'keyframeInterval' frames) and when an object is lost.
+
+        With optical flow enabled (see setOpticalFlow), the tree is only
+        detected on keyframes and rects are moved with optical flow on the
+        other frames.
 
-        def detectTree(tree, parentRoi, parentName, parentHash, roiTree):
-            """Recursive function to detect objects in the tree.
+        When 'detectionSize' is set, the frame is downscaled so that its
+        longest side is at most 'detectionSize' pixels before detecting,
+        further scaled by each classifier 'detectionScale'. Detected rects
+        are always returned in full resolution coordinates.
+
+        With 'columnar', results are returned as results.Detections instead
+        of a tree.
+
+        The state kept between frames is 'state', the DetectorState of the
+        detector by default.
+        """
+        state = state or self.state
+
+        def nodeScale(param):
+            """Return the detection scale of a node.
             """
-            x, y, w, h = parentRoi
-            cropped = img[y:y+h, x:x+w]
-            for node, children in tree.iteritems():
-                selected, param = node.data
-                incNeighbors = True
-                while incNeighbors:
-                    if debugTable and not autoNeighbors and selected:
-                        col1 = '{} ({})'.format(param.classifier, param.name)
-                        col2 = 'detecting in {}x{} ({})...'.format(w, h, parentName)
-                        debugTable([(col1, 200), (col2, 300), ('', 200)])
-                        start = time.time()
-                    rects = self.detectObject(cropped,
-                                                 param.classifier,
-                                                 param.scaleFactor,
-                                                 param.minNeighbors,
-                                                 param.minSize,
-                                                 cv2.CASCADE_SCALE_IMAGE)
-                    if isinstance(rects, np.ndarray):
-                        rects = rects.tolist()
-
-                    self.globalizeCoords(rects, parentRoi)
+            return min(1.0, treeScale * getattr(param, 'detectionScale', 1.0))
+
+        def getImage(scale):
+            """Return the preprocessed frame downscaled by 'scale'.
+            """
+            with imagesLock:
+                if scale not in images:
+                    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+                    images[scale] = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+                return images[scale]
+
+        def crop(roi, scale):
+            """Return the crop of 'roi' in the frame downscaled by 'scale'
+            and its offset in the downscaled frame.
+            """
+            x, y, w, h = roi
+            x1, y1 = int(round(x * scale)), int(round(y * scale))
+            x2, y2 = int(round((x + w) * scale)), int(round((y + h) * scale))
+            return getImage(scale)[y1:y2, x1:x2], (x1, y1)
+
+        def toFrame(rects, scale, offset):
+            """Map 'rects' of a crop at 'offset' in the frame downscaled by
+            'scale' to full resolution frame coordinates.
+            """
+            ox, oy = offset
+            if scale == 1.0:
+                return [(x + ox, y + oy, w, h) for x, y, w, h in rects]
+            return [(int(round((x + ox) / scale)), int(round((y + oy) / scale)),
+                     int(round(w / scale)), int(round(h / scale)))
+                    for x, y, w, h in rects]
+
+        def scaleSize(size, scale):
+            return tuple(int(round(v * scale)) for v in size)
+
+        def detectWindows(param, previous, parentRoi, scale):
+            """Detect objects of a node around its 'previous' rects.
+            Return None when a previous object is lost.
+            """
+            rects = []
+            for window in self.getSearchWindows(previous, parentRoi):
+                cropped, offset = crop(window, scale)
+                found = self.detectObject(cropped,
+                                          param.classifier,
+                                          param.scaleFactor,
+                                          param.minNeighbors,
+                                          scaleSize(param.minSize, scale),
+                                          cv2.CASCADE_SCALE_IMAGE)
+                rects.extend(toFrame(list(found), scale, offset))
+            centers = [(x + w / 2, y + h / 2) for x, y, w, h in rects]
+            for x, y, w, h in previous:
+                mx, my = w * self.searchMargin, h * self.searchMargin
+                if not any(x - mx <= cx < x + w + mx and y - my <= cy < y + h + my
+                           for cx, cy in centers):
+                    return None
+            return rects
+
+        def detectNode(task):
+            """Detect objects of a node in its parent roi.
+            """
+            node, children, parentRoi, parentName, parentHash = task[:5]
+            selected, param = node.data
+            scale = nodeScale(param)
+            start = time.time()
+            # Child keys are only unique when their parent is stabilized
+            if (self.temporal and not keyframe and not autoNeighbors and
+                (parentRoi == frameRoi or parentHash is not None)):
+                previous = state.searchRects.get((param.hash, parentHash))
+                if previous is not None:
+                    rects = detectWindows(param, previous, parentRoi, scale)
+                    if rects is not None:
+                        return rects, time.time() - start, None
+            cropped, offset = crop(parentRoi, scale)
+            minSize = scaleSize(param.minSize, scale)
+            rects, scores = self.detectObject(cropped,
+                                              param.classifier,
+                                              param.scaleFactor,
+                                              param.minNeighbors,
+                                              minSize,
+                                              cv2.CASCADE_SCALE_IMAGE,
+                                              scores=True)
+            rects = rects.tolist() if isinstance(rects, np.ndarray) else list(rects)
+            elapsed = time.time() - start
+            if debugTable and scale < 1.0 and not autoNeighbors:
+                timeFullSize(param, parentRoi)
+            return toFrame(rects, scale, offset), elapsed, scores
+
+        def timeFullSize(param, roi):
+            """Time the detection of a downscaled node at full size, once
+            every SPEEDUP_INTERVAL frames, to report the measured speedup.
+            """
+            measured = self.fullSizeTimes.get(param.hash)
+            if measured is not None and state.frameIndex - measured[1] < self.SPEEDUP_INTERVAL:
+                return
+            start = time.time()
+            self.detectObject(crop(roi, 1.0)[0], param.classifier, param.scaleFactor,
+                              param.minNeighbors, param.minSize, cv2.CASCADE_SCALE_IMAGE)
+            pixels = max(1, roi[2] * roi[3])
+            self.fullSizeTimes[param.hash] = ((time.time() - start) / pixels,
+                                              state.frameIndex)
+
+        def calibrateLevel(tasks):
+            """Detect a level and calibrate minNeighbors of the autoNeighbors
+            node: its cascade runs once without grouping, then the smallest
+            threshold keeping at most 'autoNeighborsParam' objects in each
+            parent roi is searched on the raw candidates.
+            """
+            results = [None] * len(tasks)
+            calibrated = []
+            for i, task in enumerate(tasks):
+                if task[0] != autoNeighbors:
+                    results[i] = detectNode(task)
+                    continue
+                param = task[0].data[1]
+                scale = nodeScale(param)
+                start = time.time()
+                cropped, offset = crop(task[2], scale)
+                candidates = self.detectObject(cropped,
+                                               param.classifier,
+                                               param.scaleFactor,
+                                               0,
+                                               scaleSize(param.minSize, scale),
+                                               cv2.CASCADE_SCALE_IMAGE)
+                candidates = [[int(v) for v in rect] for rect in candidates]
+                calibrated.append((i, candidates, scale, offset, time.time() - start))
+            if calibrated:
+                param = autoNeighbors.data[1]
+                param.minNeighbors = max(self.neighborsThreshold(candidates, autoNeighborsParam)
+                                         for i, candidates, scale, offset, elapsed in calibrated)
+                for i, candidates, scale, offset, elapsed in calibrated:
+                    rects = self.groupCandidates(candidates, param.minNeighbors)
+                    results[i] = toFrame(rects, scale, offset), elapsed, None
+            return results
+
+        def detectLevel(tasks):
+            """Detect all the tasks of a tree level.
+            """
+            # autoNeighbors updates the parameters while detecting
+            if autoNeighbors:
+                return calibrateLevel(tasks)
+            return self.map(detectNode, tasks)
 
+        start = time.time()
+        with tracing.span('detect') as frameSpan:
+            with tracing.span('preprocess'):
+                img = self.preprocess(img, equalizeHist)
+            state.preprocessed = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+            h, w = img.shape[:2]
+            frameRoi = (0, 0, w, h)
+            frameSpan.set(width=w, height=h)
+            treeScale = min(1.0, float(detectionSize) / max(w, h)) if detectionSize else 1.0
+            images = {1.0: img}
+            imagesLock = threading.Lock()
+            keyframe = not self.temporal or state.frameIndex % self.keyframeInterval == 0
+            searchRects = {}
+            if not autoNeighbors:
+                with state.lock:
+                    state.frameIndex += 1
+            if debugTable and treeScale < 1.0 and not autoNeighbors:
+                col1 = 'Detecting at {}x{}'.format(*scaleSize((w, h), treeScale))
+                col2 = 'downscaled from {}x{}'.format(w, h)
+                debugTable([(col1, 200), (col2, 300)])
+            flowFrame = (state.flow is not None and not autoNeighbors and
+                         not state.flow.isKeyframe())
+            if flowFrame:
+                with tracing.span('propagate'):
+                    propagated = self.propagate(img, state)
+            flowRects = {}
+            roiTree = None if columnar else Tree()
+            builder = ResultsBuilder() if columnar else None
+            level = [(tree, frameRoi, 'Root', None, roiTree, (), -1)]
+            while level:
+                tasks = [(node, children, parentRoi, parentName, parentHash, subTree,
+                          path + (node.data[1].hash,))
+                         for nodes, parentRoi, parentName, parentHash, subTree, path, row
+                         in level for node, children in nodes.iteritems()]
+                parentRows = [row for nodes, parentRoi, parentName, parentHash, subTree,
+                              path, row in level for node in nodes]
+                if flowFrame:
+                    results = [(propagated.get(task[6], []), 0.0, None) for task in tasks]
+                else:
+                    results = detectLevel(tasks)
+                level = []
+                for task, parentRow, (rects, elapsed, scores) in zip(tasks, parentRows,
+                                                                     results):
+                    node, children, parentRoi, parentName, parentHash, subTree, path = task
+                    selected, param = node.data
                     hashs = None
                     tracking = None
                     if not autoNeighbors:
-                        res = self.stabilize(param, parentHash, rects)
-                        if res:
-                            rects, hashs = zip(*res[-1]) if res[-1] else ([], [])
-                            tracking = res[:-1]
+                        searchRects[(param.hash, parentHash)] = list(rects)
+                        with state.lock:
+                            with tracing.span('stabilize', classifier=param.classifier,
+                                              rects=len(rects)):
+                                history = self.stabilize(param, parentHash, rects, state)
+                        if history is not None:
+                            rects, hashs = history.lastRects(), history.hashs
+                            tracking = history if param.tracking else None
+                            scores = None
+                        flowRects[path] = list(rects)
+                        DETECTED_OBJECTS.inc(len(rects), classifier=param.classifier)
 
                     if debugTable and not autoNeighbors and selected:
-                        end = time.time()
-                        col = '{} found in {:.2f} s'.format(len(rects),
-                                                        end - start)
-                        debugTable([(col, 0)], append=True)
-
-                    if autoNeighbors and node == autoNeighbors and len(rects) > autoNeighborsParam:
-                        param.minNeighbors += 1
-                    else:
-                        incNeighbors = False
-
-                for i, roi in enumerate(rects):
-                    hash = hashs[i] if hashs else None
-                    roiNode = Node(param.classifier, (roi, param, tracking))
-                    roiTree[roiNode]
+                        x, y, rw, rh = parentRoi
+                        action = 'tracking' if flowFrame else 'detecting'
+                        col1 = '{} ({})'.format(param.classifier, param.name)
+                        col2 = '{} in {}x{} ({})...'.format(action, rw, rh, parentName)
+                        col3 = '{} found in {:.2f} s'.format(len(rects), elapsed)
+                        measured = self.fullSizeTimes.get(param.hash)
+                        # Search windows only scan a part of the roi
+                        if (measured and elapsed and keyframe and not flowFrame and
+                            nodeScale(param) < 1.0):
+                            col3 += ', x{:.1f} faster than full size'.format(
+                                measured[0] * rw * rh / elapsed)
+                        debugTable([(col1, 200), (col2, 300), ('', 200)])
+                        debugTable([(col3, 0)], append=True)
+
                     name = parentName + ' > ' + param.name
-                    detectTree(children, roi, name, hash, roiTree[roiNode])
+                    for i, roi in enumerate(rects):
+                        hash = hashs[i] if hashs else None
+                        if columnar:
+                            row = builder.add(param, parentRow, roi, hash,
+                                              scores[i] if scores is not None else None,
+                                              tracking)
+                            childTree = None
+                        else:
+                            row = -1
+                            childTree = subTree[Node(param.classifier, (roi, param, tracking))]
+                        level.append((children, roi, name, hash, childTree, path + (i,), row))
+            if not autoNeighbors:
+                with state.lock:
+                    state.searchRects = searchRects
+                    self.evictHistory(state)
+                    if state.flow is not None:
+                        state.flowRects = flowRects
+                        state.flow.update(img, keyframe=not flowFrame)
+                DETECT_SECONDS.observe(time.time() - start)
+                DETECTED_FRAMES.inc(kind='flow' if flowFrame else
+                                    'keyframe' if keyframe else 'temporal')
+            result = builder.finish() if columnar else roiTree
+            frameSpan.set(keyframe=keyframe, flow=flowFrame)
+        return result
 
-        img = self.preprocess(img, equalizeHist)
-        self.preprocessed = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-        h, w = img.shape[:2]
-        roiTree = Tree()
-        detectTree(tree, (0, 0, w, h), 'Root', None, roiTree)
-        return roiTree
+    def detectStream(self, frames, tree, equalizeHist=True, detectionSize=None,
+                     columnar=False, opticalFlow=False, cancel=None, prefetch=2):
+        """Detect the images of iterable 'frames' lazily, yield (frame index,
+        results) as detect() does.
+
+        The stream has its own DetectorState, so several streams and the
+        detector itself can detect at the same time without sharing
+        stabilization, temporal search or optical flow. The next 'prefetch'
+        frames are read in a background thread while the current frame is
+        detected. The stream ends when 'frames' is exhausted, when
+        threading.Event 'cancel' is set or when the generator is closed.
+        """
+        state = DetectorState()
+        self.setOpticalFlow(opticalFlow, state=state)
+        queue = Queue.Queue(max(1, prefetch))
+        stopped = threading.Event()
+        end = object()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Queue.Full:
+                    pass
+            return False
+
+        def read():
+            try:
+                for frame in frames:
+                    if not put(frame):
+                        return
+            except Exception:
+                put((end, sys.exc_info()))
+                return
+            put((end, None))
 
-    def detectObject(self, img, obj, scaleFactor, minNeighbors, minSize, flags):
-        cascade = cv2.CascadeClassifier(self.__classifiersPaths[obj])
+        reader = threading.Thread(target=read, name='prefetch')
+        reader.daemon = True
+        reader.start()
+        try:
+            index = 0
+            while cancel is None or not cancel.is_set():
+                try:
+                    frame = queue.get(timeout=0.1)
+                except Queue.Empty:
+                    continue
+                if isinstance(frame, tuple) and frame[0] is end:
+                    if frame[1]:
+                        raise frame[1][0], frame[1][1], frame[1][2]
+                    break
+                yield index, self.detect(frame, tree, equalizeHist,
+                                         detectionSize=detectionSize,
+                                         columnar=columnar, state=state)
+                index += 1
+        finally:
+            stopped.set()
+
+    def calibrateNeighbors(self, frames, tree, node, maxObjects, equalizeHist=True,
+                           detectionSize=None):
+        """Set minNeighbors of 'node' in 'tree' to the smallest value that
+        detects at most 'maxObjects' objects per parent roi in all 'frames'.
+        Return the calibrated value.
+        """
+        param = node.data[1]
+        thresholds = []
+        for frame in frames:
+            self.detect(frame, tree, equalizeHist, autoNeighbors=node,
+                        autoNeighborsParam=maxObjects, detectionSize=detectionSize)
+            thresholds.append(param.minNeighbors)
+        if thresholds:
+            param.minNeighbors = max(thresholds)
+        return param.minNeighbors
+
+    @classmethod
+    def groupCandidates(cls, candidates, minNeighbors):
+        """Group raw candidate rects like detectMultiScale does.
+        """
+        if minNeighbors <= 0 or not candidates:
+            return [tuple(rect) for rect in candidates]
+        rects, weights = cv2.groupRectangles(candidates, minNeighbors, cls.GROUP_EPS)
+        return [tuple(int(v) for v in rect) for rect in rects]
+
+    @classmethod
+    def neighborsThreshold(cls, candidates, maxObjects):
+        """Return the smallest minNeighbors grouping raw 'candidates' into
+        at most 'maxObjects' rects, with a binary search.
+        """
+        lo, hi = 1, max(1, len(candidates))
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if len(cls.groupCandidates(candidates, mid)) <= maxObjects:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def detectObject(self, img, obj, scaleFactor, minNeighbors, minSize, flags,
+                     scores=False):
+        """Detect 'obj' in 'img'. With 'scores', return the rects and the
+        number of raw detections merged into each rect, None if unavailable.
+        """
+        cascade = self.classifiers.get(obj)
         if cascade.empty():
-            print "Classifier error for {}".format(obj)
-            return []
-        rects = cascade.detectMultiScale(img, scaleFactor=scaleFactor,
-                                              minNeighbors=minNeighbors,
-                                              flags=flags, minSize=minSize)
-        return rects
+            print >> sys.stderr, "Classifier error for {}".format(obj)
+            return ([], None) if scores else []
+        h, w = img.shape[:2]
+        with tracing.span('classify', classifier=obj, roi=(w, h)) as span:
+            if scores and hasattr(cascade, 'detectMultiScale2'):
+                rects, neighbors = cascade.detectMultiScale2(img, scaleFactor=scaleFactor,
+                                                             minNeighbors=minNeighbors,
+                                                             flags=flags, minSize=minSize)
+                span.set(rects=len(rects))
+                return rects, [int(n) for n in np.ravel(neighbors)]
+            rects = cascade.detectMultiScale(img, scaleFactor=scaleFactor,
+                                                  minNeighbors=minNeighbors,
+                                                  flags=flags, minSize=minSize)
+            span.set(rects=len(rects))
+        return (rects, None) if scores else rects
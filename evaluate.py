@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# evaluate.py
+#
+# Author: Yann KOETH
+# Created: Thu Oct 22 15:36:10 2026 (+0200)
+# Last-Updated: Thu Oct 22 18:24:47 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 64
+#
+
+"""Accuracy / latency evaluation of classifier parameters.
+
+Ground truth is a JSONL file in the batch.py output format, one record per
+image with its 'path' (relative to the labels file) and its 'objects'.
+Every combination of the parameter grid is evaluated on every image,
+grid points run in parallel and each worker keeps the first --cache-size
+decoded grayscale images between grid points.
+
+Usage:
+    python evaluate.py [options] LABELS
+
+Examples:
+    python evaluate.py labels.jsonl -o Face --scale-factor 1.1,1.2,1.3 \\
+        --min-neighbors 2,3,4,5 --min-size 0x0,40x40
+    python evaluate.py labels.jsonl -o Eye --output eye.json
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import itertools
+import multiprocessing
+
+import cv2
+import numpy as np
+
+import tracker
+from detector import Detector
+from batch import parseSize, imapWorkers, WorkerError
+
+def loadLabels(path):
+    """Return [(image path, {object: [rects]})] from a JSONL labels file.
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    labels = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            boxes = {}
+            for obj in record.get('objects', []):
+                boxes.setdefault(obj['object'], []).append(
+                    (obj['x'], obj['y'], obj['w'], obj['h']))
+            labels.append((os.path.join(root, record['path']), boxes))
+    return labels
+
+def matchCounts(detected, truth, minIoU=0.5):
+    """Return (true positives, false positives, false negatives) of
+    'detected' rects against 'truth' rects.
+    """
+    if not len(detected) or not len(truth):
+        return 0, len(detected), len(truth)
+    matches = tracker.assign(tracker.iouCost(detected, truth), 1 - minIoU)
+    tp = len(matches)
+    return tp, len(detected) - tp, len(truth) - tp
+
+def paretoFrontier(results):
+    """Flag results not dominated in precision, recall and latency.
+    """
+    for r in results:
+        r['pareto'] = not any(
+            o is not r and
+            o['precision'] >= r['precision'] and o['recall'] >= r['recall'] and
+            o['latency'] <= r['latency'] and
+            (o['precision'], o['recall'], -o['latency']) !=
+            (r['precision'], r['recall'], -r['latency'])
+            for o in results if o['object'] == r['object'])
+    return results
+
+########################################################
+# Workers
+
+worker = {}
+
+def initWorker(objects, labels, equalizeHist, cacheSize):
+    """Create the detector of a worker process and warm up the cascades
+    of 'objects', so that loading them is not timed as detection latency.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    detector = Detector()
+    worker.update(detector=detector, labels=labels, equalizeHist=equalizeHist,
+                  cacheSize=cacheSize, images={}, error=None)
+    try:
+        detector.warmUp(objects)
+    except Exception as e:
+        # Raising would make the pool respawn the worker forever
+        worker['error'] = 'Cannot load classifiers: {}'.format(e)
+
+def getImage(path):
+    """Return the preprocessed grayscale image of 'path'.
+
+    Every grid point reads the images in the same order, so an LRU would
+    evict each image just before it is read again. The first 'cacheSize'
+    images are kept instead, and the others are decoded on every read.
+    """
+    images = worker['images']
+    if path in images:
+        return images[path]
+    img = cv2.imread(path)
+    if img is not None:
+        img = worker['detector'].preprocess(img, worker['equalizeHist'])
+    if len(images) < worker['cacheSize']:
+        images[path] = img
+    return img
+
+def evaluatePoint(point):
+    """Evaluate one grid point on every labeled image.
+    """
+    obj, scaleFactor, minNeighbors, minSize, minIoU = point
+    if worker['error']:
+        raise WorkerError(worker['error'])
+    detector = worker['detector']
+    tp = fp = fn = 0
+    latencies = []
+    for path, boxes in worker['labels']:
+        img = getImage(path)
+        if img is None:
+            continue
+        start = time.time()
+        rects = detector.detectObject(img, obj, scaleFactor, minNeighbors,
+                                      minSize, cv2.CASCADE_SCALE_IMAGE)
+        latencies.append(time.time() - start)
+        counts = matchCounts(list(rects), boxes.get(obj, []), minIoU)
+        tp, fp, fn = tp + counts[0], fp + counts[1], fn + counts[2]
+    return {'object': obj, 'scaleFactor': scaleFactor, 'minNeighbors': minNeighbors,
+            'minSize': list(minSize), 'tp': tp, 'fp': fp, 'fn': fn,
+            'precision': float(tp) / (tp + fp) if tp + fp else 1.0,
+            'recall': float(tp) / (tp + fn) if tp + fn else 1.0,
+            'latency': float(np.mean(latencies)) if latencies else 0.0,
+            'p95': float(np.percentile(latencies, 95)) if latencies else 0.0}
+
+########################################################
+# Command line
+
+def parseList(cast):
+    return lambda value: [cast(v) for v in value.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate classifier parameters on labeled images.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__)
+    parser.add_argument('labels', help='JSONL ground truth in batch.py format')
+    parser.add_argument('-o', '--object', action='append', dest='objects',
+                        help='object to evaluate (default: all labeled objects)')
+    parser.add_argument('--scale-factor', type=parseList(float), default=[1.1, 1.2, 1.3])
+    parser.add_argument('--min-neighbors', type=parseList(int), default=[2, 3, 4, 5])
+    parser.add_argument('--min-size', type=parseList(parseSize), default=[(0, 0)],
+                        metavar='WxH,...')
+    parser.add_argument('--iou', type=float, default=0.5,
+                        help='minimum intersection over union of a match')
+    parser.add_argument('--no-equalize', action='store_true')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help='decoded images kept by each worker, the first ones read')
+    parser.add_argument('--output', help='write all results as JSON')
+    args = parser.parse_args(argv)
+
+    labels = loadLabels(args.labels)
+    objects = args.objects or sorted(set(obj for path, boxes in labels for obj in boxes))
+    for obj in objects:
+        if obj not in Detector.getDefaultAvailableObjects():
+            parser.error('Unknown object "{}"'.format(obj))
+    grid = [(obj, sf, mn, ms, args.iou) for obj, sf, mn, ms in
+            itertools.product(objects, args.scale_factor, args.min_neighbors, args.min_size)]
+
+    pool = multiprocessing.Pool(max(1, min(args.jobs, len(grid))), initWorker,
+                                (objects, labels, not args.no_equalize, args.cache_size))
+    start = time.time()
+    try:
+        results = list(imapWorkers(pool, evaluatePoint, grid))
+        pool.close()
+    except WorkerError as e:
+        pool.terminate()
+        print >> sys.stderr, e
+        return 1
+    except KeyboardInterrupt:
+        pool.terminate()
+        return 1
+    finally:
+        pool.join()
+    paretoFrontier(results)
+
+    print '{:<8} {:>6} {:>4} {:>9} {:>9} {:>7} {:>10}'.format(
+        'object', 'scale', 'nb', 'minSize', 'precision', 'recall', 'latency')
+    for r in sorted(results, key=lambda r: (r['object'], -r['recall'], -r['precision'])):
+        print '{:<8} {:>6.2f} {:>4} {:>9} {:>9.3f} {:>7.3f} {:>8.1f}ms{}'.format(
+            r['object'], r['scaleFactor'], r['minNeighbors'], '{}x{}'.format(*r['minSize']),
+            r['precision'], r['recall'], r['latency'] * 1000, ' *' if r['pareto'] else '')
+    print >> sys.stderr, '{} settings on {} images in {:.2f} s (* Pareto frontier)'.format(
+        len(grid), len(labels), time.time() - start)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# metrics.py
+#
+# Author: Yann KOETH
+# Created: Sat Oct 24 10:05:37 2026 (+0200)
+# Last-Updated: Sat Oct 24 13:41:12 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 58
+#
+
+"""Counters, gauges and histograms served in Prometheus text format.
+
+Metrics are created once, usually at import time, from the default
+registry and updated from any thread:
+
+    FRAMES = metrics.registry.counter('detection_frames_total', 'Detected frames.')
+    FRAMES.inc()
+    OBJECTS.inc(3, classifier='Face')
+
+MetricsServer serves the registry on http://127.0.0.1:PORT/metrics.
+"""
+
+import math
+import threading
+import BaseHTTPServer
+
+def labelKey(labels):
+    return tuple(sorted(labels.iteritems()))
+
+def formatLabels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                                                            .replace('"', '\\"'))
+                          for name, value in pairs) + '}'
+
+def formatValue(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+class Metric(object):
+    """Values of a metric by label set.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def samples(self):
+        """Return [(suffix, label key, extra labels, value)].
+        """
+        with self.lock:
+            return [('', key, (), value) for key, value in sorted(self.values.iteritems())]
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(labelKey(labels), 0.0)
+
+    def total(self):
+        """Return the sum of the values of all label sets.
+        """
+        with self.lock:
+            return sum(self.values.itervalues())
+
+    def expose(self):
+        lines = ['# HELP {} {}'.format(self.name, self.help),
+                 '# TYPE {} {}'.format(self.name, self.kind)]
+        for suffix, key, extra, value in self.samples():
+            lines.append('{}{}{} {}'.format(self.name, suffix, formatLabels(key, extra),
+                                            formatValue(value)))
+        return '\n'.join(lines)
+
+class Counter(Metric):
+    """Monotonically increasing value.
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = labelKey(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+class Gauge(Metric):
+    """Value that goes up and down.
+    """
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[labelKey(labels)] = value
+
+class HistogramValues(object):
+    """Log-linear bucket counts of a histogram.
+    """
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+class Histogram(Metric):
+    """HDR style histogram of positive values between 'lowest' and 'highest'.
+
+    Each power of two is split into 'precision' linear buckets, so the
+    relative error of a quantile is below 1 / 'precision' over the whole
+    range with a fixed number of buckets. Exposed as a Prometheus summary
+    with 'quantiles', the sum and the count.
+    """
+    kind = 'summary'
+
+    def __init__(self, name, help, lowest=1e-6, highest=1e3, precision=32,
+                 quantiles=(0.5, 0.9, 0.99, 0.999)):
+        Metric.__init__(self, name, help)
+        self.lowest = lowest
+        self.precision = precision
+        self.quantiles = quantiles
+        self.size = (int(math.ceil(math.log(highest / lowest, 2))) + 1) * precision
+
+    def bucket(self, value):
+        if value <= self.lowest:
+            return 0
+        # value / lowest = m * 2 ** e with m in [0.5, 1)
+        m, e = math.frexp(value / self.lowest)
+        return min((e - 1) * self.precision + int((2 * m - 1) * self.precision),
+                   self.size - 1)
+
+    def bucketValue(self, index):
+        """Middle of bucket 'index'.
+        """
+        octave, sub = divmod(index, self.precision)
+        return self.lowest * 2 ** octave * (1 + (sub + 0.5) / self.precision)
+
+    def observe(self, value, **labels):
+        key = labelKey(labels)
+        index = self.bucket(value)
+        with self.lock:
+            values = self.values.get(key)
+            if values is None:
+                values = self.values[key] = HistogramValues(self.size)
+            values.counts[index] += 1
+            values.count += 1
+            values.sum += value
+            values.min = min(values.min, value)
+            values.max = max(values.max, value)
+
+    def quantile(self, q, **labels):
+        """Return the 'q' quantile, 0 when nothing was observed.
+        """
+        with self.lock:
+            values = self.values.get(labelKey(labels))
+            return self.computeQuantile(values, q) if values else 0.0
+
+    def computeQuantile(self, values, q):
+        rank = q * values.count
+        seen = 0
+        for index, count in enumerate(values.counts):
+            seen += count
+            if count and seen >= rank:
+                # The last bucket also holds the values above 'highest'
+                if index == self.size - 1:
+                    return values.max
+                return min(max(self.bucketValue(index), values.min), values.max)
+        return values.max
+
+    def get(self, **labels):
+        """Return (count, sum) of the observed values.
+        """
+        with self.lock:
+            values = self.values.get(labelKey(labels))
+            return (values.count, values.sum) if values else (0, 0.0)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, values in sorted(self.values.iteritems()):
+                for q in self.quantiles:
+                    samples.append(('', key, (('quantile', q),),
+                                    self.computeQuantile(values, q)))
+                samples.append(('_sum', key, (), values.sum))
+                samples.append(('_count', key, (), values.count))
+        return samples
+
+class Registry(object):
+    """Named metrics, in creation order.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.byName = {}
+
+    def register(self, cls, name, help, **options):
+        """Return metric 'name', created with 'cls' if it does not exist.
+        """
+        with self.lock:
+            metric = self.byName.get(name)
+            if metric is None:
+                metric = cls(name, help, **options)
+                self.metrics.append(metric)
+                self.byName[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError('Metric {} is already a {}'.format(name, metric.kind))
+            return metric
+
+    def counter(self, name, help):
+        return self.register(Counter, name, help)
+
+    def gauge(self, name, help):
+        return self.register(Gauge, name, help)
+
+    def histogram(self, name, help, **options):
+        return self.register(Histogram, name, help, **options)
+
+    def __getitem__(self, name):
+        return self.byName[name]
+
+    def expose(self):
+        """Return all metrics in Prometheus text format.
+        """
+        with self.lock:
+            metrics = list(self.metrics)
+        return '\n'.join(metric.expose() for metric in metrics) + '\n'
+
+registry = Registry()
+
+class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.expose()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer(object):
+    """Serve 'registry' on http://host:port/metrics from a daemon thread.
+    Port 0 binds a free port, read it from 'port' once started.
+    """
+
+    def __init__(self, port, host='127.0.0.1', registry=registry):
+        self.server = BaseHTTPServer.HTTPServer((host, port), MetricsHandler)
+        self.server.registry = registry
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics')
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
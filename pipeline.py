@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pipeline.py
+#
+# Author: Yann KOETH
+# Created: Mon Oct 19 09:47:12 2026 (+0200)
+# Last-Updated: Mon Oct 26 15:41:18 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 69
+#
+
+import time
+import threading
+from collections import deque
+
+import metrics
+
+DROP_LATEST = 'Latest frame'
+DROP_OLDEST = 'Drop oldest'
+DROP_NONE = 'No drop'
+
+DROPPED_FRAMES = metrics.registry.counter('detection_dropped_frames_total',
+                                          'Frames dropped by the pipeline, by queue.')
+FRAME_LATENCY = metrics.registry.histogram('detection_frame_latency_seconds',
+                                           'Time from capture to the end of rendering.')
+QUEUE_DEPTH = metrics.registry.gauge('detection_pipeline_queue_depth',
+                                     'Frames waiting in a pipeline queue, by queue.')
+STAGE_SECONDS = metrics.registry.histogram('detection_pipeline_stage_seconds',
+                                           'Processing time of a frame, by pipeline stage.')
+
+class BoundedQueue(object):
+    """Thread safe FIFO of at most 'maxsize' items.
+
+    When the queue is full, DROP_LATEST discards every queued item so that
+    the newest one wins, DROP_OLDEST discards the oldest queued item and
+    DROP_NONE blocks the producer.
+    """
+
+    def __init__(self, name, maxsize=2, policy=DROP_OLDEST):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def put(self, item):
+        """Append 'item', return the list of dropped items.
+        """
+        dropped = []
+        with self.cond:
+            while (self.policy == DROP_NONE and not self.closed and
+                   len(self.items) >= self.maxsize):
+                self.cond.wait(0.1)
+            if self.closed:
+                return [item]
+            if len(self.items) >= self.maxsize:
+                if self.policy == DROP_LATEST:
+                    dropped = list(self.items)
+                    self.items.clear()
+                else:
+                    dropped = [self.items.popleft()]
+            self.items.append(item)
+            QUEUE_DEPTH.set(len(self.items), queue=self.name)
+            self.cond.notify_all()
+        if dropped:
+            DROPPED_FRAMES.inc(len(dropped), queue=self.name)
+        return dropped
+
+    def get(self, timeout=None):
+        """Pop the oldest item, None on timeout or when closed and empty.
+        """
+        with self.cond:
+            end = time.time() + timeout if timeout is not None else None
+            while not self.items and not self.closed:
+                remaining = end - time.time() if end is not None else 0.1
+                if remaining <= 0:
+                    return None
+                self.cond.wait(min(remaining, 0.1))
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            QUEUE_DEPTH.set(len(self.items), queue=self.name)
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        with self.cond:
+            return len(self.items)
+
+class Frame(object):
+    """A frame travelling through the pipeline.
+    """
+    __slots__ = ('index', 'captured', 'image', 'result', 'preprocessed', 'detected')
+
+    def __init__(self, index, image):
+        self.index = index
+        self.captured = time.time()
+        self.image = image
+        self.result = None
+        self.preprocessed = None
+        self.detected = None
+
+class Pipeline(object):
+    """Capture -> detect pipeline linked by bounded queues.
+
+    'capture' returns the next frame or None at the end of the source, it
+    runs in its own thread. 'detect(image, state)' returns the result and
+    the preprocessed image of a frame, it is called by 'workers' threads.
+    Each worker gets its own 'state' from 'newState', or None without it,
+    so that per-stream state is never updated out of order by several
+    workers. Detected frames are read with get(), usually by the thread
+    feeding the renderer. Frames older than the last one returned by get()
+    are dropped, so several workers never render frames out of order.
+    If a stage raises, the pipeline finishes and stop() raises the error.
+    """
+
+    def __init__(self, capture, detect, workers=1, queueSize=2, policy=DROP_LATEST,
+                 newState=None):
+        self.capture = capture
+        self.detect = detect
+        self.newState = newState
+        self.frames = BoundedQueue('capture', queueSize, policy)
+        self.results = BoundedQueue('detect', queueSize, policy)
+        self.threads = [threading.Thread(target=self.captureLoop, name='capture')]
+        self.threads += [threading.Thread(target=self.detectLoop, name='detect-%d' % i)
+                         for i in xrange(max(1, workers))]
+        self.stopped = False
+        self.lastIndex = -1
+        self.workersLeft = max(1, workers)
+        self.lock = threading.Lock()
+        self.error = None
+
+    def start(self):
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """Stop all stages, raise the error of a failed stage.
+        """
+        self.stopped = True
+        self.frames.close()
+        self.results.close()
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def fail(self, error):
+        """Record the first 'error' of a stage and stop feeding the others.
+        """
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.stopped = True
+        self.frames.close()
+
+    def finished(self):
+        """Return True when the source is exhausted and all frames are out.
+        """
+        return self.results.closed and not len(self.results)
+
+    def captureLoop(self):
+        index = 0
+        try:
+            while not self.stopped:
+                start = time.time()
+                image = self.capture()
+                if image is None:
+                    break
+                frame = Frame(index, image)
+                STAGE_SECONDS.observe(frame.captured - start, stage='capture')
+                self.frames.put(frame)
+                index += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.frames.close()
+
+    def detectLoop(self):
+        try:
+            state = self.newState() if self.newState else None
+            while not self.stopped:
+                frame = self.frames.get()
+                if frame is None:
+                    break
+                start = time.time()
+                frame.result, frame.preprocessed = self.detect(frame.image, state)
+                frame.detected = time.time()
+                STAGE_SECONDS.observe(frame.detected - start, stage='detect')
+                self.results.put(frame)
+        except Exception as e:
+            self.fail(e)
+        finally:
+            # The last worker out ends the results, even when one failed
+            with self.lock:
+                self.workersLeft -= 1
+                if not self.workersLeft:
+                    self.results.close()
+
+    def get(self, timeout=None):
+        """Return the next detected frame to render, None if there is none.
+        """
+        while True:
+            frame = self.results.get(timeout)
+            if frame is None or frame.index > self.lastIndex:
+                break
+            DROPPED_FRAMES.inc(queue='stale')
+        if frame is not None:
+            self.lastIndex = frame.index
+        return frame
+
+    def rendered(self, frame, start):
+        """Record the rendering of 'frame' started at 'start'.
+        """
+        end = time.time()
+        STAGE_SECONDS.observe(end - start, stage='render')
+        FRAME_LATENCY.observe(end - frame.captured)
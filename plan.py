@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# plan.py
+#
+# Author: Yann KOETH
+# Created: Wed Oct 21 15:08:42 2026 (+0200)
+# Last-Updated: Wed Oct 21 16:47:19 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 29
+#
+
+import copy
+
+from tree import Tree, Node
+
+def indexKey(index):
+    """Hashable key of a QModelIndex.
+    """
+    return (index.row(), index.column(), index.internalId())
+
+class PlanNode(object):
+    """A classifier of a detection plan.
+    'parent' is the index of the parent node in the plan, None for roots.
+    """
+    __slots__ = ('index', 'parent', 'name', 'classifier', 'selected', 'param', 'item')
+
+    def __init__(self, index, parent, name, selected, param, item=None):
+        self.index = index
+        self.parent = parent
+        self.name = name
+        self.classifier = param.classifier
+        self.selected = selected
+        self.param = param
+        self.item = item
+
+class DetectionPlan(object):
+    """Detection tree compiled once from the objects tree model.
+
+    Nodes are stored flat, parents first, with frozen copies of the
+    classifier parameters. The equivalent detection Tree is built once and
+    reused for every frame, so a plan must be compiled again when the
+    model, the selection or the parameters change.
+    """
+
+    def __init__(self, nodes, extract=None):
+        self.nodes = tuple(nodes)
+        self.tree = Tree()
+        self.extracted = None
+        children = []
+        for node in self.nodes:
+            treeNode = Node(node.name, (node.selected, node.param))
+            parent = self.tree if node.parent is None else children[node.parent]
+            children.append(Tree())
+            parent[treeNode] = children[-1]
+            if extract is not None and node.item == extract:
+                self.extracted = treeNode
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @classmethod
+    def fromModel(cls, model, table, indexes, extract=None, freeze=True):
+        """Compile the plan of QStandardItemModel 'model'.
+        'table' maps item data to ClassifierParameters, 'indexes' are the
+        selected indexes (none means all) and 'extract' is an item whose
+        node is returned as 'extracted'. With 'freeze', nodes hold copies
+        of the parameters instead of the parameters themselves.
+        """
+        selected = set(indexKey(index) for index in indexes)
+        nodes = []
+        items = [(model.item(row), None) for row in xrange(model.rowCount())]
+        # Breadth first, children are appended while iterating
+        for item, parent in items:
+            param = table[item.data()]
+            isSelected = not selected or indexKey(model.indexFromItem(item)) in selected
+            node = PlanNode(len(nodes), parent, item.text(), isSelected,
+                            copy.copy(param) if freeze else param, item)
+            nodes.append(node)
+            items += [(item.child(row), node.index) for row in xrange(item.rowCount())]
+        return cls(nodes, extract)
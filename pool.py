@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pool.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 18 10:12:03 2026 (+0200)
+# Last-Updated: Sun Oct 25 15:02:18 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 44
+#
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import cv2
+
+import metrics
+
+HITS = metrics.registry.counter('detection_classifier_hits_total',
+                                'Cascade lookups served by a loaded classifier.')
+MISSES = metrics.registry.counter('detection_classifier_misses_total',
+                                  'Cascade lookups loading the classifier, by classifier.')
+RELOADS = metrics.registry.counter('detection_classifier_reloads_total',
+                                   'Classifiers reloaded after their file changed.')
+EVICTIONS = metrics.registry.counter('detection_classifier_evictions_total',
+                                     'Classifiers evicted from a full or idle pool.')
+LOAD_SECONDS = metrics.registry.histogram('detection_classifier_load_seconds',
+                                          'Cascade loading time, by classifier.')
+
+class ClassifierError(Exception):
+    """A cascade classifier cannot be loaded.
+    """
+
+class ClassifierPool(object):
+    """Cache of loaded cascade classifiers.
+
+    A CascadeClassifier is not safe to share across threads, so each
+    thread gets its own instance of a cascade, loaded on first use and
+    reused afterwards. Instances are reloaded when their XML file changes
+    and evicted when the pool is full or when they have not been used
+    for 'maxIdle' seconds.
+    """
+
+    def __init__(self, paths, maxSize=64, maxIdle=600, checkInterval=2.0):
+        self.paths = paths
+        self.maxSize = maxSize
+        self.maxIdle = maxIdle
+        self.checkInterval = checkInterval
+        self.lock = threading.Lock()
+        # (thread id, object) -> [cascade, mtime, lastUsed, lastChecked]
+        self.classifiers = OrderedDict()
+
+    def load(self, obj):
+        """Load the cascade of 'obj' from disk.
+        """
+        path = self.paths[obj]
+        start = time.time()
+        cascade = cv2.CascadeClassifier(path)
+        LOAD_SECONDS.observe(time.time() - start, classifier=obj)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        return cascade, mtime
+
+    def get(self, obj):
+        """Return the cascade of 'obj' for the calling thread.
+        """
+        key = (threading.current_thread().ident, obj)
+        now = time.time()
+        with self.lock:
+            entry = self.classifiers.pop(key, None)
+            if entry is not None:
+                self.classifiers[key] = entry
+        if entry is not None and now - entry[3] > self.checkInterval:
+            entry[3] = now
+            path = self.paths[obj]
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if mtime != entry[1]:
+                RELOADS.inc()
+                entry = None
+        if entry is not None:
+            entry[2] = now
+            HITS.inc()
+            return entry[0]
+
+        cascade, mtime = self.load(obj)
+        MISSES.inc(classifier=obj)
+        with self.lock:
+            self.classifiers.pop(key, None)
+            self.classifiers[key] = [cascade, mtime, now, now]
+            self.evict(now)
+        return cascade
+
+    def evict(self, now):
+        """Drop least recently used and idle classifiers. Lock must be held.
+        """
+        for key in list(self.classifiers):
+            full = len(self.classifiers) > self.maxSize
+            idle = self.maxIdle and now - self.classifiers[key][2] > self.maxIdle
+            if not full and not idle:
+                break
+            del self.classifiers[key]
+            EVICTIONS.inc()
+
+    def warmUp(self, objects=None):
+        """Load classifiers of 'objects' (all by default) for the calling thread.
+        Raise ClassifierError if a cascade is missing or unreadable.
+        """
+        for obj in (objects if objects is not None else self.paths.keys()):
+            if self.get(obj).empty():
+                raise ClassifierError('Cannot load {} classifier from {}'.format(
+                    obj, self.paths[obj]))
+
+    def clear(self):
+        """Drop every loaded classifier.
+        """
+        with self.lock:
+            self.classifiers.clear()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# redact.py
+#
+# Author: Yann KOETH
+# Created: Wed Oct 21 09:34:50 2026 (+0200)
+# Last-Updated: Wed Oct 21 11:52:07 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 45
+#
+
+import cv2
+import numpy as np
+
+REDACT_GAUSSIAN = 'Gaussian'
+REDACT_BOX = 'Box'
+REDACT_PIXELATE = 'Pixelate'
+
+MODES = [REDACT_GAUSSIAN, REDACT_BOX, REDACT_PIXELATE]
+
+def mergeBoxes(boxes):
+    """Merge overlapping (x0, y0, x1, y1) boxes until none overlap.
+    """
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if (box[0] < other[2] and other[0] < box[2] and
+                    box[1] < other[3] and other[1] < box[3]):
+                    other[:] = [min(box[0], other[0]), min(box[1], other[1]),
+                                max(box[2], other[2]), max(box[3], other[3])]
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return [tuple(box) for box in boxes]
+
+class Redactor(object):
+    """Blur or pixelate regions of an image.
+
+    Overlapping ROIs are merged and each merged region is filtered once,
+    padded so that the filter does not see the region border.
+    'strength' is the blur radius or the pixel block size.
+    """
+
+    def __init__(self, mode=REDACT_GAUSSIAN, strength=20):
+        self.mode = mode
+        self.strength = max(1, int(strength))
+        self.kernel = None
+
+    def padding(self):
+        """Margin of pixels read by the filter around a region.
+        """
+        if self.mode == REDACT_PIXELATE:
+            return 0
+        if self.mode == REDACT_BOX:
+            return self.strength
+        # Gaussian kernel radius is 3 sigma
+        return int(np.ceil(1.5 * self.strength))
+
+    def filter(self, region):
+        """Return a redacted copy of 'region'.
+        """
+        if self.mode == REDACT_BOX:
+            k = 2 * self.strength + 1
+            return cv2.blur(region, (k, k))
+        if self.mode == REDACT_PIXELATE:
+            h, w = region.shape[:2]
+            small = cv2.resize(region, (max(1, w // self.strength), max(1, h // self.strength)),
+                               interpolation=cv2.INTER_AREA)
+            return cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+        # Separable filtering with a cached kernel is much faster than
+        # GaussianBlur on 8 bits images with a large sigma
+        size = 2 * self.padding() + 1
+        if self.kernel is None or len(self.kernel) != size:
+            self.kernel = cv2.getGaussianKernel(size, self.strength / 2.0)
+        return cv2.sepFilter2D(region, -1, self.kernel, self.kernel)
+
+    def redact(self, img, rois, masks=None):
+        """Redact the (x, y, w, h) 'rois' of 'img' in place.
+        'masks' optionally gives a float alpha of each ROI size, None for
+        the whole ROI. Return 'img'.
+        """
+        height, width = img.shape[:2]
+        masks = masks or [None] * len(rois)
+        items = []
+        for roi, mask in zip(rois, masks):
+            x, y, w, h = [int(round(v)) for v in roi]
+            box = (max(x, 0), max(y, 0), min(x + w, width), min(y + h, height))
+            if box[2] > box[0] and box[3] > box[1]:
+                items.append((box, (x, y), mask))
+        if not items:
+            return img
+
+        pad = self.padding()
+        padded = [(max(b[0] - pad, 0), max(b[1] - pad, 0),
+                   min(b[2] + pad, width), min(b[3] + pad, height)) for b, o, m in items]
+        for rx0, ry0, rx1, ry1 in mergeBoxes(padded):
+            filtered = self.filter(img[ry0:ry1, rx0:rx1])
+            for (x0, y0, x1, y1), (x, y), mask in items:
+                if not (rx0 <= x0 and ry0 <= y0 and x1 <= rx1 and y1 <= ry1):
+                    continue
+                src = filtered[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0]
+                dst = img[y0:y1, x0:x1]
+                if mask is None:
+                    dst[...] = src
+                    continue
+                alpha = mask[y0 - y:y1 - y, x0 - x:x1 - x, np.newaxis]
+                region = dst.astype(np.float32)
+                region += (src - region) * alpha
+                dst[...] = region
+        return img
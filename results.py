@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# results.py
+#
+# Author: Yann KOETH
+# Created: Thu Oct 22 10:14:27 2026 (+0200)
+# Last-Updated: Thu Oct 22 13:02:55 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 58
+#
+
+import numpy as np
+
+FIELDS = ('classId', 'parent', 'x', 'y', 'w', 'h', 'track', 'score')
+
+class Detections(object):
+    """Columnar detection results.
+
+    Row i is a detected object. 'classId' indexes 'params', 'parent' is the
+    row of the parent object (-1 for roots, parents come first), 'track' is
+    the hash of the stabilization key (-1 when not stabilized) and 'score' the number
+    of raw detections merged into the object (NaN when unknown). 'tracking'
+    holds the tracking history of each row, or None.
+    """
+
+    def __init__(self, params, classId, parent, rects, track, score, tracking=None):
+        self.params = list(params)
+        self.classId = np.asarray(classId, dtype=np.int32)
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        self.track = np.asarray(track, dtype=np.int64)
+        self.score = np.asarray(score, dtype=np.float32)
+        self.tracking = list(tracking) if tracking is not None else [None] * len(self.classId)
+        self.children = None
+
+    def __len__(self):
+        return len(self.classId)
+
+    x = property(lambda self: self.rects[:, 0])
+    y = property(lambda self: self.rects[:, 1])
+    w = property(lambda self: self.rects[:, 2])
+    h = property(lambda self: self.rects[:, 3])
+
+    @property
+    def classifiers(self):
+        """Classifier of each row.
+        """
+        names = np.array([param.classifier for param in self.params] or [''], dtype=object)
+        return names[self.classId]
+
+    def take(self, rows):
+        """Return the Detections of 'rows'. Parents that are not kept become -1.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        remap = np.full(len(self) + 1, -1, dtype=np.int32)
+        remap[rows] = np.arange(len(rows), dtype=np.int32)
+        # parent -1 maps to the last slot, which stays -1
+        parent = remap[self.parent[rows]]
+        return Detections(self.params, self.classId[rows], parent, self.rects[rows],
+                          self.track[rows], self.score[rows],
+                          [self.tracking[i] for i in rows])
+
+    def filter(self, mask):
+        """Return the Detections selected by boolean 'mask'.
+        """
+        return self.take(np.flatnonzero(mask))
+
+    def select(self, classifier=None, minScore=None, minSize=None):
+        """Return a boolean mask of the rows matching all the given criteria.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if classifier is not None:
+            ids = [i for i, param in enumerate(self.params) if param.classifier == classifier]
+            mask &= np.in1d(self.classId, ids)
+        if minScore is not None:
+            # Unknown scores are NaN and never selected
+            with np.errstate(invalid='ignore'):
+                mask &= self.score >= minScore
+        if minSize is not None:
+            mask &= (self.w >= minSize[0]) & (self.h >= minSize[1])
+        return mask
+
+    def counts(self):
+        """Return the number of objects of each classifier.
+        """
+        counts = np.bincount(self.classId, minlength=len(self.params))
+        result = {}
+        for param, count in zip(self.params, counts.tolist()):
+            result[param.classifier] = result.get(param.classifier, 0) + count
+        return result
+
+    def toRecords(self):
+        """Return the rows as a list of dicts, parents first.
+        """
+        parents = self.parent.tolist()
+        classifiers = [param.classifier for param in self.params]
+        names = [param.name for param in self.params]
+        return [{'id': i, 'parent': parent if parent >= 0 else None,
+                 'object': classifiers[c], 'name': names[c],
+                 'x': x, 'y': y, 'w': w, 'h': h}
+                for i, (c, parent, (x, y, w, h))
+                in enumerate(zip(self.classId.tolist(), parents, self.rects.tolist()))]
+
+    @staticmethod
+    def concatenate(detections):
+        """Merge several Detections. Return the merged Detections and the
+        first row of each input, to aggregate over batches of frames.
+        """
+        params, paramIds = [], {}
+        classIds, parents, offsets = [], [], []
+        offset = 0
+        for d in detections:
+            ids = []
+            for param in d.params:
+                if id(param) not in paramIds:
+                    paramIds[id(param)] = len(params)
+                    params.append(param)
+                ids.append(paramIds[id(param)])
+            classIds.append(np.asarray(ids, dtype=np.int32)[d.classId] if len(d) else d.classId)
+            parents.append(np.where(d.parent >= 0, d.parent + offset, -1))
+            offsets.append(offset)
+            offset += len(d)
+        merged = Detections(params,
+                            np.concatenate(classIds or [[]]),
+                            np.concatenate(parents or [[]]),
+                            np.concatenate([d.rects for d in detections] or [np.zeros((0, 4))]),
+                            np.concatenate([d.track for d in detections] or [[]]),
+                            np.concatenate([d.score for d in detections] or [[]]),
+                            [t for d in detections for t in d.tracking])
+        return merged, np.asarray(offsets, dtype=np.int64)
+
+    def childRows(self, row):
+        """Rows whose parent is 'row' (-1 for roots).
+        """
+        if self.children is None:
+            order = np.argsort(self.parent, kind='mergesort')
+            bounds = np.searchsorted(self.parent[order], np.arange(-1, len(self) + 1))
+            self.children = (order, bounds)
+        order, bounds = self.children
+        return order[bounds[row + 1]:bounds[row + 2]]
+
+    def tree(self):
+        """Return a Tree-like view of the rows.
+        """
+        return TreeView(self, -1)
+
+class NodeView(object):
+    """Node-like view of a Detections row, 'data' is (roi, param, tracking).
+    """
+    __slots__ = ('detections', 'row')
+
+    def __init__(self, detections, row):
+        self.detections = detections
+        self.row = row
+
+    @property
+    def name(self):
+        return self.detections.params[self.detections.classId[self.row]].classifier
+
+    @property
+    def data(self):
+        d = self.detections
+        return (tuple(d.rects[self.row].tolist()), d.params[d.classId[self.row]],
+                d.tracking[self.row])
+
+class TreeView(object):
+    """Tree-like view of the children of a Detections row.
+    """
+    __slots__ = ('detections', 'row')
+
+    def __init__(self, detections, row):
+        self.detections = detections
+        self.row = row
+
+    def __len__(self):
+        return len(self.detections.childRows(self.row))
+
+    def iteritems(self):
+        for row in self.detections.childRows(self.row).tolist():
+            yield NodeView(self.detections, row), TreeView(self.detections, row)
+
+    def walk(self):
+        for node, children in self.iteritems():
+            yield node
+            for n in children.walk():
+                yield n
+
+    def map(self, param, func):
+        for node, children in self.iteritems():
+            children.map(func(node, param), func)
+
+class ResultsBuilder(object):
+    """Accumulate detected objects row by row, then build Detections.
+    """
+
+    def __init__(self):
+        self.params = []
+        self.paramIds = {}
+        self.classId = []
+        self.parent = []
+        self.rects = []
+        self.track = []
+        self.score = []
+        self.tracking = []
+
+    def add(self, param, parent, roi, track=None, score=None, tracking=None):
+        """Add an object, return its row.
+        """
+        classId = self.paramIds.get(id(param))
+        if classId is None:
+            classId = self.paramIds[id(param)] = len(self.params)
+            self.params.append(param)
+        self.classId.append(classId)
+        self.parent.append(parent)
+        self.rects.append(roi)
+        self.track.append(hash(track) if track is not None else -1)
+        self.score.append(score if score is not None else np.nan)
+        self.tracking.append(tracking)
+        return len(self.classId) - 1
+
+    def finish(self):
+        return Detections(self.params, self.classId, self.parent, self.rects,
+                          self.track, self.score, self.tracking)
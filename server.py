@@ -0,0 +1,542 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# server.py
+#
+# Author: Yann KOETH
+# Created: Sat Oct 24 15:02:44 2026 (+0200)
+# Last-Updated: Sat Oct 24 19:16:08 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 93
+#
+
+"""Local HTTP detection service.
+
+POST /detect with an encoded image (JPEG, PNG...) as body, or a raw BGR,
+BGRA or grayscale frame with 'width' and 'height' query parameters.
+The detection tree is given by 'tree' query parameters, either object
+paths like 'Face/Eye' (repeated) or a JSON list of nodes with per node
+ClassifierParameters fields:
+
+    [{"object": "Face", "minSize": [60, 60],
+      "children": [{"object": "Eye", "minNeighbors": 6}]}]
+
+'scaleFactor', 'minNeighbors', 'minSize' (WxH) and 'detectionScale' query
+parameters apply to every node, 'equalize' (0 or 1) and 'detectionSize'
+to the frame. The response holds the flat 'objects' (batch.py format)
+and the nested 'tree'.
+
+GET /health, /stats (JSON) and /metrics (Prometheus text).
+
+Concurrent requests are spread in batches over a pool of warmed up
+worker processes. When the queue is full, requests are rejected with
+429 Too Many Requests.
+
+Usage:
+    python server.py [options]
+
+Examples:
+    python server.py --port 8080 -j 4
+    curl --data-binary @faces/watson.png 'http://127.0.0.1:8080/detect?tree=Face/Eye'
+"""
+
+import sys
+import json
+import time
+import Queue
+import signal
+import urlparse
+import argparse
+import threading
+import SocketServer
+import BaseHTTPServer
+import multiprocessing
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import metrics
+from detector import Detector, ClassifierParameters
+from detector import DETECT_SECONDS, DETECTED_FRAMES, DETECTED_OBJECTS
+from batch import parseTree, parseSize
+from pool import ClassifierError
+from tree import Tree, Node
+
+def parseMinSize(value):
+    if isinstance(value, basestring):
+        return parseSize(value)
+    w, h = value
+    return (int(w), int(h))
+
+PARAMETERS = {'scaleFactor': float, 'minNeighbors': int, 'minSize': parseMinSize,
+              'detectionScale': float}
+
+class RequestError(Exception):
+    """Error reported to the client with HTTP status 'status'.
+    """
+
+    def __init__(self, message, status=400):
+        Exception.__init__(self, message)
+        self.status = status
+
+def parseParameters(values):
+    """Return ClassifierParameters keyword arguments from 'values'.
+    """
+    params = {}
+    for key, value in values.iteritems():
+        if key not in PARAMETERS:
+            raise RequestError('Unknown parameter "{}"'.format(key))
+        try:
+            params[key] = PARAMETERS[key](value)
+        except (TypeError, ValueError):
+            raise RequestError('Invalid {} "{}"'.format(key, value))
+    if params.get('scaleFactor', 1.1) <= 1.0:
+        raise RequestError('scaleFactor must be greater than 1')
+    if params.get('minNeighbors', 0) < 0:
+        raise RequestError('minNeighbors must be positive')
+    if not 0 < params.get('detectionScale', 1.0) <= 1.0:
+        raise RequestError('detectionScale must be in ]0, 1]')
+    return params
+
+def parseSpec(trees, shared):
+    """Return the hashable spec of the detection tree of 'tree' parameters,
+    as sorted (object, parameters, children) tuples.
+    'shared' are parameters of every node.
+    """
+    objects = Detector.getDefaultAvailableObjects()
+
+    def fromNodes(nodes):
+        if not isinstance(nodes, list):
+            raise RequestError('Tree nodes must be a list')
+        spec = []
+        for node in nodes:
+            if not isinstance(node, dict) or node.get('object') not in objects:
+                raise RequestError('Unknown object in {}'.format(json.dumps(node)))
+            values = dict((k, v) for k, v in node.iteritems()
+                          if k not in ('object', 'children'))
+            params = dict(shared, **parseParameters(values))
+            spec.append((node['object'], tuple(sorted(params.items())),
+                         fromNodes(node.get('children', []))))
+        return tuple(sorted(spec))
+
+    def fromTree(tree):
+        return tuple(sorted((obj, tuple(sorted(shared.items())), fromTree(children))
+                            for obj, children in tree.iteritems()))
+
+    if not trees:
+        return fromTree(Detector.getDefaultObjectsTree())
+    if len(trees) == 1 and trees[0].lstrip().startswith('['):
+        try:
+            return fromNodes(json.loads(trees[0]))
+        except ValueError as e:
+            raise RequestError('Invalid tree: {}'.format(e))
+    try:
+        return fromTree(parseTree(trees))
+    except ValueError as e:
+        raise RequestError(str(e))
+
+def specTree(spec):
+    """Create the detection tree of 'spec'.
+    """
+    counter = [0]
+    def convert(spec):
+        tree = Tree()
+        for obj, params, children in spec:
+            counter[0] += 1
+            param = ClassifierParameters(counter[0], obj, obj, None,
+                                         'Rectangle', 'Outline', **dict(params))
+            tree[Node(obj, (True, param))] = convert(children)
+        return tree
+    return convert(spec)
+
+def nestRecords(objects):
+    """Return flat 'objects' records as a nested list of nodes.
+    """
+    nodes = []
+    roots = []
+    for obj in objects:
+        node = dict((k, v) for k, v in obj.iteritems() if k not in ('id', 'parent'))
+        node['children'] = []
+        nodes.append(node)
+        (roots if obj['parent'] is None else nodes[obj['parent']]['children']).append(node)
+    return roots
+
+########################################################
+# Workers
+
+worker = {}
+
+def initWorker(objects, cacheSize):
+    """Create the detector of a worker process and warm up its cascades.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    detector = Detector()
+    worker.update(detector=detector, trees=OrderedDict(), cacheSize=cacheSize, error=None)
+    try:
+        detector.warmUp(objects)
+    except Exception as e:
+        # Raising would make the pool respawn the worker forever
+        worker['error'] = 'Cannot load classifiers: {}'.format(e)
+
+def getTree(spec):
+    """Return the detection tree of 'spec', cached.
+    """
+    trees = worker['trees']
+    tree = trees.pop(spec, None)
+    if tree is None:
+        tree = specTree(spec)
+        if len(trees) >= worker['cacheSize']:
+            trees.popitem(last=False)
+    trees[spec] = tree
+    return tree
+
+def decodeImage(body, shape):
+    """Decode an encoded image, or a raw frame when 'shape' is (w, h).
+    """
+    if shape is None:
+        img = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise RequestError('Cannot decode image')
+        return img
+    w, h = shape
+    channels, rest = divmod(len(body), w * h) if w * h else (0, 1)
+    if rest or channels not in (1, 3, 4):
+        raise RequestError('Raw frame size does not match {}x{}'.format(w, h))
+    img = np.frombuffer(body, dtype=np.uint8).reshape(h, w, channels)
+    if channels == 1:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if channels == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+def detectRequest(request):
+    """Detect one request, return its response record.
+    """
+    body, shape, spec, equalizeHist, detectionSize = request
+    try:
+        start = time.time()
+        img = decodeImage(body, shape)
+        decoded = time.time()
+        detections = worker['detector'].detect(img, getTree(spec), equalizeHist,
+                                               detectionSize=detectionSize, columnar=True)
+        end = time.time()
+    except RequestError as e:
+        return {'error': str(e), 'status': e.status}
+    except Exception as e:
+        return {'error': str(e), 'status': 500}
+    objects = detections.toRecords()
+    h, w = img.shape[:2]
+    return {'width': w, 'height': h, 'decode': decoded - start, 'detect': end - decoded,
+            'objects': objects, 'tree': nestRecords(objects)}
+
+def detectBatch(requests):
+    """Detect a batch of requests, one pool task for all of them.
+    Never raises, the batcher would not release the worker otherwise.
+    """
+    try:
+        if worker.get('error'):
+            raise RuntimeError(worker['error'])
+        return [detectRequest(request) for request in requests]
+    except Exception as e:
+        return [errorResponse(e)] * len(requests)
+
+def errorResponse(error):
+    return {'error': 'Detection failed: {}'.format(error), 'status': 500}
+
+########################################################
+# Batching
+
+class Pending(object):
+    """A request waiting for its response.
+    """
+    __slots__ = ('request', 'received', 'done', 'response')
+
+    def __init__(self, request):
+        self.request = request
+        self.received = time.time()
+        self.done = threading.Event()
+        self.response = None
+
+class Batcher(object):
+    """Group queued requests in batches and run them on 'pool'.
+
+    A batch is formed once a worker is free. The requests then queued are
+    spread over the 'workers', at most 'batchSize' per batch, waiting at
+    most 'batchWait' seconds for them. A worker runs its batch serially, so
+    a single request goes alone to an idle worker.
+
+    At most one batch per worker is in flight, so the queue only grows
+    when all workers are busy. submit() fails when 'queueSize' requests
+    are already waiting.
+    """
+
+    def __init__(self, pool, workers, batchSize=8, batchWait=0.005, queueSize=64,
+                 registry=metrics.registry):
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.batchSize = max(1, batchSize)
+        self.batchWait = batchWait
+        self.queue = Queue.Queue(max(1, queueSize))
+        self.slots = threading.Semaphore(self.workers)
+        self.stopped = False
+        self.thread = threading.Thread(target=self.loop, name='batcher')
+        self.thread.daemon = True
+        self.requests = registry.counter('detection_server_requests_total',
+                                         'Detection requests by response status.')
+        self.batchSizes = registry.histogram('detection_server_batch_size',
+                                             'Requests per batch.', lowest=1, highest=1024)
+        self.queueWait = registry.histogram('detection_server_queue_seconds',
+                                            'Time from reception to batch dispatch.')
+        self.latency = registry.histogram('detection_server_latency_seconds',
+                                          'Time from reception to response.')
+        self.depth = registry.gauge('detection_server_queue_depth', 'Queued requests.')
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        self.thread.join()
+
+    def submit(self, request):
+        """Queue 'request', return its Pending or None when the queue is full.
+        """
+        pending = Pending(request)
+        try:
+            self.queue.put_nowait(pending)
+        except Queue.Full:
+            return None
+        self.depth.set(self.queue.qsize())
+        return pending
+
+    def loop(self):
+        while not self.stopped:
+            try:
+                first = self.queue.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+            self.slots.acquire()
+            batch = [first]
+            # Ceiling of the queued requests per worker
+            size = min(self.batchSize, -(-(1 + self.queue.qsize()) // self.workers))
+            deadline = time.time() + self.batchWait
+            while len(batch) < size:
+                timeout = deadline - time.time()
+                try:
+                    batch.append(self.queue.get(timeout=timeout) if timeout > 0
+                                 else self.queue.get_nowait())
+                except Queue.Empty:
+                    break
+            self.depth.set(self.queue.qsize())
+            now = time.time()
+            for pending in batch:
+                self.queueWait.observe(now - pending.received)
+            self.batchSizes.observe(len(batch))
+            try:
+                self.pool.apply_async(detectBatch, ([p.request for p in batch],),
+                                      callback=lambda responses, batch=batch:
+                                      self.finish(batch, responses))
+            except Exception as e:
+                self.finish(batch, [errorResponse(e)] * len(batch))
+
+    def finish(self, batch, responses):
+        """Pool callback of a batch.
+        """
+        self.slots.release()
+        now = time.time()
+        if len(responses) != len(batch):
+            responses = [errorResponse('missing responses')] * len(batch)
+        for pending, response in zip(batch, responses):
+            pending.response = response
+            if 'error' not in response:
+                self.recordDetection(response)
+            self.requests.inc(status=response.get('status', 200))
+            self.latency.observe(now - pending.received)
+            pending.done.set()
+
+    def recordDetection(self, response):
+        """Record the detector metrics of a response in this process,
+        workers update their own copy of the registry.
+        """
+        DETECT_SECONDS.observe(response['detect'])
+        # Workers detect independent images, each one is a keyframe
+        DETECTED_FRAMES.inc(kind='keyframe')
+        for obj in response['objects']:
+            DETECTED_OBJECTS.inc(classifier=obj['object'])
+
+########################################################
+# HTTP
+
+class DetectionHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def sendJSON(self, record, status=200, headers=()):
+        body = json.dumps(record)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def sendError(self, status, message, headers=()):
+        self.server.batcher.requests.inc(status=status)
+        self.sendJSON({'error': message}, status, headers)
+
+    def do_GET(self):
+        path = urlparse.urlparse(self.path).path
+        if path == '/health':
+            self.sendJSON({'status': 'ok', 'workers': self.server.workers})
+        elif path == '/stats':
+            self.sendJSON(self.server.stats())
+        elif path == '/metrics':
+            body = self.server.registry.expose()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.sendError(404, 'Not found')
+
+    def do_POST(self):
+        url = urlparse.urlparse(self.path)
+        if url.path != '/detect':
+            self.sendError(404, 'Not found')
+            return
+        length = int(self.headers.getheader('Content-Length') or 0)
+        if length > self.server.maxBody:
+            self.sendError(413, 'Body larger than {} bytes'.format(self.server.maxBody))
+            return
+        body = self.rfile.read(length)
+        try:
+            request = self.parseRequest(urlparse.parse_qs(url.query), body)
+        except RequestError as e:
+            self.sendError(e.status, str(e))
+            return
+        pending = self.server.batcher.submit(request)
+        if pending is None:
+            self.sendError(429, 'Too many requests', [('Retry-After', '1')])
+            return
+        if not pending.done.wait(self.server.requestTimeout):
+            self.sendError(504, 'Detection timed out')
+            return
+        response = pending.response
+        if 'error' in response:
+            self.sendJSON({'error': response['error']}, response['status'])
+        else:
+            self.sendJSON(response)
+
+    def parseRequest(self, query, body):
+        """Return the worker request of a /detect query.
+        """
+        if not body:
+            raise RequestError('Empty body')
+        query = dict(query)
+        trees = query.pop('tree', [])
+        shape = None
+        if 'width' in query or 'height' in query:
+            try:
+                shape = (int(query.pop('width', [0])[0]), int(query.pop('height', [0])[0]))
+            except ValueError:
+                raise RequestError('Invalid raw frame size')
+        equalizeHist = query.pop('equalize', ['1'])[0] not in ('0', 'false')
+        detectionSize = query.pop('detectionSize', [None])[0]
+        if detectionSize is not None:
+            try:
+                detectionSize = int(detectionSize) or None
+            except ValueError:
+                raise RequestError('Invalid detectionSize')
+        shared = parseParameters(dict((k, v[-1]) for k, v in query.iteritems()))
+        spec = parseSpec(trees, shared)
+        return body, shape, spec, equalizeHist, detectionSize
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class DetectionServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """HTTP server answering each connection in its own thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, batcher, workers, registry=metrics.registry,
+                 requestTimeout=30.0, maxBody=32 << 20, verbose=False):
+        BaseHTTPServer.HTTPServer.__init__(self, address, DetectionHandler)
+        self.batcher = batcher
+        self.workers = workers
+        self.registry = registry
+        self.requestTimeout = requestTimeout
+        self.maxBody = maxBody
+        self.verbose = verbose
+        self.started = time.time()
+
+    def stats(self):
+        batcher = self.batcher
+        requests = dict((str(dict(key)['status']), int(value))
+                        for suffix, key, extra, value in batcher.requests.samples())
+        count, total = batcher.latency.get()
+        batches, batched = batcher.batchSizes.get()
+        return {'uptime': time.time() - self.started, 'workers': self.workers,
+                'queued': batcher.queue.qsize(), 'queueSize': batcher.queue.maxsize,
+                'requests': requests, 'batches': batches,
+                'meanBatchSize': batched / batches if batches else 0.0,
+                'latency': {'mean': total / count if count else 0.0,
+                            'p50': batcher.latency.quantile(0.5),
+                            'p99': batcher.latency.quantile(0.99)},
+                'queueWait': {'p50': batcher.queueWait.quantile(0.5),
+                              'p99': batcher.queueWait.quantile(0.99)}}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve object detection over HTTP.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help='maximum requests per batch')
+    parser.add_argument('--batch-wait', type=float, default=5.0, metavar='MS',
+                        help='maximum time waited for the requests of a batch')
+    parser.add_argument('--queue-size', type=int, default=64,
+                        help='queued requests before answering 429')
+    parser.add_argument('--timeout', type=float, default=30.0, metavar='SECONDS')
+    parser.add_argument('--warm', action='append', metavar='OBJECT',
+                        help='classifiers loaded at startup (default: all)')
+    parser.add_argument('--tree-cache', type=int, default=64,
+                        help='detection trees kept by each worker')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log requests')
+    args = parser.parse_args(argv)
+
+    for obj in args.warm or []:
+        if obj not in Detector.getDefaultAvailableObjects():
+            parser.error('Unknown object "{}"'.format(obj))
+    try:
+        # Fail before starting workers that could not detect anything
+        Detector().warmUp(args.warm)
+    except (ClassifierError, cv2.error) as e:
+        print >> sys.stderr, 'Cannot load classifiers: {}'.format(e)
+        return 1
+    workers = max(1, args.jobs)
+    pool = multiprocessing.Pool(workers, initWorker, (args.warm, args.tree_cache))
+    batcher = Batcher(pool, workers, args.batch_size, args.batch_wait / 1000.0,
+                      args.queue_size).start()
+    server = DetectionServer((args.host, args.port), batcher, workers,
+                             requestTimeout=args.timeout, verbose=args.verbose)
+    print >> sys.stderr, 'Serving detection on http://{}:{}/ with {} workers'.format(
+        args.host, server.server_address[1], workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        pool.terminate()
+        pool.join()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_batch.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 13:31:09 2026 (+0200)
+# Last-Updated: Mon Oct 26 16:21:50 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 11
+#
+
+import os
+import signal
+import unittest
+import multiprocessing
+import batch
+from detector import Detector
+
+class BrokenDetector(Detector):
+
+    def warmUp(self, objects=None):
+        raise IOError('broken cascade')
+
+class MissingCascadeDetector(Detector):
+
+    def __init__(self, *args, **kwargs):
+        Detector.__init__(self, *args, **kwargs)
+        self.classifiers.paths[Detector.EYE] = 'missing.xml'
+
+def exitProcess(item):
+    os._exit(1)
+
+class InitWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sigint = signal.getsignal(signal.SIGINT)
+
+    def tearDown(self):
+        signal.signal(signal.SIGINT, self.sigint)
+        batch.Detector = Detector
+        batch.worker.clear()
+
+    def initWorker(self):
+        batch.initWorker(batch.parseTree(['Face/Eye']), {}, True)
+
+    def testWarmUpError(self):
+        batch.Detector = BrokenDetector
+        self.initWorker()
+        with self.assertRaises(batch.WorkerError) as context:
+            batch.detectPath('missing.png')
+        self.assertIn('broken cascade', str(context.exception))
+
+    def testMissingCascade(self):
+        batch.Detector = MissingCascadeDetector
+        self.initWorker()
+        with self.assertRaises(batch.WorkerError) as context:
+            batch.detectPath('missing.png')
+        self.assertIn('Cannot load Eye classifier', str(context.exception))
+
+    def testReadError(self):
+        self.initWorker()
+        self.assertEqual(batch.detectPath('missing.png'),
+                         {'path': 'missing.png', 'error': 'Cannot read image'})
+
+class RedactPathTest(unittest.TestCase):
+
+    def testNestedInputs(self):
+        self.assertEqual(batch.redactPath('crowd/a.png', 'out'), 'out/crowd/a.png')
+        self.assertEqual(batch.redactPath('crowd/2026/a.png', 'out'),
+                         'out/crowd/2026/a.png')
+        self.assertEqual(batch.redactPath('./crowd//a.png', 'out'), 'out/crowd/a.png')
+
+    def testOutsidePaths(self):
+        self.assertEqual(batch.redactPath('/data/a.png', 'out'), 'out/data/a.png')
+        parent = os.path.dirname(os.getcwd()).lstrip(os.sep)
+        self.assertEqual(batch.redactPath('../a.png', 'out'),
+                         os.path.join('out', parent, 'a.png'))
+
+class ImapWorkersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = multiprocessing.Pool(2)
+
+    def tearDown(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def testResults(self):
+        results = batch.imapWorkers(self.pool, abs, range(-5, 0), 2)
+        self.assertEqual(sorted(results), [1, 2, 3, 4, 5])
+
+    def testDeadWorker(self):
+        with self.assertRaises(batch.WorkerError):
+            list(batch.imapWorkers(self.pool, exitProcess, [1], interval=0.1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_cache.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 15:12:47 2026 (+0200)
+# Last-Updated: Sun Oct 25 15:41:30 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 8
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+from cache import AssetCache
+
+class AssetCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.loads = []
+        self.cache = AssetCache(self.load, self.scale, len, budget=100, checkInterval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self, path):
+        self.loads.append(path)
+        with open(path) as f:
+            return f.read()
+
+    def scale(self, asset, size):
+        return asset * size[0]
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def testHit(self):
+        path = self.write('a', 'abc')
+        self.assertEqual(self.cache.get(path), 'abc')
+        self.assertEqual(self.cache.get(path), 'abc')
+        self.assertEqual(self.loads, [path])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def testScaled(self):
+        path = self.write('a', 'ab')
+        self.assertEqual(self.cache.get(path, (3, 1)), 'ababab')
+        self.assertEqual(self.cache.get(path, (2, 1)), 'abab')
+        # Scaled variants share the loaded original
+        self.assertEqual(self.loads, [path])
+        self.assertEqual(self.cache.stats()['assets'], 3)
+
+    def testModifiedFile(self):
+        path = self.write('a', 'abc')
+        self.cache.get(path)
+        self.write('a', 'abcd')
+        self.assertEqual(self.cache.get(path), 'abcd')
+        self.assertEqual(len(self.loads), 2)
+
+    def testCheckInterval(self):
+        cache = AssetCache(self.load, self.scale, len, checkInterval=60)
+        path = self.write('a', 'abc')
+        cache.get(path)
+        self.write('a', 'abcd')
+        # Not stat'ed again before 'checkInterval'
+        self.assertEqual(cache.get(path), 'abc')
+
+    def testMissingFile(self):
+        self.assertIsNone(self.cache.get(os.path.join(self.dir, 'missing')))
+        self.assertEqual(self.loads, [])
+
+    def testBudget(self):
+        paths = [self.write(name, name * 40) for name in 'abc']
+        for path in paths:
+            self.cache.get(path)
+        # 120 bytes do not fit in 100, 'a' is the least recently used
+        self.assertEqual(self.cache.stats()['bytes'], 80)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.cache.get(paths[0])
+        self.assertEqual(self.loads, paths + paths[:1])
+
+    def testLargerThanBudget(self):
+        path = self.write('a', 'a' * 200)
+        self.assertEqual(self.cache.get(path), 'a' * 200)
+        self.assertEqual(self.cache.stats()['assets'], 1)
+
+    def testGenerate(self):
+        built = []
+
+        def factory():
+            built.append(1)
+            return 'mask'
+
+        self.assertEqual(self.cache.generate('feather', (4, 4), factory), 'mask')
+        self.assertEqual(self.cache.generate('feather', (4, 4), factory), 'mask')
+        self.assertEqual(len(built), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_detector.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 10:12:40 2026 (+0200)
+# Last-Updated: Mon Oct 26 16:48:12 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 17
+#
+
+import os
+import threading
+import unittest
+import multiprocessing.pool
+import cv2
+from detector import Detector, ClassifierParameters
+from tree import Tree, Node
+
+FACES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     'faces')
+
+def parameters(classifier, hash, **options):
+    return ClassifierParameters(hash, classifier, classifier, None,
+                                'Rectangle', 'Outline', **options)
+
+def objectsTree():
+    tree = Tree()
+    face = tree[Node(Detector.FACE, (True, parameters(Detector.FACE, 1)))]
+    face[Node(Detector.EYE, (True, parameters(Detector.EYE, 2)))]
+    return tree
+
+class StabilizeTest(unittest.TestCase):
+
+    def stabilize(self, detector, frames):
+        param = parameters(Detector.FACE, 1, stabilize=True)
+        for rects in frames:
+            detector.state.frameIndex += 1
+            history = detector.stabilize(param, None, rects)
+        return history
+
+    def testUnmatchedRectsDropped(self):
+        history = self.stabilize(Detector(), [[(10, 10, 50, 50)],
+                                              [(12, 10, 50, 50), (200, 10, 60, 60)]])
+        self.assertEqual(history.lastRects(), [(12, 10, 50, 50)])
+
+    def testNewTracks(self):
+        history = self.stabilize(Detector(newTracks=True, confirmFrames=2),
+                                 [[(10, 10, 50, 50)],
+                                  [(12, 10, 50, 50), (200, 10, 60, 60)],
+                                  [(202, 12, 60, 60), (14, 10, 50, 50)]])
+        self.assertEqual(history.lastRects(), [(14, 10, 50, 50), (202, 12, 60, 60)])
+        self.assertEqual(history.hashs, [(10, 10, 50, 50), (200, 10, 60, 60)])
+
+    def testNewTracksConfirmed(self):
+        frames = [[(10, 10, 50, 50)], [(12, 10, 50, 50), (200, 10, 60, 60)],
+                  [(14, 10, 50, 50)], [(16, 10, 50, 50)]]
+        history = self.stabilize(Detector(newTracks=True), frames)
+        # The rect seen on a single frame never becomes a track
+        self.assertEqual(history.hashs, [(10, 10, 50, 50)])
+        self.assertEqual(history.lastRects(), [(16, 10, 50, 50)])
+        self.assertEqual(history.candidates, [])
+        history = self.stabilize(Detector(newTracks=True), frames[:2])
+        self.assertEqual(history.lastRects(), [])
+
+class SpeedupTest(unittest.TestCase):
+
+    def testMeasuredSpeedup(self):
+        img = cv2.resize(cv2.imread(os.path.join(FACES, 'bean.png')), (1280, 960))
+        detector = Detector()
+        rows = []
+        debugTable = lambda args, append=False: rows.append([arg for arg, size in args])
+        for i in xrange(2):
+            detector.detect(img, objectsTree(), True, debugTable, detectionSize=320)
+        # The full size timing is not repeated on each frame
+        self.assertEqual(detector.fullSizeTimes.keys(), [1])
+        self.assertEqual(detector.fullSizeTimes[1][1], 1)
+        self.assertIn('faster than full size', rows[-1][0])
+
+class ThreadsTest(unittest.TestCase):
+
+    def testSetThreadsDuringMap(self):
+        detector = Detector(threads=2)
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def task(i):
+            started.set()
+            release.wait(5)
+            return i * 2
+
+        mapping = threading.Thread(target=lambda: results.append(
+            detector.map(task, range(4))))
+        mapping.start()
+        self.assertTrue(started.wait(5))
+        pool = detector.threadPool
+        detector.setThreads(3)
+        # The pool of the running map is retired, not closed
+        self.assertIsNone(detector.threadPool)
+        self.assertEqual(pool._state, multiprocessing.pool.RUN)
+        release.set()
+        mapping.join(5)
+        self.assertEqual(results, [[0, 2, 4, 6]])
+        self.assertEqual(pool._state, multiprocessing.pool.CLOSE)
+        self.assertEqual(detector.poolUsers, {})
+        self.assertEqual(detector.map(lambda i: i + 1, range(4)), [1, 2, 3, 4])
+        self.assertEqual(detector.threadPool._processes, 3)
+
+if __name__ == '__main__':
+    unittest.main()
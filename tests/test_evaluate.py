@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_evaluate.py
+#
+# Author: Yann KOETH
+# Created: Mon Oct 26 10:05:33 2026 (+0200)
+# Last-Updated: Mon Oct 26 10:31:02 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 4
+#
+
+import os
+import signal
+import unittest
+import evaluate
+from test_detector import FACES
+
+class GetImageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sigint = signal.getsignal(signal.SIGINT)
+        evaluate.initWorker([], [], True, 2)
+        self.paths = [os.path.join(FACES, name)
+                      for name in ('bean.png', 'watson.png', 'norton.png')]
+
+    def tearDown(self):
+        signal.signal(signal.SIGINT, self.sigint)
+        evaluate.worker.clear()
+
+    def testKeepsFirstImages(self):
+        # Two grid points reading the images in the same order
+        first = [evaluate.getImage(path) for path in self.paths]
+        second = [evaluate.getImage(path) for path in self.paths]
+        self.assertEqual(sorted(evaluate.worker['images']), sorted(self.paths[:2]))
+        self.assertIs(second[0], first[0])
+        self.assertIs(second[1], first[1])
+        self.assertIsNot(second[2], first[2])
+        self.assertEqual(second[2].ndim, 2)
+
+    def testMissingImage(self):
+        self.assertIsNone(evaluate.getImage('missing.png'))
+
+class MatchCountsTest(unittest.TestCase):
+
+    def testCounts(self):
+        detected = [(10, 10, 50, 50), (200, 200, 20, 20)]
+        truth = [(12, 10, 50, 50), (400, 10, 30, 30)]
+        self.assertEqual(evaluate.matchCounts(detected, truth), (1, 1, 1))
+        self.assertEqual(evaluate.matchCounts([], truth), (0, 0, 2))
+
+if __name__ == '__main__':
+    unittest.main()
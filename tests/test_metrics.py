@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_metrics.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 17:12:36 2026 (+0200)
+# Last-Updated: Sun Oct 25 17:48:20 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 9
+#
+
+import urllib2
+import unittest
+import numpy as np
+import metrics
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def testCounter(self):
+        counter = self.registry.counter('objects_total', 'Objects.')
+        counter.inc()
+        counter.inc(2, classifier='Eye')
+        counter.inc(classifier='Eye')
+        self.assertEqual(counter.get(), 1)
+        self.assertEqual(counter.get(classifier='Eye'), 3)
+        self.assertEqual(counter.total(), 4)
+
+    def testGauge(self):
+        gauge = self.registry.gauge('fps', 'FPS.')
+        gauge.set(30)
+        gauge.set(25.5)
+        self.assertEqual(gauge.get(), 25.5)
+
+    def testRegister(self):
+        counter = self.registry.counter('frames_total', 'Frames.')
+        self.assertIs(self.registry.counter('frames_total', 'Frames.'), counter)
+        self.assertIs(self.registry['frames_total'], counter)
+        with self.assertRaises(ValueError):
+            self.registry.gauge('frames_total', 'Frames.')
+
+    def testHistogramQuantiles(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency.')
+        values = np.random.RandomState(0).lognormal(-4, 1, 10000)
+        for value in values:
+            histogram.observe(value)
+        count, total = histogram.get()
+        self.assertEqual(count, 10000)
+        self.assertAlmostEqual(total, values.sum())
+        for q in (0.5, 0.9, 0.99):
+            expected = np.percentile(values, q * 100)
+            # Relative error is bounded by the 1 / precision bucket width
+            self.assertLess(abs(histogram.quantile(q) - expected) / expected, 1.0 / 32)
+
+    def testHistogramBounds(self):
+        histogram = self.registry.histogram('size', 'Size.', lowest=1, highest=1024)
+        for value in (3, 3, 5000):
+            histogram.observe(value)
+        self.assertAlmostEqual(histogram.quantile(0), 3, delta=3 / 32.0)
+        # Values above 'highest' are in the last bucket, clamped to the maximum
+        self.assertEqual(histogram.quantile(1), 5000)
+        self.assertEqual(histogram.quantile(0.5, kind='missing'), 0.0)
+
+    def testExpose(self):
+        self.registry.counter('requests_total', 'Requests.').inc(status=200)
+        self.registry.gauge('path', 'Path.').set(1, name='a "b"\\c')
+        self.registry.histogram('seconds', 'Time.', quantiles=(0.5,)).observe(0.25)
+        text = self.registry.expose()
+        self.assertIn('# TYPE requests_total counter\nrequests_total{status="200"} 1.0\n', text)
+        self.assertIn('path{name="a \\"b\\"\\\\c"} 1', text)
+        self.assertIn('# TYPE seconds summary', text)
+        self.assertIn('seconds_count 1', text)
+        self.assertIn('seconds_sum 0.25', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def testServer(self):
+        self.registry.counter('frames_total', 'Frames.').inc(3)
+        server = metrics.MetricsServer(0, registry=self.registry).start()
+        try:
+            url = 'http://127.0.0.1:{}'.format(server.port)
+            body = urllib2.urlopen(url + '/metrics').read()
+            self.assertIn('frames_total 3.0', body)
+            with self.assertRaises(urllib2.HTTPError):
+                urllib2.urlopen(url + '/other')
+        finally:
+            server.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_pipeline.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 11:02:14 2026 (+0200)
+# Last-Updated: Mon Oct 26 15:44:02 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 14
+#
+
+import time
+import threading
+import unittest
+import pipeline
+from pipeline import BoundedQueue, Pipeline, DROP_LATEST, DROP_OLDEST, DROP_NONE
+
+class BoundedQueueTest(unittest.TestCase):
+
+    def fill(self, policy, count=5):
+        queue = BoundedQueue('test', 2, policy)
+        dropped = []
+        for i in xrange(count):
+            dropped.extend(queue.put(i))
+        return queue, dropped
+
+    def drain(self, queue):
+        items = []
+        while len(queue):
+            items.append(queue.get())
+        return items
+
+    def testDropLatest(self):
+        queue, dropped = self.fill(DROP_LATEST)
+        self.assertEqual(self.drain(queue), [4])
+        self.assertEqual(dropped, [0, 1, 2, 3])
+
+    def testDropOldest(self):
+        queue, dropped = self.fill(DROP_OLDEST)
+        self.assertEqual(self.drain(queue), [3, 4])
+        self.assertEqual(dropped, [0, 1, 2])
+
+    def testDropNoneBlocks(self):
+        queue = BoundedQueue('test', 2, DROP_NONE)
+        queue.put(0)
+        queue.put(1)
+        thread = threading.Thread(target=queue.put, args=(2,))
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(queue.get(), 0)
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.drain(queue), [1, 2])
+
+    def testDroppedMetric(self):
+        before = pipeline.DROPPED_FRAMES.get(queue='metric')
+        queue = BoundedQueue('metric', 1, DROP_OLDEST)
+        for i in xrange(3):
+            queue.put(i)
+        self.assertEqual(pipeline.DROPPED_FRAMES.get(queue='metric') - before, 2)
+
+    def testClosed(self):
+        queue = BoundedQueue('test', 2, DROP_NONE)
+        queue.put(0)
+        queue.close()
+        self.assertEqual(queue.put(1), [1])
+        self.assertEqual(queue.get(), 0)
+        self.assertIsNone(queue.get(timeout=0.01))
+
+    def testGetTimeout(self):
+        start = time.time()
+        self.assertIsNone(BoundedQueue('test').get(timeout=0.05))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+
+class PipelineTest(unittest.TestCase):
+
+    def runPipeline(self, policy, workers, newState=None, frames=50):
+        source = iter(xrange(frames))
+        states = []
+
+        def detect(image, state):
+            time.sleep(0.002)
+            states.append(state)
+            return image * 2, -image
+
+        p = Pipeline(lambda: next(source, None), detect, workers, policy=policy,
+                     newState=newState)
+        p.start()
+        rendered = []
+        while not p.finished():
+            frame = p.get(0.1)
+            if frame is not None:
+                p.rendered(frame, time.time())
+                rendered.append(frame)
+        p.stop()
+        return rendered, states
+
+    def testInOrder(self):
+        for policy in (DROP_LATEST, DROP_OLDEST, DROP_NONE):
+            rendered, states = self.runPipeline(policy, 3)
+            indexes = [frame.index for frame in rendered]
+            self.assertEqual(indexes, sorted(set(indexes)))
+            for frame in rendered:
+                self.assertEqual(frame.result, frame.image * 2)
+                self.assertEqual(frame.preprocessed, -frame.image)
+
+    def testNoDrop(self):
+        rendered, states = self.runPipeline(DROP_NONE, 1)
+        self.assertEqual([frame.index for frame in rendered], range(50))
+        self.assertEqual(set(states), set([None]))
+
+    def testWorkerStates(self):
+        created = []
+
+        def newState():
+            created.append(object())
+            return created[-1]
+
+        rendered, states = self.runPipeline(DROP_NONE, 3, newState=newState)
+        self.assertEqual(len(created), 3)
+        self.assertTrue(set(states) <= set(created))
+
+    def testDetectError(self):
+        def detect(image, state):
+            if image == 5:
+                raise ValueError('detect failed')
+            return image, None
+
+        source = iter(xrange(50))
+        p = Pipeline(lambda: next(source, None), detect, 2, policy=DROP_NONE)
+        p.start()
+        deadline = time.time() + 5
+        while not p.finished() and time.time() < deadline:
+            p.get(0.1)
+        # The workers left and released the results
+        self.assertTrue(p.finished())
+        self.assertEqual(p.workersLeft, 0)
+        with self.assertRaises(ValueError):
+            p.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_redact.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 16:40:21 2026 (+0200)
+# Last-Updated: Sun Oct 25 17:05:12 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 7
+#
+
+import unittest
+import numpy as np
+from redact import Redactor, mergeBoxes, MODES
+
+class MergeBoxesTest(unittest.TestCase):
+
+    def testDisjoint(self):
+        boxes = [(0, 0, 10, 10), (20, 0, 30, 10)]
+        self.assertEqual(mergeBoxes(boxes), boxes)
+
+    def testTouchingNotMerged(self):
+        boxes = [(0, 0, 10, 10), (10, 0, 20, 10)]
+        self.assertEqual(mergeBoxes(boxes), boxes)
+
+    def testOverlapping(self):
+        self.assertEqual(mergeBoxes([(0, 0, 10, 10), (5, 5, 20, 15)]), [(0, 0, 20, 15)])
+
+    def testChain(self):
+        # The third box links the first two once they are merged
+        boxes = [(0, 0, 10, 10), (30, 0, 40, 10), (8, 0, 32, 5)]
+        self.assertEqual(mergeBoxes(boxes), [(0, 0, 40, 10)])
+
+    def testGrownBoxOverlapsEarlier(self):
+        boxes = [(0, 20, 10, 30), (20, 0, 30, 10), (15, 5, 25, 25), (5, 22, 18, 28)]
+        self.assertEqual(mergeBoxes(boxes), [(0, 0, 30, 30)])
+
+class RedactorTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.img = rng.randint(0, 256, size=(120, 160, 3)).astype(np.uint8)
+
+    def testOutsideUntouched(self):
+        for mode in MODES:
+            img = self.img.copy()
+            Redactor(mode, 5).redact(img, [(10, 10, 30, 30), (30, 20, 40, 40)])
+            mask = np.zeros(img.shape[:2], dtype=bool)
+            mask[10:40, 10:40] = mask[20:60, 30:70] = True
+            np.testing.assert_array_equal(img[~mask], self.img[~mask])
+            self.assertFalse((img[mask] == self.img[mask]).all())
+
+    def testMergedSameAsSeparate(self):
+        # Far apart regions give the same result redacted together or not
+        redactor = Redactor(MODES[0], 5)
+        together = redactor.redact(self.img.copy(), [(5, 5, 20, 20), (100, 60, 30, 30)])
+        separate = redactor.redact(self.img.copy(), [(5, 5, 20, 20)])
+        separate = redactor.redact(separate, [(100, 60, 30, 30)])
+        np.testing.assert_array_equal(together, separate)
+
+    def testOverlappingFilteredOnce(self):
+        # Overlapping regions are filtered from the original pixels
+        redactor = Redactor(MODES[1], 3)
+        img = redactor.redact(self.img.copy(), [(10, 10, 30, 30), (20, 20, 30, 30)])
+        whole = redactor.filter(self.img[7:53, 7:53])
+        np.testing.assert_array_equal(img[20:40, 20:40], whole[13:33, 13:33])
+
+    def testMask(self):
+        mask = np.zeros((20, 20), dtype=np.float32)
+        mask[:, 10:] = 1
+        img = Redactor(MODES[0], 5).redact(self.img.copy(), [(10, 10, 20, 20)], [mask])
+        np.testing.assert_array_equal(img[10:30, 10:20], self.img[10:30, 10:20])
+        self.assertFalse((img[10:30, 20:30] == self.img[10:30, 20:30]).all())
+
+    def testClipped(self):
+        img = Redactor(MODES[2], 4).redact(self.img.copy(), [(-10, -10, 30, 30),
+                                                             (200, 200, 10, 10)])
+        np.testing.assert_array_equal(img[20:], self.img[20:])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_results.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 15:50:12 2026 (+0200)
+# Last-Updated: Sun Oct 25 16:34:58 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 10
+#
+
+import os
+import cv2
+import unittest
+import numpy as np
+from detector import Detector, ClassifierParameters
+from results import Detections, ResultsBuilder
+from test_detector import FACES, objectsTree
+
+def parameters(classifier, hash):
+    return ClassifierParameters(hash, classifier, classifier, None, 'Rectangle', 'Outline')
+
+class DetectionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.face = parameters('Face', 1)
+        self.eye = parameters('Eye', 2)
+        builder = ResultsBuilder()
+        first = builder.add(self.face, -1, (10, 10, 100, 100), track=(10, 10, 100, 100),
+                            score=5)
+        builder.add(self.eye, first, (20, 30, 20, 20))
+        builder.add(self.eye, first, (60, 30, 30, 30), score=2)
+        builder.add(self.face, -1, (200, 10, 50, 50))
+        self.detections = builder.finish()
+
+    def testColumns(self):
+        d = self.detections
+        self.assertEqual(len(d), 4)
+        self.assertEqual(d.classId.tolist(), [0, 1, 1, 0])
+        self.assertEqual(d.parent.tolist(), [-1, 0, 0, -1])
+        self.assertEqual(d.w.tolist(), [100, 20, 30, 50])
+        self.assertEqual(d.track.tolist(), [hash((10, 10, 100, 100)), -1, -1, -1])
+        self.assertTrue(np.isnan(d.score[1]))
+        self.assertEqual(d.classifiers.tolist(), ['Face', 'Eye', 'Eye', 'Face'])
+        self.assertEqual(d.counts(), {'Face': 2, 'Eye': 2})
+
+    def testRecords(self):
+        records = self.detections.toRecords()
+        self.assertEqual(records[1], {'id': 1, 'parent': 0, 'object': 'Eye', 'name': 'Eye',
+                                      'x': 20, 'y': 30, 'w': 20, 'h': 20})
+        self.assertIsNone(records[3]['parent'])
+
+    def testTake(self):
+        # Rows whose parent is not kept become roots
+        taken = self.detections.take([2, 3])
+        self.assertEqual(taken.parent.tolist(), [-1, -1])
+        taken = self.detections.take([0, 2])
+        self.assertEqual(taken.parent.tolist(), [-1, 0])
+        self.assertEqual(taken.rects.tolist(), [[10, 10, 100, 100], [60, 30, 30, 30]])
+
+    def testSelect(self):
+        d = self.detections
+        self.assertEqual(d.select(classifier='Eye').tolist(), [False, True, True, False])
+        self.assertEqual(d.select(minScore=3).tolist(), [True, False, False, False])
+        self.assertEqual(d.select(minSize=(30, 30)).tolist(), [True, False, True, True])
+        self.assertEqual(len(d.filter(d.select(classifier='Face'))), 2)
+
+    def testConcatenate(self):
+        merged, offsets = Detections.concatenate([self.detections, self.detections])
+        self.assertEqual(offsets.tolist(), [0, 4])
+        self.assertEqual(len(merged.params), 2)
+        self.assertEqual(merged.parent.tolist(), [-1, 0, 0, -1, -1, 4, 4, -1])
+
+    def testTreeView(self):
+        tree = self.detections.tree()
+        self.assertEqual(len(tree), 2)
+        self.assertEqual([(node.name, node.data[0]) for node in tree.walk()],
+                         [('Face', (10, 10, 100, 100)), ('Eye', (20, 30, 20, 20)),
+                          ('Eye', (60, 30, 30, 30)), ('Face', (200, 10, 50, 50))])
+
+class ColumnarTest(unittest.TestCase):
+
+    def testSameAsTree(self):
+        img = cv2.imread(os.path.join(FACES, 'watson.png'))
+        tree = objectsTree()
+        expected = [(node.name, tuple(node.data[0]))
+                    for node in Detector().detect(img, tree).walk()]
+        detections = Detector().detect(img, tree, columnar=True)
+        self.assertTrue(expected)
+        self.assertEqual(sorted((node.name, node.data[0]) for node in detections.tree().walk()),
+                         sorted(expected))
+
+if __name__ == '__main__':
+    unittest.main()
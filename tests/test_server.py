@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_server.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 11:52:03 2026 (+0200)
+# Last-Updated: Mon Oct 26 11:12:50 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 11
+#
+
+import time
+import unittest
+import metrics
+import server
+
+class InlinePool(object):
+    """Pool running tasks in the calling thread.
+    """
+
+    def apply_async(self, func, args, callback=None):
+        result = func(*args)
+        if callback:
+            callback(result)
+
+class BrokenPool(object):
+
+    def apply_async(self, func, args, callback=None):
+        raise RuntimeError('pool closed')
+
+class DeferredPool(object):
+    """Pool keeping tasks until they are completed by the test.
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def apply_async(self, func, args, callback=None):
+        self.tasks.append((args[0], callback))
+
+    def complete(self):
+        tasks, self.tasks = self.tasks, []
+        for requests, callback in tasks:
+            callback([{'error': 'done', 'status': 500}] * len(requests))
+
+class BatcherTest(unittest.TestCase):
+
+    def submit(self, pool, requests):
+        batcher = server.Batcher(pool, 1, batchWait=0, registry=metrics.Registry())
+        batcher.start()
+        try:
+            pendings = [batcher.submit(request) for request in requests]
+            for pending in pendings:
+                self.assertTrue(pending.done.wait(5))
+            # The slot of the worker was released
+            self.assertTrue(batcher.slots.acquire(False))
+        finally:
+            batcher.stop()
+        return [pending.response for pending in pendings]
+
+    def testWorkerError(self):
+        responses = self.submit(InlinePool(), [('not', 'a', 'request')] * 2)
+        self.assertEqual([r['status'] for r in responses], [500, 500])
+
+    def testPoolError(self):
+        responses = self.submit(BrokenPool(), [None])
+        self.assertEqual(responses[0]['status'], 500)
+        self.assertIn('pool closed', responses[0]['error'])
+
+    def waitTasks(self, pool, count):
+        deadline = time.time() + 5
+        while len(pool.tasks) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return [requests for requests, callback in pool.tasks]
+
+    def testBurstSpreadOverWorkers(self):
+        pool = DeferredPool()
+        batcher = server.Batcher(pool, 4, batchSize=8, batchWait=0,
+                                 registry=metrics.Registry())
+        pendings = [batcher.submit(i) for i in range(8)]
+        batcher.start()
+        try:
+            # Each worker gets at most 2 of the 8 queued requests
+            self.assertEqual(self.waitTasks(pool, 4), [[0, 1], [2, 3], [4], [5]])
+            pool.complete()
+            self.assertEqual(self.waitTasks(pool, 2), [[6], [7]])
+            pool.complete()
+            self.assertTrue(all(pending.done.wait(5) for pending in pendings))
+        finally:
+            pool.complete()
+            batcher.stop()
+
+    def testRequestError(self):
+        request = ('garbage', None, (), True, None)
+        self.assertEqual(server.detectBatch([request])[0]['status'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
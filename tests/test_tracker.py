@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_tracker.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 14:10:26 2026 (+0200)
+# Last-Updated: Sun Oct 25 14:58:03 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 11
+#
+
+import unittest
+import numpy as np
+import tracker
+
+class CostTest(unittest.TestCase):
+
+    def testDistance(self):
+        cost = tracker.costMatrix([(0, 0, 10, 10)], [(0, 0, 10, 10), (3, 4, 10, 10)])
+        np.testing.assert_allclose(cost, [[0, 5]])
+
+    def testIoU(self):
+        cost = tracker.costMatrix([(0, 0, 10, 10)], [(0, 0, 10, 10), (5, 0, 10, 10),
+                                                     (20, 20, 5, 5)], tracker.COST_IOU)
+        np.testing.assert_allclose(cost, [[0, 1 - 50 / 150.0, 1]])
+
+class AssignTest(unittest.TestCase):
+
+    def testGreedy(self):
+        cost = np.array([[1.0, 2.0], [0.5, 3.0]])
+        # (1, 0) is the cheapest pair, row 0 gets the remaining column
+        self.assertEqual(tracker.assign(cost), [(1, 0), (0, 1)])
+
+    def testGate(self):
+        cost = np.array([[1.0, 2.0], [0.5, 3.0]])
+        self.assertEqual(tracker.assign(cost, gate=1.5), [(1, 0)])
+
+    def testEmpty(self):
+        self.assertEqual(tracker.assign(np.zeros((0, 3))), [])
+        self.assertEqual(tracker.assign(np.zeros((3, 0))), [])
+
+    def testSameAsSortedGreedy(self):
+        rng = np.random.RandomState(0)
+        for i in xrange(500):
+            shape = rng.randint(0, 15, size=2)
+            # Integer costs have many ties, broken by row then column
+            cost = rng.randint(0, 5, size=shape).astype(float) if i % 2 else rng.rand(*shape)
+            gate = 2.0 if i % 3 == 0 else None
+            self.assertEqual(tracker.assign(cost, gate), tracker.greedyAssign(cost, gate))
+
+class TrackHistoryTest(unittest.TestCase):
+
+    def testRingBuffer(self):
+        history = tracker.TrackHistory(['a', 'b'], 3)
+        for frame in xrange(5):
+            history.append([(frame, 0, 10, 10), (0, frame, 10, 10)], frame)
+        self.assertEqual(history.count, 3)
+        self.assertEqual(history.lastSeen, 4)
+        self.assertEqual(history.lastRects(), [(4, 0, 10, 10), (0, 4, 10, 10)])
+        np.testing.assert_array_equal(history.centers()[:, 0, 0], [7, 8, 9])
+
+    def testAddAndKeep(self):
+        history = tracker.TrackHistory(['a'], 2)
+        history.append([(0, 0, 10, 10)], 1)
+        history.addTracks(['b'], [(20, 20, 10, 10)], 2)
+        history.append([(1, 0, 10, 10), (21, 20, 10, 10)], 2)
+        self.assertEqual(history.hashs, ['a', 'b'])
+        # New tracks also fill the frames already stored
+        np.testing.assert_array_equal(history.centers()[:, 1], [[25, 25], [26, 25]])
+        self.assertEqual(history.lastMatched.tolist(), [0, 2])
+        history.keep(np.array([False, True]))
+        self.assertEqual(history.last(), [((21, 20, 10, 10), 'b')])
+
+if __name__ == '__main__':
+    unittest.main()
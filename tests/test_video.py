@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_video.py
+#
+# Author: Yann KOETH
+# Created: Mon Oct 26 14:20:11 2026 (+0200)
+# Last-Updated: Mon Oct 26 15:02:46 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 6
+#
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+import cv2
+import numpy as np
+
+import video
+from test_detector import FACES
+
+def writeClip(path, frames=60, enter=25, glitch=40):
+    """Write a clip with a face moving right, a second face entering at
+    frame 'enter' and a third face shown only on frame 'glitch'.
+    """
+    moving = cv2.resize(cv2.imread(os.path.join(FACES, 'bean.png')), (200, 200))
+    entering = cv2.resize(cv2.imread(os.path.join(FACES, 'watson.png')), (200, 200))
+    single = cv2.resize(cv2.imread(os.path.join(FACES, 'norton.png')), (120, 120))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (640, 360))
+    for i in xrange(frames):
+        img = np.full((360, 640, 3), 40, np.uint8)
+        img[80:280, 10 + i:210 + i] = moving
+        if i >= enter:
+            img[80:280, 420:620] = entering
+        if i == glitch:
+            img[230:350, 280:400] = single
+        writer.write(img)
+    writer.release()
+
+class SegmentsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tempDir = tempfile.mkdtemp(prefix='test-video-')
+        cls.clip = os.path.join(cls.tempDir, 'clip.avi')
+        writeClip(cls.clip)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tempDir, ignore_errors=True)
+
+    def detect(self, segments):
+        output = os.path.join(self.tempDir, 'segments-{}.jsonl'.format(segments))
+        stderr, sys.stderr = sys.stderr, StringIO.StringIO()
+        try:
+            status = video.main([self.clip, '-o', 'Face', '-j', '1', '--segments',
+                                 str(segments), '--output', output])
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(status, 0)
+        with open(output) as f:
+            return [json.loads(line) for line in f]
+
+    def testSegmentsMatchSerial(self):
+        serial = self.detect(1)
+        self.assertEqual(len(serial), 60)
+        # The entering face is reported, the single frame face is not
+        self.assertEqual(max(len(r['objects']) for r in serial), 2)
+        self.assertEqual(len(serial[-1]['objects']), 2)
+        self.assertEqual(self.detect(3), serial)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# tracing.py
+#
+# Author: Yann KOETH
+# Created: Fri Oct 23 14:12:06 2026 (+0200)
+# Last-Updated: Fri Oct 23 16:58:41 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 47
+#
+
+import json
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+class Span(object):
+    """A timed section, recorded when the 'with' block exits.
+    """
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        """Add arguments to the span, e.g. results known at the end.
+        """
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.time() - self.start, self.args)
+        return False
+
+class NullSpan(object):
+    """Span returned when tracing is disabled.
+    """
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Tracer(object):
+    """Records spans in a ring buffer of 'capacity' events.
+
+    Spans of a thread nest by time, as in Chrome trace 'complete' events.
+    When disabled, span() returns a shared no-op span.
+    """
+
+    def __init__(self, capacity=200000):
+        self.enabled = False
+        self.origin = time.time()
+        # (name, start, duration, thread id, args), deque appends are atomic
+        self.events = deque(maxlen=capacity)
+        self.threadNames = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        self.events.clear()
+        self.origin = time.time()
+
+    def span(self, name, **args):
+        """Return a span context manager named 'name'.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, duration, args=None):
+        thread = threading.current_thread()
+        if thread.ident not in self.threadNames:
+            self.threadNames[thread.ident] = thread.name
+        self.events.append((name, start, duration, thread.ident, args))
+
+    def traceEvents(self):
+        """Return the recorded spans as Chrome trace events.
+        """
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid,
+                   'args': {'name': name}}
+                  for tid, name in self.threadNames.items()]
+        for name, start, duration, tid, args in list(self.events):
+            events.append({'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': 0,
+                           'tid': tid, 'ts': (start - self.origin) * 1e6,
+                           'dur': duration * 1e6, 'args': args or {}})
+        return events
+
+    def export(self, path):
+        """Write a Chrome trace-event JSON file (chrome://tracing, Perfetto).
+        """
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.traceEvents(), 'displayTimeUnit': 'ms'}, f)
+
+    def summary(self):
+        """Return {name: {count, total, mean, p50, p99}} in seconds.
+        """
+        durations = {}
+        for name, start, duration, tid, args in list(self.events):
+            durations.setdefault(name, []).append(duration)
+        summary = {}
+        for name, values in durations.iteritems():
+            values = np.asarray(values)
+            summary[name] = {'count': len(values), 'total': float(values.sum()),
+                             'mean': float(values.mean()),
+                             'p50': float(np.percentile(values, 50)),
+                             'p99': float(np.percentile(values, 99))}
+        return summary
+
+    def formatSummary(self):
+        """Return the summary as a text table, by decreasing total time.
+        """
+        lines = ['{:<28} {:>7} {:>10} {:>9} {:>9}'.format('span', 'count', 'total ms',
+                                                          'p50 ms', 'p99 ms')]
+        for name, s in sorted(self.summary().items(), key=lambda item: -item[1]['total']):
+            lines.append('{:<28} {:>7} {:>10.1f} {:>9.2f} {:>9.2f}'.format(
+                name, s['count'], s['total'] * 1000, s['p50'] * 1000, s['p99'] * 1000))
+        return '\n'.join(lines)
+
+tracer = Tracer()
+
+def span(name, **args):
+    """Return a span of the default tracer.
+    """
+    return tracer.span(name, **args)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# tracker.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 18 17:02:36 2026 (+0200)
+# Last-Updated: Sun Oct 18 17:58:14 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 36
+#
+
+import cv2
+import numpy as np
+from itertools import izip
+
+COST_DISTANCE = 'distance'
+COST_IOU = 'iou'
+
+def toArray(rects):
+    """Return 'rects' as a float (n, 4) array.
+    """
+    return np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+
+def distanceCost(a, b):
+    """Distances between the centers of rects 'a' (rows) and 'b' (columns).
+    """
+    a, b = toArray(a), toArray(b)
+    ca = a[:, :2] + a[:, 2:] / 2
+    cb = b[:, :2] + b[:, 2:] / 2
+    d = ca[:, np.newaxis, :] - cb[np.newaxis, :, :]
+    return np.sqrt((d ** 2).sum(axis=2))
+
+def iouCost(a, b):
+    """1 - intersection over union of rects 'a' (rows) and 'b' (columns).
+    """
+    a, b = toArray(a), toArray(b)
+    a1, a2 = a[:, np.newaxis, :2], a[:, np.newaxis, :2] + a[:, np.newaxis, 2:]
+    b1, b2 = b[np.newaxis, :, :2], b[np.newaxis, :, :2] + b[np.newaxis, :, 2:]
+    inter = np.clip(np.minimum(a2, b2) - np.maximum(a1, b1), 0, None).prod(axis=2)
+    union = a[:, 2:].prod(axis=1)[:, np.newaxis] + b[:, 2:].prod(axis=1)[np.newaxis, :] - inter
+    return 1 - inter / np.maximum(union, 1e-9)
+
+def costMatrix(a, b, cost=COST_DISTANCE):
+    """Cost of associating each rect of 'a' with each rect of 'b'.
+    """
+    if cost == COST_IOU:
+        return iouCost(a, b)
+    return distanceCost(a, b)
+
+def greedyAssign(cost, gate=None):
+    """Associate rows and columns of 'cost' by increasing cost, each row and
+    column at most once. Pairs with a cost above 'gate' are not associated.
+    Return a list of (row, column).
+    """
+    rows, cols = cost.shape
+    if not rows or not cols:
+        return []
+    order = np.argsort(cost, axis=None, kind='mergesort')
+    if gate is not None:
+        order = order[cost.ravel()[order] <= gate]
+    rowUsed = np.zeros(rows, dtype=bool)
+    colUsed = np.zeros(cols, dtype=bool)
+    matches = []
+    # Lazy pairs, the loop usually stops long before the n * m costs
+    for r, c in izip(*np.unravel_index(order, cost.shape)):
+        if rowUsed[r] or colUsed[c]:
+            continue
+        rowUsed[r] = colUsed[c] = True
+        matches.append((int(r), int(c)))
+        if len(matches) == min(rows, cols):
+            break
+    return matches
+
+def assign(cost, gate=None):
+    """Same associations as greedyAssign, without sorting the whole matrix.
+
+    The pair of lowest cost, ties broken by row then column, is the best
+    of its row and of its column, so every such mutual best pair is picked
+    by the greedy order. Mutual best pairs are picked together until few
+    are left, the remaining rows and columns go through greedyAssign.
+    """
+    rows, cols = cost.shape
+    if not rows or not cols:
+        return []
+    cost = np.asarray(cost, dtype=np.float64)
+    if gate is not None:
+        cost = np.where(cost <= gate, cost, np.inf)
+    rowIds, colIds = np.arange(rows), np.arange(cols)
+    matches = []
+    while len(rowIds) and len(colIds):
+        sub = cost[np.ix_(rowIds, colIds)]
+        bestCol = sub.argmin(axis=1)
+        index = np.arange(len(rowIds))
+        mutual = (sub.argmin(axis=0)[bestCol] == index) & np.isfinite(sub[index, bestCol])
+        picked = np.flatnonzero(mutual)
+        if len(picked) * 4 < min(len(rowIds), len(colIds)):
+            rest = greedyAssign(sub, gate)
+            matches.extend((int(rowIds[r]), int(colIds[c])) for r, c in rest)
+            break
+        matches.extend(izip(rowIds[picked].tolist(), colIds[bestCol[picked]].tolist()))
+        colKept = np.ones(len(colIds), dtype=bool)
+        colKept[bestCol[picked]] = False
+        rowIds, colIds = rowIds[~mutual], colIds[colKept]
+    matches.sort(key=lambda pair: (cost[pair],) + pair)
+    return matches
+
+class TrackHistory(object):
+    """Ring buffer of the last 'capacity' rects of a set of tracks.
+
+    'candidates' are the (hash, last rect, frames matched) of objects not
+    confirmed as tracks yet.
+    """
+
+    def __init__(self, hashs, capacity):
+        self.hashs = list(hashs)
+        self.capacity = capacity
+        self.rects = np.zeros((capacity, len(self.hashs), 4), dtype=np.int32)
+        self.lastMatched = np.zeros(len(self.hashs), dtype=np.int64)
+        self.candidates = []
+        self.count = 0
+        self.head = 0
+        self.lastSeen = 0
+
+    def __len__(self):
+        return len(self.hashs)
+
+    def append(self, rects, frame):
+        """Store the rects of all the tracks for 'frame'.
+        """
+        if len(self.hashs):
+            self.rects[self.head] = rects
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.lastSeen = frame
+
+    def indexes(self):
+        """Buffer indexes of the stored frames, oldest first.
+        """
+        return (self.head - self.count + np.arange(self.count)) % self.capacity
+
+    def last(self):
+        """Return the last (rect, hash) pairs.
+        """
+        return zip(self.lastRects(), self.hashs)
+
+    def lastRects(self):
+        """Return the last rects as tuples.
+        """
+        if not self.count:
+            return []
+        return [tuple(rect) for rect in self.rects[(self.head - 1) % self.capacity].tolist()]
+
+    def centers(self):
+        """Return the centers of the stored rects, shape (frames, tracks, 2).
+        """
+        rects = self.rects[self.indexes()]
+        return rects[..., :2] + rects[..., 2:] / 2
+
+    def addTracks(self, hashs, rects, frame):
+        """Start tracks 'hashs' at 'rects', also stored as their rects on
+        the frames already in the buffer.
+        """
+        added = np.empty((self.capacity, len(hashs), 4), dtype=np.int32)
+        added[:] = rects
+        self.hashs.extend(hashs)
+        self.rects = np.concatenate((self.rects, added), axis=1)
+        self.lastMatched = np.concatenate((self.lastMatched,
+                                           np.full(len(hashs), frame, dtype=np.int64)))
+
+    def keep(self, mask):
+        """Only keep the tracks selected by boolean 'mask'.
+        """
+        self.hashs = [h for h, k in zip(self.hashs, mask) if k]
+        self.rects = np.ascontiguousarray(self.rects[:, mask])
+        self.lastMatched = self.lastMatched[mask]
+
+    @property
+    def nbytes(self):
+        return self.rects.nbytes + self.lastMatched.nbytes
+
+class FlowTracker(object):
+    """Propagate rects between detections with pyramidal Lucas-Kanade
+    optical flow on a grid of points per rect.
+
+    A full detection runs every 'interval' frames. The interval shrinks
+    when the tracked points are lost and grows back while tracking is
+    confident.
+    """
+
+    def __init__(self, interval=5, minInterval=1, maxInterval=30, grid=3,
+                 minConfidence=0.5, maxError=1.0):
+        self.interval = interval
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.grid = grid
+        self.minConfidence = minConfidence
+        self.maxError = maxError
+        self.prevGray = None
+        self.sinceKeyframe = 0
+        self.forceKeyframe = True
+        self.lkParams = dict(winSize=(15, 15), maxLevel=3,
+                             criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+    def isKeyframe(self):
+        """Return True if the next frame must be fully detected.
+        """
+        return (self.prevGray is None or self.forceKeyframe or
+                self.sinceKeyframe >= self.interval)
+
+    def update(self, gray, keyframe):
+        """Store 'gray' as the reference of the next propagation.
+        """
+        if keyframe:
+            if not self.forceKeyframe and self.sinceKeyframe >= self.interval:
+                self.interval = min(self.maxInterval, self.interval + 1)
+            self.sinceKeyframe = 0
+            self.forceKeyframe = False
+        self.sinceKeyframe += 1
+        self.prevGray = gray
+
+    def gridPoints(self, rects):
+        """Return a grid of points inside each rect, shape (rects * grid^2, 1, 2).
+        """
+        steps = (np.arange(self.grid) + 1.0) / (self.grid + 1)
+        sx, sy = np.meshgrid(steps, steps)
+        sx, sy = sx.ravel(), sy.ravel()
+        r = toArray(rects)
+        xs = r[:, 0:1] + r[:, 2:3] * sx
+        ys = r[:, 1:2] + r[:, 3:4] * sy
+        return np.dstack((xs, ys)).reshape(-1, 1, 2).astype(np.float32)
+
+    def propagate(self, gray, rects):
+        """Move 'rects' of the previous frame to 'gray'.
+        Return the new rects and the fraction of points tracked in each rect.
+        """
+        if self.prevGray is None or not len(rects):
+            return list(rects), []
+        p0 = self.gridPoints(rects)
+        p1, st1, err = cv2.calcOpticalFlowPyrLK(self.prevGray, gray, p0, None, **self.lkParams)
+        back, st2, err = cv2.calcOpticalFlowPyrLK(gray, self.prevGray, p1, None, **self.lkParams)
+        # Forward-backward check
+        fb = np.sqrt(((p0 - back) ** 2).sum(axis=2)).ravel()
+        good = (st1.ravel() == 1) & (st2.ravel() == 1) & (fb < self.maxError)
+
+        n = self.grid ** 2
+        p0, p1, good = p0.reshape(-1, n, 2), p1.reshape(-1, n, 2), good.reshape(-1, n)
+        moved, confidences = [], []
+        for (x, y, w, h), a, b, g in zip(rects, p0, p1, good):
+            confidences.append(g.mean())
+            if g.sum() < 2:
+                moved.append((x, y, w, h))
+                continue
+            a, b = a[g], b[g]
+            ca, cb = np.median(a, axis=0), np.median(b, axis=0)
+            da = np.sqrt(((a - ca) ** 2).sum(axis=1))
+            db = np.sqrt(((b - cb) ** 2).sum(axis=1))
+            valid = da > 1e-3
+            scale = float(np.median(db[valid] / da[valid])) if valid.any() else 1.0
+            cx, cy = x + w / 2.0 + cb[0] - ca[0], y + h / 2.0 + cb[1] - ca[1]
+            w, h = w * scale, h * scale
+            moved.append((int(round(cx - w / 2)), int(round(cy - h / 2)),
+                          int(round(w)), int(round(h))))
+        if confidences and min(confidences) < self.minConfidence:
+            self.forceKeyframe = True
+            self.interval = max(self.minInterval, self.interval // 2)
+        return moved, confidences
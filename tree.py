@@ -27,42 +27,18 @@ class Tree(defaultdict):
         for node, children in self.iteritems():
             children.map(func(node, param), func)
 
-    def fromQStandardItemModel(self, model, table, indexes, extract):
-        self.extracted = None
-        def getChildren(node, extract):
-            """Return the children tree of node.
-            """
-            tree = Tree()
-            childCount = node.rowCount()
-            for i in xrange(childCount):
-                child = node.child(i)
-                selected = model.indexFromItem(child) in indexes or not indexes
-                treeNode = Node(child.text(), (selected, table[child.data()]))
-                if child == extract:
-                    self.extracted = treeNode
-                tree[treeNode] = getChildren(child, extract)
-            return tree
+class Node(object):
+    """Tree node, compared by identity. The hash is computed once.
+    """
+    __slots__ = ('name', 'data', 'key')
 
-        for i in xrange(model.rowCount()):
-            rootItem = model.itemFromIndex(model.index(i, 0))
-            selected = model.index(i, 0) in indexes or not indexes
-            node = Node(rootItem.text(), (selected, table[rootItem.data()]))
-            if rootItem == extract:
-                self.extracted = node
-            self[node] = getChildren(rootItem, extract)
-
-        return self.extracted
-
-class Node:
     def __init__(self, name, data=None):
         self.name = name
         self.data = data
+        self.key = hash((name, id(self)))
 
     def __hash__(self):
-        return hash((self.name, str(self.data)))
-
-    def __eq__(self, other):
-        return (self.name == other.name) and (self.data == other.data)
+        return self.key
 
     def __repr__(self):
         return '[Node name={} data={}]'.format(self.name, self.data)
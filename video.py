@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# video.py
+#
+# Author: Yann KOETH
+# Created: Sun Oct 25 10:12:30 2026 (+0200)
+# Last-Updated: Sun Oct 25 15:47:02 2026 (+0200)
+#           By: Yann KOETH
+#     Update #: 86
+#
+
+"""Offline detection of a video file, segment parallel.
+
+The video is split in segments of consecutive frames, each detected in
+its own process. A segment starts detecting 'overlap' frames before its
+first frame so that stabilization, temporal search and optical flow are
+settled when its own frames begin. Tracks are stitched at segment
+boundaries by matching the objects of the last overlap frame with the
+objects of the previous segment on the same frame.
+
+An object starts a track once detected on 3 consecutive frames, so a
+false positive on a single frame is not reported, and a track not
+detected for --track-timeout frames (half the overlap by default) is
+dropped. Both settle within the overlap, so a segment reports the
+objects of a serial run whatever the segment they appear in.
+
+Segments are cut at frame numbers, not at keyframes of the video:
+OpenCV does not expose them, and seeking decodes from the previous
+keyframe so segments start on the exact frame.
+
+Detections are written as JSONL, one record per frame. With --render,
+an annotated video is written with the fill modes of the GUI.
+
+Usage:
+    python video.py [options] VIDEO
+
+Examples:
+    python video.py talk.mp4 -o Face/Eye --output talk.jsonl
+    python video.py talk.mp4 -o Face --render talk-blurred.mp4 --fill Blur -j 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import colorsys
+import argparse
+import tempfile
+import multiprocessing
+
+import cv2
+import numpy as np
+
+import tracker
+import compositor
+from cache import AssetCache
+from compositor import Compositor
+from redact import Redactor, MODES as REDACT_MODES
+from detector import Detector
+from batch import parseTree, parametersTree, parseSize
+
+MASK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'other', 'mask.png')
+FILL_MODES = [compositor.FILL_OUTLINE, compositor.FILL_COLOR, compositor.FILL_BLUR,
+              compositor.FILL_IMAGE, compositor.FILL_MASK, compositor.FILL_NONE]
+SHAPES = [compositor.SHAPE_RECT, compositor.SHAPE_ELLIPSE]
+CODECS = {'.avi': 'XVID', '.mp4': 'mp4v', '.mov': 'mp4v'}
+SEGMENT_CODEC = 'MJPG'
+
+def videoInfo(path):
+    """Return (frame count, fps, (width, height)) of video 'path'.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError("Couldn't read video {}".format(path))
+    info = (int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), capture.get(cv2.CAP_PROP_FPS),
+            (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+             int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+    capture.release()
+    return info
+
+def splitSegments(count, segments, overlap):
+    """Return (warm-up start, start, end) frame ranges of 'segments' parts.
+    """
+    if count <= 0:
+        # Unknown length, read until the end
+        return [(0, 0, sys.maxint)]
+    segments = max(1, min(segments, count))
+    bounds = [count * i // segments for i in xrange(segments + 1)]
+    return [(max(0, start - overlap) if i else start, start, end)
+            for i, (start, end) in enumerate(zip(bounds, bounds[1:]))]
+
+def classifierColor(classifier):
+    """Default BGR color of 'classifier', as in the GUI.
+    """
+    r, g, b = colorsys.hsv_to_rgb(*Detector.getDefaultHSVColor(classifier))
+    return (int(b * 255), int(g * 255), int(r * 255))
+
+########################################################
+# Rendering
+
+class Renderer(object):
+    """Draw detections on frames with a compositor, without Qt.
+    """
+
+    def __init__(self, fill, shape, showName, fillImage=None,
+                 blurMode=None, blurStrength=20):
+        self.fill = fill
+        self.shape = shape
+        self.showName = showName
+        self.fillImage = fillImage
+        self.compositor = Compositor(Redactor(blurMode or REDACT_MODES[0], blurStrength))
+        self.assets = AssetCache(self.loadImage,
+                                 lambda img, size: cv2.resize(img, size,
+                                                              interpolation=cv2.INTER_AREA),
+                                 lambda img: img.nbytes)
+
+    @staticmethod
+    def loadImage(path):
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is not None and img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return img
+
+    def getFeather(self, w, h):
+        """Return the progressive mask alpha at size 'w' x 'h'.
+        """
+        def build():
+            mask = self.assets.get(MASK_PATH, (w, h))
+            if mask is None or mask.shape[2] != 4:
+                return None
+            return mask[..., 3].astype(np.float32) / 255
+        return self.assets.generate(('feather', self.assets.stamp(MASK_PATH)), (w, h), build)
+
+    def render(self, img, detections):
+        """Return a copy of 'img' with 'detections' drawn.
+        """
+        out = self.compositor.begin(img)
+        colors = [classifierColor(param.classifier) for param in detections.params]
+        rows = zip(detections.classId.tolist(), detections.rects.tolist())
+        for classId, (x, y, w, h) in rows:
+            image = feather = None
+            if self.fill == compositor.FILL_IMAGE and self.fillImage:
+                image = self.assets.get(self.fillImage, (w, h))
+            elif self.fill == compositor.FILL_MASK:
+                feather = self.getFeather(w, h)
+            self.compositor.fill((x, y, w, h), self.shape, self.fill, colors[classId],
+                                 image, feather)
+        out = self.compositor.end()
+        for classId, (x, y, w, h) in rows:
+            color = colors[classId]
+            if self.fill == compositor.FILL_OUTLINE:
+                if self.shape == compositor.SHAPE_ELLIPSE:
+                    cv2.ellipse(out, ((x + w / 2.0, y + h / 2.0), (w, h), 0), color, 2,
+                                cv2.LINE_AA)
+                else:
+                    cv2.rectangle(out, (x, y), (x + w, y + h), color, 2)
+            if self.showName:
+                cv2.putText(out, detections.params[classId].name, (x, max(y - 4, 10)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+        return out.copy()
+
+########################################################
+# Workers
+
+worker = {}
+
+def initWorker(objectsTree, params, options, render, threads):
+    """Create the detection tree and renderer of a worker process.
+    'options' are (equalizeHist, detectionSize, temporal, opticalFlow, keyframe
+    interval, track timeout), 'render' is Renderer arguments or None and
+    'threads' the OpenCV threads of the process.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cv2.setNumThreads(threads)
+    tree = parametersTree(objectsTree, **params)
+    worker.update(tree=tree, options=options,
+                  renderer=Renderer(*render) if render else None)
+
+def frameRecords(detections):
+    """Return the objects of a frame with their local track.
+    """
+    objects = detections.toRecords()
+    for obj, track in zip(objects, detections.track.tolist()):
+        if track != -1:
+            obj['track'] = track
+    return objects
+
+def detectSegment(segment):
+    """Detect the frames of 'segment', write their records as JSONL in a
+    temporary file and the rendered frames in a temporary video.
+    Return (index, records path, video path, objects of the frame before
+    the segment, objects of the last frame, frames, elapsed).
+    """
+    index, path, (warmup, start, end), fps, tempDir = segment
+    equalizeHist, detectionSize, temporal, opticalFlow, interval, timeout = worker['options']
+    started = time.time()
+    detector = Detector(temporal=temporal, keyframeInterval=interval,
+                        historyTimeout=timeout, newTracks=True)
+    detector.setOpticalFlow(opticalFlow, interval)
+    capture = cv2.VideoCapture(path)
+    if warmup:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, warmup)
+    recordsPath = os.path.join(tempDir, 'segment-{:05d}.jsonl'.format(index))
+    videoPath = None
+    writer = None
+    renderer = worker['renderer']
+    head, tail, frames = [], [], 0
+    with open(recordsPath, 'w') as records:
+        for frame in xrange(warmup, end):
+            ret, img = capture.read()
+            if not ret or img is None:
+                break
+            detections = detector.detect(img, worker['tree'], equalizeHist,
+                                         detectionSize=detectionSize, columnar=True)
+            objects = frameRecords(detections)
+            if frame < start:
+                head = objects
+                continue
+            records.write(json.dumps({'frame': frame, 'time': frame / fps if fps else None,
+                                      'objects': objects}) + '\n')
+            tail = objects
+            frames += 1
+            if renderer:
+                if writer is None:
+                    h, w = img.shape[:2]
+                    videoPath = os.path.join(tempDir, 'segment-{:05d}.avi'.format(index))
+                    writer = cv2.VideoWriter(videoPath, cv2.VideoWriter_fourcc(*SEGMENT_CODEC),
+                                             fps or 25, (w, h))
+                    writer.set(cv2.VIDEOWRITER_PROP_QUALITY, 95)
+                writer.write(renderer.render(img, detections))
+    capture.release()
+    if writer is not None:
+        writer.release()
+    return (index, recordsPath, videoPath, head if start > warmup else [], tail,
+            frames, time.time() - started)
+
+########################################################
+# Stitching
+
+class TrackStitcher(object):
+    """Map the local tracks of each segment to global track ids.
+    """
+
+    def __init__(self, minIoU=0.3):
+        self.minIoU = minIoU
+        self.next = 0
+        self.tail = {}
+        self.mapping = {}
+
+    def match(self, head):
+        """Start a segment whose objects of the frame before its start are
+        'head', matched with the tail of the previous segment.
+        """
+        mapping = {}
+        for classifier in set(obj['object'] for obj in head):
+            current = [obj for obj in head if obj['object'] == classifier and 'track' in obj]
+            previous = [obj for obj in self.tail.get(classifier, [])]
+            if not current or not previous:
+                continue
+            rects = lambda objs: [(o['x'], o['y'], o['w'], o['h']) for o in objs]
+            cost = tracker.iouCost(rects(previous), rects(current))
+            for i, j in tracker.assign(cost, 1 - self.minIoU):
+                mapping[(classifier, current[j]['track'])] = previous[i]['track']
+        self.mapping = mapping
+
+    def globalize(self, objects):
+        """Replace the local tracks of 'objects' with global ids.
+        """
+        for obj in objects:
+            if 'track' not in obj:
+                continue
+            key = (obj['object'], obj['track'])
+            if key not in self.mapping:
+                self.mapping[key] = self.next
+                self.next += 1
+            obj['track'] = self.mapping[key]
+        return objects
+
+    def end(self, tail):
+        """End a segment whose last frame objects are 'tail'.
+        """
+        self.tail = {}
+        for obj in self.globalize(tail):
+            if 'track' in obj:
+                self.tail.setdefault(obj['object'], []).append(obj)
+
+def concatenate(paths, output, fps, size, codec):
+    """Write the frames of the segment videos 'paths' in 'output'.
+    """
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*codec), fps or 25, size)
+    if not writer.isOpened():
+        raise IOError("Couldn't write video {}".format(output))
+    for path in paths:
+        capture = cv2.VideoCapture(path)
+        while True:
+            ret, img = capture.read()
+            if not ret:
+                break
+            writer.write(img)
+        capture.release()
+    writer.release()
+
+########################################################
+# Command line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Detect objects in a video file offline.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__)
+    parser.add_argument('video')
+    parser.add_argument('-o', '--object', action='append', dest='objects',
+                        help='object path to detect, e.g. Face/Eye (default: Face/Eye, Face/Nose)')
+    parser.add_argument('--output', help='JSONL output (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--segments', type=int,
+                        help='number of segments (default: 2 per job)')
+    parser.add_argument('--overlap', type=int, default=15,
+                        help='frames detected before each segment to settle tracking')
+    parser.add_argument('--track-timeout', type=int, metavar='FRAMES',
+                        help='frames before a lost object is dropped (default: half the overlap)')
+    parser.add_argument('--no-track', action='store_true',
+                        help='do not stabilize objects nor assign track ids')
+    parser.add_argument('--no-equalize', action='store_true')
+    parser.add_argument('--detection-size', type=int, metavar='PIXELS')
+    parser.add_argument('--temporal', action='store_true',
+                        help='search around the previous objects between keyframes')
+    parser.add_argument('--optical-flow', action='store_true',
+                        help='track objects with optical flow between keyframes')
+    parser.add_argument('--keyframe-interval', type=int, default=10)
+    parser.add_argument('--scale-factor', type=float, default=1.3)
+    parser.add_argument('--min-neighbors', type=int, default=4)
+    parser.add_argument('--min-size', type=parseSize, default=(0, 0), metavar='WxH')
+    parser.add_argument('--render', metavar='VIDEO', help='write an annotated video')
+    parser.add_argument('--codec', help='fourcc of the annotated video (default: from extension)')
+    parser.add_argument('--fill', choices=FILL_MODES, default=compositor.FILL_OUTLINE)
+    parser.add_argument('--shape', choices=SHAPES, default=compositor.SHAPE_RECT)
+    parser.add_argument('--fill-image', metavar='IMAGE', help='image of the Image fill')
+    parser.add_argument('--blur-mode', choices=REDACT_MODES, default=REDACT_MODES[0])
+    parser.add_argument('--blur-strength', type=int, default=20)
+    parser.add_argument('--hide-names', action='store_true')
+    args = parser.parse_args(argv)
+
+    try:
+        objectsTree = (parseTree(args.objects) if args.objects
+                       else Detector.getDefaultObjectsTree())
+        count, fps, size = videoInfo(args.video)
+    except (ValueError, IOError) as e:
+        parser.error(str(e))
+    if args.fill == compositor.FILL_IMAGE and not args.fill_image:
+        parser.error('--fill Image requires --fill-image')
+    codec = args.codec or CODECS.get(os.path.splitext(args.render or '')[1].lower(), 'MJPG')
+    params = dict(scaleFactor=args.scale_factor, minNeighbors=args.min_neighbors,
+                  minSize=args.min_size, stabilize=not args.no_track)
+    timeout = args.track_timeout or max(1, args.overlap // 2)
+    options = (not args.no_equalize, args.detection_size, args.temporal,
+               args.optical_flow, args.keyframe_interval, timeout)
+    render = None
+    if args.render:
+        render = (args.fill, args.shape, not args.hide_names, args.fill_image,
+                  args.blur_mode, args.blur_strength)
+
+    jobs = max(1, args.jobs)
+    # By default, two segments per job and an overlap below a tenth of the frames
+    segments = args.segments or max(1, min(2 * jobs, count // max(1, 10 * args.overlap)))
+    segments = splitSegments(count, segments, args.overlap)
+    tempDir = tempfile.mkdtemp(prefix='video-')
+    stream = open(args.output, 'w') if args.output else sys.stdout
+    stitcher = TrackStitcher()
+    videos = []
+    processes = min(jobs, len(segments))
+    threads = max(1, multiprocessing.cpu_count() // processes)
+    pool = multiprocessing.Pool(processes, initWorker,
+                                (objectsTree, params, options, render, threads))
+    frames, busy, start = 0, 0.0, time.time()
+    try:
+        tasks = [(i, args.video, bounds, fps, tempDir) for i, bounds in enumerate(segments)]
+        for index, recordsPath, videoPath, head, tail, n, elapsed in pool.imap(detectSegment,
+                                                                             tasks):
+            stitcher.match(head)
+            with open(recordsPath) as records:
+                for line in records:
+                    record = json.loads(line)
+                    stitcher.globalize(record['objects'])
+                    stream.write(json.dumps(record) + '\n')
+            stitcher.end(tail)
+            if videoPath:
+                videos.append(videoPath)
+            frames += n
+            busy += elapsed
+            print >> sys.stderr, 'segment {}/{}: {} frames in {:.1f} s'.format(
+                index + 1, len(segments), n, elapsed)
+        pool.close()
+        if args.render and videos:
+            concatenate(videos, args.render, fps, size, codec)
+    except KeyboardInterrupt:
+        pool.terminate()
+        return 1
+    finally:
+        pool.join()
+        if stream is not sys.stdout:
+            stream.close()
+        shutil.rmtree(tempDir, ignore_errors=True)
+    elapsed = time.time() - start
+    print >> sys.stderr, '{} frames in {:.2f} s, {:.1f} frames/s ({:.1f} s in {} workers)'.format(
+        frames, elapsed, frames / elapsed if elapsed else 0, busy, processes)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -84,6 +84,8 @@ class WindowUI():
         hbox.addWidget(self.sourceCBox)
         hbox.addWidget(self.sourcePath)
         hbox.addWidget(self.sourcePathButton)
+        self.opticalFlow = QCheckBox(self.tr('Optical flow'))
+        hbox.addWidget(self.opticalFlow)
         hbox.addLayout(controlsHbox)
         hbox.setAlignment(QtCore.Qt.AlignLeft)
         return hbox
@@ -200,6 +202,13 @@ class WindowUI():
         self.minWidth.setMaximum(1500)
         self.minHeight = QSpinBox()
         self.minHeight.setMaximum(1500)
+        self.detectionScale = QDoubleSpinBox()
+        self.detectionScale.setMaximumWidth(65)
+        self.detectionScale.setLocale(QLocale(QLocale.English, QLocale.UnitedStates))
+        self.detectionScale.setSingleStep(.1)
+        self.detectionScale.setDecimals(2)
+        self.detectionScale.setMinimum(0.1)
+        self.detectionScale.setMaximum(1)
         self.autoNeighbors = QPushButton(self.tr("Auto"))
         self.autoNeighborsParam = QSpinBox()
         self.autoNeighborsParam.setMaximum(1500)
@@ -214,6 +223,7 @@ class WindowUI():
         vlabel.addWidget(QLabel(self.tr('Scale factor')))
         vlabel.addWidget(QLabel(self.tr('Min neighbors')))
         vlabel.addWidget(QLabel(self.tr('Minimum Size')))
+        vlabel.addWidget(QLabel(self.tr('Detection scale')))
 
         hNeighbors = QHBoxLayout()
         hNeighbors.addWidget(self.minNeighbors)
@@ -224,6 +234,7 @@ class WindowUI():
         vparam.addWidget(self.scaleFactor)
         vparam.addLayout(hNeighbors)
         vparam.addLayout(hminSize)
+        vparam.addWidget(self.detectionScale)
 
         hparameters = QHBoxLayout()
         hparameters.addLayout(vlabel)
@@ -254,10 +265,64 @@ class WindowUI():
         hbox.addWidget(self.bgPathButton)
 
         self.equalizeHist = QCheckBox(self.tr('Equalize histogram'))
+        self.threads = QSpinBox()
+        self.threads.setMaximum(64)
+        self.threads.setMaximumWidth(45)
+        hdetect = QHBoxLayout()
+        hdetect.addWidget(self.equalizeHist)
+        hdetect.addStretch(1)
+        self.detectionSize = QSpinBox()
+        self.detectionSize.setMaximum(10000)
+        self.detectionSize.setSingleStep(160)
+        self.detectionSize.setSpecialValueText(self.tr('Full'))
+        self.detectionSize.setMaximumWidth(65)
+        hdetect.addWidget(QLabel(self.tr('Detection size')))
+        hdetect.addWidget(self.detectionSize)
+        hdetect.addWidget(QLabel(self.tr('Threads')))
+        hdetect.addWidget(self.threads)
+
+        self.temporal = QCheckBox(self.tr('Temporal search'))
+        self.keyframeInterval = QSpinBox()
+        self.keyframeInterval.setMinimum(1)
+        self.keyframeInterval.setMaximum(1000)
+        self.keyframeInterval.setMaximumWidth(45)
+        htemporal = QHBoxLayout()
+        htemporal.addWidget(self.temporal)
+        htemporal.addStretch(1)
+        htemporal.addWidget(QLabel(self.tr('Keyframe every')))
+        htemporal.addWidget(self.keyframeInterval)
+
+        self.pipelined = QCheckBox(self.tr('Pipeline'))
+        self.dropPolicyCBox = QComboBox(self)
+        self.pipelineWorkers = QSpinBox()
+        self.pipelineWorkers.setMinimum(1)
+        self.pipelineWorkers.setMaximum(16)
+        self.pipelineWorkers.setMaximumWidth(45)
+        hpipeline = QHBoxLayout()
+        hpipeline.addWidget(self.pipelined)
+        hpipeline.addWidget(self.dropPolicyCBox)
+        hpipeline.addStretch(1)
+        hpipeline.addWidget(QLabel(self.tr('Workers')))
+        hpipeline.addWidget(self.pipelineWorkers)
+
+        self.blurModeCBox = QComboBox(self)
+        self.blurStrength = QSpinBox()
+        self.blurStrength.setMinimum(1)
+        self.blurStrength.setMaximum(100)
+        self.blurStrength.setMaximumWidth(45)
+        hblur = QHBoxLayout()
+        hblur.addWidget(QLabel(self.tr('Blur')))
+        hblur.addWidget(self.blurModeCBox)
+        hblur.addStretch(1)
+        hblur.addWidget(QLabel(self.tr('Strength')))
+        hblur.addWidget(self.blurStrength)
 
         vbox = QVBoxLayout()
         vbox.addLayout(hbox)
-        vbox.addWidget(self.equalizeHist)
+        vbox.addLayout(hblur)
+        vbox.addLayout(hdetect)
+        vbox.addLayout(htemporal)
+        vbox.addLayout(hpipeline)
         return vbox
 
     def widgetParameters(self):
@@ -297,6 +362,17 @@ class WindowUI():
         self.showDetails.setChecked(1)
         hbox.addWidget(self.showDetails)
         hbox.addStretch(1)
+        self.tracing = QCheckBox(self.tr('Trace'))
+        self.exportTraceButton = QPushButton(self.tr('Export trace...'))
+        hbox.addWidget(self.tracing)
+        hbox.addWidget(self.exportTraceButton)
+        self.metricsOverlay = QCheckBox(self.tr('Metrics'))
+        self.metricsPort = QSpinBox()
+        self.metricsPort.setRange(0, 65535)
+        self.metricsPort.setSpecialValueText(self.tr('Off'))
+        hbox.addWidget(self.metricsOverlay)
+        hbox.addWidget(QLabel(self.tr('Port')))
+        hbox.addWidget(self.metricsPort)
 
         vbox.addLayout(hbox)
         vbox.addWidget(self.debugText)